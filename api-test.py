@@ -20,13 +20,11 @@ def generate_random_classroom_data():
     return {
         "lecturer_name": "Professor "
         + "".join(random.choices("ABCDEFGHIJKLMNOPQRSTUVWXYZ", k=5)),
-        "duration": random.randint(1, 4),  # Assuming duration is in hours
+        "duration": random.randint(1, 4) * 3600,  # in seconds
         "lecture_time": random.uniform(
             0, 24
         ),  # Assuming lecture time is in 24-hour format
-        "late_penalty_duration": random.uniform(
-            0, 1
-        ),  # Assuming late penalty duration in hours
+        "late_penalty_duration": random.uniform(0, 3600),  # in seconds
         "subject_name": "Mathematics",  # Assuming a fixed subject for simplicity
     }
 
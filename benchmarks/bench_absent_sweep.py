@@ -0,0 +1,92 @@
+"""Absent sweep over one ended lecture of a large class.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_absent_sweep
+"""
+
+import os
+import tempfile
+import time
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.attendance import Attendance, insert_attendances_internal
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.lecture_session import LectureSessionDBHandler
+from src.model.student import StudentDBHandler, create_stud
+
+
+def run(n_students: int, present: float = 0.7):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        sessions = LectureSessionDBHandler(pool)
+        # the first lecture starts in a minute, so its session is not swept
+        # on creation
+        classroom = create_classroom(
+            lecturer_name="lecturer",
+            subject_name="subject",
+            duration=3600,
+            late_penalty_duration=900,
+            lecture_time=time.time() + 60,
+        )
+        ClassroomDBHandler(pool, sessions=sessions).create_many([classroom])
+        session = sessions.list_by_class(classroom.id)[0]
+
+        students = [
+            create_stud(
+                firstname="first{}".format(i), lastname="x", generation=1, gender="m"
+            )
+            for i in range(n_students)
+        ]
+        enrollments = [
+            create_enrollment(class_id=classroom.id, student_id=student.id)
+            for student in students
+        ]
+        StudentDBHandler(pool).register_many(students, enrollments)
+        with pool.writer() as conn:
+            insert_attendances_internal(
+                conn,
+                [
+                    Attendance(
+                        id="a{}".format(i),
+                        enrollment_id=enrollment.id,
+                        last_record=0,
+                        entry_time=session.start_time + 30,
+                        punctuality="ontime",
+                        session_id=session.id,
+                    )
+                    for i, enrollment in enumerate(
+                        enrollments[: int(n_students * present)]
+                    )
+                ],
+            )
+
+        # every trigger step is traced again with the text of the statement
+        # that fired it; those are not round trips
+        statements = []
+
+        def trace(sql: str):
+            if not statements or statements[-1] != sql:
+                statements.append(sql)
+
+        with pool.writer() as conn:
+            conn.set_trace_callback(trace)
+        started = time.perf_counter()
+        result = sessions.sweep_absent(now=session.end_time)
+        elapsed = time.perf_counter() - started
+        with pool.writer() as conn:
+            conn.set_trace_callback(None)
+        print(
+            "{:>6} students  {:>5} absences  {:>2} statements  {:7.1f} ms".format(
+                n_students, result.absences, len(statements), elapsed * 1000
+            )
+        )
+        pool.close()
+
+
+if __name__ == "__main__":
+    for n in (100, 1000, 10000):
+        run(n)
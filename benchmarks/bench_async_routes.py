@@ -0,0 +1,85 @@
+"""Throughput of sync vs executor-backed async routes at 200 concurrent clients.
+
+Both apps serve the same classroom lookup from the same database. The
+"before" app uses plain ``def`` routes that run on Starlette's shared
+threadpool; the "after" app uses ``async def`` routes that await an
+``AsyncDBHandler`` backed by the dedicated database executor.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_async_routes
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from src.db import AsyncDBHandler, ConnectionPool, create_db_executor
+from src.migrations import migrate
+from src.model.classroom import ClassroomDBHandler, create_classroom
+
+CLIENTS = 200
+REQUESTS_PER_CLIENT = 25
+
+
+def build_apps(pool: ConnectionPool):
+    handler = ClassroomDBHandler(pool)
+    async_handler = AsyncDBHandler(handler, create_db_executor(pool.settings))
+
+    sync_app = FastAPI()
+    async_app = FastAPI()
+
+    @sync_app.get("/classrooms/{id}")
+    def get_sync(id: str):
+        return handler.get(id).model_dump()
+
+    @async_app.get("/classrooms/{id}")
+    async def get_async(id: str):
+        return (await async_handler.get(id)).model_dump()
+
+    return sync_app, async_app
+
+
+async def hammer(app: FastAPI, ids: list[str]) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+
+        async def client(n: int):
+            for i in range(REQUESTS_PER_CLIENT):
+                r = await c.get("/classrooms/{}".format(ids[(n + i) % len(ids)]))
+                assert r.status_code == 200
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client(n) for n in range(CLIENTS)))
+        return time.perf_counter() - started
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        classrooms = [
+            create_classroom("lecturer {}".format(i), "subject {}".format(i), 1, 15)
+            for i in range(300)
+        ]
+        ClassroomDBHandler(pool).create_many(classrooms)
+        ids = [classroom.id for classroom in classrooms]
+
+        total = CLIENTS * REQUESTS_PER_CLIENT
+        for name, app in zip(("sync def", "async def"), build_apps(pool)):
+            elapsed = asyncio.run(hammer(app, ids))
+            print(
+                "{:>9}  {} clients  {:>6} requests  {:8.0f} req/s".format(
+                    name, CLIENTS, total, total / elapsed
+                )
+            )
+        print(pool.stats())
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Time to register a start-of-term roster with its details and enrollments.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_bulk_register
+"""
+
+import os
+import tempfile
+import time
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+def run(n_students: int, n_classes: int = 8):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+
+        classrooms = [
+            create_classroom("lecturer {}".format(i), "subject {}".format(i), 1, 15)
+            for i in range(n_classes)
+        ]
+        ClassroomDBHandler(pool).create_many(classrooms)
+
+        started = time.perf_counter()
+        students = [
+            create_stud("first{}".format(i), "last{}".format(i), 1, "m")
+            for i in range(n_students)
+        ]
+        enrollments = [
+            create_enrollment(classroom.id, student.id)
+            for student in students
+            for classroom in classrooms[:4]
+        ]
+        StudentDBHandler(pool).register_many(students, enrollments)
+        elapsed = time.perf_counter() - started
+
+        print(
+            "{:>6} students  {:>6} enrollments  {:8.1f} ms".format(
+                n_students, len(enrollments), elapsed * 1000
+            )
+        )
+        pool.close()
+
+
+if __name__ == "__main__":
+    for n in (200, 2000, 20000):
+        run(n)
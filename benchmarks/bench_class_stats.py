@@ -0,0 +1,103 @@
+"""Per-class summary from GROUP BY versus counting ``list_by_classroom``.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_class_stats
+"""
+
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.attendance import (
+    Attendance,
+    AttendanceDBHandler,
+    insert_attendances_internal,
+)
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+from src.stats import ClassStatsDBHandler
+
+
+def timed(label: str, fn, repeat: int = 5):
+    fn()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    elapsed = (time.perf_counter() - started) / repeat
+    print("  {:<28} {:8.2f} ms".format(label, elapsed * 1000))
+
+
+def run(n_students: int, n_sessions: int = 30, n_classrooms: int = 5):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        week = 7 * 24 * 3600
+        first = time.time() - n_sessions * week
+        classrooms = [
+            create_classroom(
+                lecturer_name="lecturer",
+                subject_name="subject{}".format(i),
+                duration=3600,
+                late_penalty_duration=900,
+                lecture_time=first,
+            )
+            for i in range(n_classrooms)
+        ]
+        ClassroomDBHandler(pool).create_many(classrooms)
+        students = [
+            create_stud(
+                firstname="first{}".format(i), lastname="x", generation=1, gender="m"
+            )
+            for i in range(n_students)
+        ]
+        enrollments = [
+            create_enrollment(class_id=classroom.id, student_id=student.id)
+            for classroom in classrooms
+            for student in students
+        ]
+        StudentDBHandler(pool).register_many(students, enrollments)
+        with pool.writer() as conn:
+            insert_attendances_internal(
+                conn,
+                [
+                    Attendance(
+                        id="a{}_{}".format(week_no, i),
+                        enrollment_id=enrollment.id,
+                        last_record=0,
+                        entry_time=first + week_no * week + rng.random() * 900,
+                        punctuality=rng.choice(("ontime", "ontime", "late", "absent")),
+                    )
+                    for week_no in range(n_sessions)
+                    for i, enrollment in enumerate(enrollments)
+                ],
+            )
+
+        class_id = classrooms[0].id
+        attendance = AttendanceDBHandler(pool)
+        stats = ClassStatsDBHandler(pool)
+
+        def count_rows():
+            rows = attendance.list_by_classroom(class_id)
+            return Counter(row.punctuality for row in rows)
+
+        print(
+            "{} students x {} sessions, {} rows per class".format(
+                n_students, n_sessions, n_students * n_sessions
+            )
+        )
+        timed("list_by_classroom + Counter", count_rows)
+        timed("summary (GROUP BY)", lambda: stats.summary(class_id))
+        timed("daily (GROUP BY day)", lambda: stats.daily(class_id))
+        pool.close()
+
+
+if __name__ == "__main__":
+    for n in (100, 1000):
+        run(n)
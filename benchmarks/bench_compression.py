@@ -0,0 +1,62 @@
+"""Size and CPU time of compressing a large student list response.
+
+Builds the ``GET /students/`` body for 10k students the way the route does
+and compresses it at several levels with each available encoding.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_compression
+"""
+
+import time
+
+from src.compression import CompressionSettings, ResponseCompression, brotli
+from src.model.student import Student
+from src.response import PageTemplate
+
+N = 10_000
+REPEAT = 5
+
+
+def make_body() -> bytes:
+    students = [
+        {
+            "student": Student(
+                id="{:08d}-4287-476d-a088-b630b542a2e1".format(i),
+                firstname="student{}".format(i),
+                lastname="lastname{}".format(i % 97),
+                generation=i % 10,
+                gender="mf"[i % 2],
+            ),
+            "enrollments": ["math", "physics", "chemistry"][: i % 3 + 1],
+        }
+        for i in range(N)
+    ]
+    page = PageTemplate(students, None, "successfully retrieved students")
+    return page.to_json().body
+
+
+def run():
+    body = make_body()
+    print("{} students, {} bytes uncompressed".format(N, len(body)))
+    cases = [("gzip", level) for level in (1, 6, 9)]
+    if brotli is not None:
+        cases += [("br", level) for level in (1, 5, 9)]
+    for encoding, level in cases:
+        compression = ResponseCompression(
+            CompressionSettings(gzip_level=level, brotli_level=level)
+        )
+        started = time.perf_counter()
+        for _ in range(REPEAT):
+            compressed = compression.compress(body, encoding)
+        elapsed = (time.perf_counter() - started) / REPEAT
+        ratio = len(compressed) / len(body)
+        print(
+            "{:<4} level {}  {:9} bytes ({:5.1%})  {:7.2f} ms".format(
+                encoding, level, len(compressed), ratio, elapsed * 1000
+            )
+        )
+
+
+if __name__ == "__main__":
+    run()
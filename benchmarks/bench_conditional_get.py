@@ -0,0 +1,86 @@
+"""Polling the list endpoints with and without ``If-None-Match``.
+
+Serves the real app from a scratch database in a temporary directory. Run
+from the repository root::
+
+    python -m benchmarks.bench_conditional_get
+"""
+
+import asyncio
+import os
+import tempfile
+import time
+
+import httpx
+
+
+def seed(n_students: int, n_checkins: int):
+    from src.model.attendance import Attendance, insert_attendances_internal
+    from src.model.classroom import ClassroomDBHandler, create_classroom
+    from src.model.enrollments import create_enrollment
+    from src.model.student import StudentDBHandler, create_stud
+    from src.route.providers.base import db_pool
+
+    classroom = create_classroom("lecturer", "subject", 3600, 900)
+    ClassroomDBHandler(db_pool).create_many([classroom])
+    students = [
+        create_stud("first{}".format(i), "last", 1, "m") for i in range(n_students)
+    ]
+    enrollments = [create_enrollment(classroom.id, s.id) for s in students]
+    StudentDBHandler(db_pool).register_many(students, enrollments)
+    with db_pool.writer() as conn:
+        insert_attendances_internal(
+            conn,
+            [
+                Attendance(
+                    id="a{}".format(i),
+                    enrollment_id=enrollments[i % n_students].id,
+                    last_record=0,
+                    entry_time=time.time() - i * 60,
+                    punctuality="ontime",
+                )
+                for i in range(n_checkins)
+            ],
+        )
+    return classroom.id
+
+
+async def poll(app, path: str, n: int = 200):
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as c:
+        first = await c.get(path)
+        for label, headers in (
+            ("full", {}),
+            ("If-None-Match", {"If-None-Match": first.headers["etag"]}),
+        ):
+            sent = 0
+            started = time.perf_counter()
+            for _ in range(n):
+                r = await c.get(path, headers=headers)
+                sent += len(r.content)
+            elapsed = (time.perf_counter() - started) / n
+            print(
+                "  {:<36} {:<14} {:3} {:8.2f} ms {:>9} B".format(
+                    path[:36], label, r.status_code, elapsed * 1000, sent // n
+                )
+            )
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        from src.app import app
+        from src.route.providers.base import db_pool
+
+        class_id = seed(n_students=2000, n_checkins=10000)
+        for path in (
+            "/classrooms/",
+            "/students/?limit=200",
+            "/attendances/classroom/{}".format(class_id),
+        ):
+            asyncio.run(poll(app, path))
+        db_pool.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Latency of student name lookups and searches with 100k students.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_name_search
+"""
+
+import os
+import random
+import tempfile
+import time
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.student import StudentDBHandler, create_stud
+
+SYLLABLES = "an ba chan da el fa go ha in jo ka li ma no pha ra sok ta vi ya".split()
+
+
+def make_name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3)))
+
+
+def timed(label: str, fn, queries: list[str]):
+    fn(queries[0])
+    started = time.perf_counter()
+    hits = sum(1 for query in queries if fn(query))
+    elapsed = (time.perf_counter() - started) / len(queries)
+    print(
+        "{:<28} {:8.3f} ms/query  {:>4}/{} found".format(
+            label, elapsed * 1000, hits, len(queries)
+        )
+    )
+
+
+def run(n_students: int, n_queries: int = 500):
+    rng = random.Random(42)
+    students = [
+        create_stud(
+            firstname=make_name(rng).capitalize(),
+            lastname=make_name(rng),
+            generation=rng.randint(1, 10),
+            gender=rng.choice("mf"),
+        )
+        for _ in range(n_students)
+    ]
+    picked = rng.sample(students, n_queries)
+    exact = ["{} {}".format(s.firstname, s.lastname).upper() for s in picked]
+    prefix = ["{} {}".format(s.firstname[:3], s.lastname[:4]) for s in picked]
+    short = [s.firstname[:2] for s in picked]
+
+    def typo(name: str) -> str:
+        i = rng.randrange(len(name) - 1)
+        return name[:i] + name[i + 1] + name[i] + name[i + 2 :]
+
+    fuzzy = ["{} {}".format(typo(s.firstname.lower()), s.lastname) for s in picked]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        handler = StudentDBHandler(pool)
+        handler.register_many(students)
+        print("{} students".format(n_students))
+        timed("exact (any case)", handler.get_by_name, exact)
+        timed("prefix, first + last", handler.search, prefix)
+        timed("prefix, 2 letters", handler.search, short)
+        timed("one transposed letter", handler.search, fuzzy)
+        pool.close()
+
+
+if __name__ == "__main__":
+    run(100_000)
@@ -0,0 +1,74 @@
+"""Repeated handler get() lookups with and without the object cache.
+
+Models recognition clients asking for the same few hundred students and
+classrooms over and over. Run from the repository root::
+
+    python -m benchmarks.bench_object_cache
+"""
+
+import functools
+import os
+import random
+import tempfile
+import time
+
+from src.cache import ObjectCache
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import EnrollmentDBHandler, create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+def timed(label: str, fn, keys: list[str]):
+    started = time.perf_counter()
+    for key in keys:
+        fn(key)
+    elapsed = (time.perf_counter() - started) / len(keys)
+    print("  {:<30} {:8.1f} us/get".format(label, elapsed * 1e6))
+
+
+def run(n_students: int = 300, n_classrooms: int = 20, n_gets: int = 20000):
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        classrooms = [
+            create_classroom("lecturer", "subject {}".format(i), 3600, 900)
+            for i in range(n_classrooms)
+        ]
+        ClassroomDBHandler(pool).create_many(classrooms)
+        students = [
+            create_stud("first{}".format(i), "last", 1, "m") for i in range(n_students)
+        ]
+        enrollments = [
+            create_enrollment(rng.choice(classrooms).id, student.id)
+            for student in students
+        ]
+        StudentDBHandler(pool).register_many(students, enrollments)
+
+        lookups = (
+            ("classroom", ClassroomDBHandler, "get", [c.id for c in classrooms]),
+            ("enrollment", EnrollmentDBHandler, "get", [e.id for e in enrollments]),
+            # with subject names only; the full variant prints its rows
+            ("student", StudentDBHandler, "get_subjects", [s.id for s in students]),
+        )
+        print("{} gets over {} students".format(n_gets, n_students))
+        for name, handler, method, ids in lookups:
+            keys = [rng.choice(ids) for _ in range(n_gets)]
+            cache = ObjectCache(pool)
+            for label, instance in (
+                ("no cache", handler(pool)),
+                ("cached", handler(pool, cache=cache)),
+            ):
+                if method == "get_subjects":
+                    get = functools.partial(instance.get, full_enrollment=False)
+                else:
+                    get = instance.get
+                timed("{}, {}".format(name, label), get, keys)
+            cache.close()
+        pool.close()
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,72 @@
+"""Time to turn a 10k-row list into a response, before and after.
+
+"validated + model_dump" is the old path: ``ResponseTemplate.__init__``
+validated the payload against ``Union[T, list[T]]``, then ``to_json``
+dumped each item to a dict for ``JSONResponse`` and the stdlib encoder.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_response_serialization
+"""
+
+import json
+import time
+import uuid
+
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+from src.model.attendance import Attendance, attendance_from_row
+from src.response import ResponseTemplate
+
+N = 10_000
+REPEAT = 20
+
+
+def old_response(data: list[Attendance]):
+    template = ResponseTemplate.__new__(ResponseTemplate)
+    BaseModel.__init__(template, message="ok", data=data, status_code=200)
+    return JSONResponse(
+        content={
+            "message": template.message,
+            "data": [item.model_dump() for item in template.data],
+        },
+        status_code=template.status_code,
+    )
+
+
+def new_response(data: list[Attendance]):
+    return ResponseTemplate(data, "ok").to_json()
+
+
+def timed(label: str, fn, data: list[Attendance]) -> bytes:
+    body = fn(data).body
+    started = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(data)
+    elapsed = (time.perf_counter() - started) / REPEAT
+    print("{:<26} {:8.2f} ms  {:>9} bytes".format(label, elapsed * 1000, len(body)))
+    return body
+
+
+def run():
+    rows = [
+        (
+            str(uuid.uuid4()),
+            str(uuid.uuid4()),
+            0.0,
+            1715600000.0 + i,
+            ("ontime", "late", "absent")[i % 3],
+            str(uuid.uuid4()),
+        )
+        for i in range(N)
+    ]
+    data = [attendance_from_row(row) for row in rows]
+    print("{} attendance rows".format(N))
+    old = timed("validated + model_dump", old_response, data)
+    new = timed("constructed + to_json", new_response, data)
+    assert json.loads(old) == json.loads(new)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,52 @@
+"""Time to import a roster CSV into an empty and an already loaded database.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_roster_import
+"""
+
+import io
+import os
+import tempfile
+import time
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.roster_import import RosterImporter
+
+
+def roster_csv(n_students: int, n_classes: int = 8, per_student: int = 4) -> str:
+    lines = [
+        "firstname,lastname,generation,gender,subject_name,lecturer_name,"
+        "duration,late_penalty_duration"
+    ]
+    for i in range(n_students):
+        for j in range(per_student):
+            c = (i + j) % n_classes
+            lines.append(
+                "first{0},last{0},1,m,subject {1},lecturer {1},1,15".format(i, c)
+            )
+    return "\n".join(lines) + "\n"
+
+
+def run(n_students: int):
+    data = roster_csv(n_students)
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = ConnectionPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        importer = RosterImporter(pool)
+        for label in ("new", "re-import"):
+            started = time.perf_counter()
+            report = importer.import_csv(io.StringIO(data))
+            elapsed = time.perf_counter() - started
+            print(
+                "{:>6} rows  {:<9}  {:>6} created  {:8.1f} ms".format(
+                    report.rows, label, report.enrollments_created, elapsed * 1000
+                )
+            )
+        pool.close()
+
+
+if __name__ == "__main__":
+    for n in (250, 2500, 10000):
+        run(n)
@@ -0,0 +1,98 @@
+"""Rows per second for validated models vs the compiled row factories.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_row_mapping
+"""
+
+import time
+
+from src.model.attendance import Attendance, attendance_from_row
+from src.model.classroom import Classroom, classroom_from_row
+from src.model.student import Student, student_from_row
+
+N = 200_000
+
+
+def validated_attendance(row):
+    return Attendance(
+        id=row[0],
+        enrollment_id=row[1],
+        last_record=row[2],
+        entry_time=row[3],
+        punctuality=row[4],
+    )
+
+
+def validated_classroom(row):
+    return Classroom(
+        id=row[0],
+        lecturer_name=row[1],
+        subject_name=row[2],
+        duration=row[3],
+        lecture_time=row[4],
+        late_penalty_duration=row[5],
+        record_interval=row[6],
+    )
+
+
+def validated_student(row):
+    return Student(
+        id=row[0],
+        firstname=row[1],
+        lastname=row[2],
+        generation=row[3],
+        gender=row[4],
+        major=row[5],
+    )
+
+
+CASES = [
+    (
+        "attendance",
+        ("3f1c", "9a2b", 0.0, 1715600000.0, "ontime"),
+        validated_attendance,
+        attendance_from_row,
+    ),
+    (
+        "classroom",
+        ("3f1c", "lecturer", "subject", 2, 1715600000.0, 15.0, 300.0),
+        validated_classroom,
+        classroom_from_row,
+    ),
+    (
+        "student",
+        ("3f1c", "john", "doe", 2024, "m", "cs"),
+        validated_student,
+        student_from_row,
+    ),
+]
+
+
+def rate(build, row, dump: bool, repeat: int = 5) -> float:
+    """Best of ``repeat`` runs, to keep scheduler noise out of the ratio."""
+    rows = [row] * N
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        if dump:
+            for r in rows:
+                build(r).model_dump()
+        else:
+            for r in rows:
+                build(r)
+        best = min(best, time.perf_counter() - started)
+    return N / best
+
+
+if __name__ == "__main__":
+    for dump in (False, True):
+        print("build" + (" + model_dump" if dump else ""))
+        for name, row, before, after in CASES:
+            assert before(row).model_dump() == after(row).model_dump()
+            old = rate(before, row, dump)
+            new = rate(after, row, dump)
+            print(
+                "  {:<10} validated {:>9,.0f} rows/s  factory {:>9,.0f} rows/s"
+                "  x{:.2f}".format(name, old, new, new / old)
+            )
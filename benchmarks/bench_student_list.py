@@ -0,0 +1,90 @@
+"""Queries per page and latency of ``GET /students/`` as the student count grows.
+
+Run from the repository root::
+
+    python -m benchmarks.bench_student_list
+"""
+
+import os
+import sqlite3
+import tempfile
+import time
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.pagination import MAX_PAGE_SIZE
+from src.model.student import StudentDBHandler, create_stud
+
+
+class CountingPool(ConnectionPool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.statements = 0
+
+    def _open(self) -> sqlite3.Connection:
+        conn = super()._open()
+        conn.set_trace_callback(self._count)
+        return conn
+
+    def _count(self, statement: str):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements += 1
+
+
+def seed(pool: ConnectionPool, n_students: int, n_classes: int = 5):
+    classrooms = [
+        create_classroom("lecturer {}".format(i), "subject {}".format(i), 1, 15)
+        for i in range(n_classes)
+    ]
+    ClassroomDBHandler(pool).create_many(classrooms)
+
+    students = [
+        create_stud("first{}".format(i), "last{}".format(i), 1, "m")
+        for i in range(n_students)
+    ]
+    StudentDBHandler(pool).register_many(
+        students,
+        [
+            create_enrollment(classrooms[j].id, student.id)
+            for i, student in enumerate(students)
+            for j in range(i % n_classes + 1)
+        ],
+    )
+
+
+def run(n_students: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        pool = CountingPool(os.path.join(tmp, "bench.db"))
+        migrate(pool)
+        seed(pool, n_students)
+
+        handler = StudentDBHandler(pool)
+        pool.statements = 0
+        pages = 0
+        seen = 0
+        cursor = None
+        started = time.perf_counter()
+        while True:
+            page = handler.list_student_attendance_enrollment(
+                cursor=cursor, limit=MAX_PAGE_SIZE
+            )
+            pages += 1
+            seen += len(page.items)
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        elapsed = time.perf_counter() - started
+        assert seen == n_students
+        print(
+            "{:>6} students  {:>3} pages  {:>3} queries/page  {:8.1f} ms".format(
+                n_students, pages, pool.statements // pages, elapsed * 1000
+            )
+        )
+        pool.close()
+
+
+if __name__ == "__main__":
+    for n in (100, 1000, 8000):
+        run(n)
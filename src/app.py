@@ -1,23 +1,46 @@
-import uvicorn
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 
+from src.compression import CompressionMiddleware
 from src.exceptions import init_global_exception_handlers
+from src.migrations import migrate
 from src.route.providers.base import (
-    get_attendance_db,
-    get_classroom_db,
-    get_enrollment_db,
-    get_stats_db,
-    get_student_db,
+    compression,
+    db_executor,
+    db_pool,
+    ingest_queue,
+    object_cache,
+    partitions,
+    roster,
+    scheduler,
+    sessions,
 )
 from src.route.v1.router import init_router
+from src.server import parse_server_args, require_wal, serve
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await ingest_queue.start()
+    await scheduler.start()
+    yield
+    await scheduler.stop()
+    await ingest_queue.stop()
+    db_executor.shutdown()
+    object_cache.close()
+    roster.close()
+    db_pool.close()
 
-app = FastAPI()
+
+app = FastAPI(lifespan=lifespan)
 
 init_router(app.router)
 
+app.add_middleware(CompressionMiddleware, compression=compression)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -29,20 +52,20 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-stud_db = get_student_db()
-attd_db = get_attendance_db()
-class_db = get_classroom_db()
-enroll_db = get_enrollment_db()
-stat_db = get_stats_db()
-
-stud_db.init_table()
-attd_db.init_table()
-class_db.init_table()
-enroll_db.init_table()
-stat_db.init_table()
+migrate(db_pool)
+partitions.recover()
+roster.load()
+sessions.materialize()
 
 init_global_exception_handlers(app)
 
 
 def main() -> None:
-    uvicorn.run("src.app:app", host="0.0.0.0", port=8000, reload=True)
+    settings = parse_server_args()
+    if settings.worker_count() > 1:
+        require_wal(db_pool)
+        # the workers open their own connections; the supervisor keeps none
+        object_cache.close()
+        roster.close()
+        db_pool.close()
+    serve("src.app:app", settings)
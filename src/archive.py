@@ -0,0 +1,409 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Iterator, List
+
+import numpy as np
+from pydantic import BaseModel
+
+from src.cache import bump_versions_internal
+from src.model.attendance import Punctuality
+from src.model.model_exception import NotFoundError
+from src.partitions import AttendancePartitions, Partition
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMAT_VERSION = 1
+
+# punctuality is stored as its index in this tuple
+PUNCTUALITY_CODES = tuple(punctuality.value for punctuality in Punctuality)
+
+DETAIL_COUNTERS = (
+    "absent_count",
+    "absent_with_permission",
+    "present_count",
+    "late_count",
+)
+
+
+class ArchiveMeta(BaseModel):
+    version: int
+    name: str
+    start_time: float
+    end_time: float
+    rows: int
+    enrollments: int
+    students: int
+    classrooms: int
+    created_at: float
+
+
+class ArchiveSummary(BaseModel):
+    rows: int
+    ontime: int
+    late: int
+    absent: int
+    auto: int
+
+
+class ArchivedDetail(BaseModel):
+    student_id: str
+    absent_count: int
+    absent_with_permission: int
+    present_count: int
+    late_count: int
+
+
+def _strings(values: list[str]) -> np.ndarray:
+    if not values:
+        return np.empty(0, dtype="S1")
+    return np.array([value.encode() for value in values], dtype=bytes)
+
+
+def _code(keys: np.ndarray, value: str) -> int | None:
+    """Position of ``value`` in the sorted key column, if it is there."""
+    key = value.encode()
+    index = int(np.searchsorted(keys, key))
+    if index < len(keys) and keys[index] == key:
+        return index
+    return None
+
+
+class ArchivedTerm:
+    """Read-only view over one term's columnar archive.
+
+    Every column is a separate ``.npy`` file opened with ``mmap_mode="r"``,
+    so opening a term costs nothing and a query only pages in the columns it
+    filters on. Ids are dictionary encoded: attendance rows point at the
+    enrollment snapshot by index, enrollments point at the student and
+    classroom key columns, and punctuality is a ``uint8`` code. Attendance is
+    sorted by entry_time, so a time range is two binary searches.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as file:
+            self.meta = ArchiveMeta.model_validate_json(file.read())
+        self._columns: dict[str, np.ndarray] = {}
+
+    def column(self, name: str) -> np.ndarray:
+        array = self._columns.get(name)
+        if array is None:
+            array = np.load(os.path.join(self.path, name + ".npy"), mmap_mode="r")
+            self._columns[name] = array
+        return array
+
+    def select(
+        self,
+        class_id: str | None = None,
+        student_id: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        punctuality: Punctuality | None = None,
+    ) -> np.ndarray:
+        """Indices of the attendance rows matching every given filter."""
+        entry_time = self.column("attendance.entry_time")
+        lo = 0 if start is None else int(np.searchsorted(entry_time, start))
+        hi = len(entry_time) if end is None else int(np.searchsorted(entry_time, end))
+        if lo >= hi:
+            return np.empty(0, dtype=np.int64)
+
+        mask = np.ones(hi - lo, dtype=bool)
+        if class_id is not None or student_id is not None:
+            enrollment = self.column("attendance.enrollment")[lo:hi]
+            for value, keys, link in (
+                (class_id, "classroom.id", "enrollment.classroom"),
+                (student_id, "student.id", "enrollment.student"),
+            ):
+                if value is None:
+                    continue
+                code = _code(self.column(keys), value)
+                if code is None:
+                    return np.empty(0, dtype=np.int64)
+                mask &= self.column(link)[enrollment] == code
+        if punctuality is not None:
+            code = PUNCTUALITY_CODES.index(Punctuality(punctuality).value)
+            mask &= self.column("attendance.punctuality")[lo:hi] == code
+        return np.flatnonzero(mask) + lo
+
+    def rows(self, indices: np.ndarray, batch_size: int = 1000) -> Iterator[tuple]:
+        """Rows in the export column order, decoded ``batch_size`` at a time."""
+        enrollment_ids = self.column("enrollment.id")
+        enrollment_students = self.column("enrollment.student")
+        enrollment_classrooms = self.column("enrollment.classroom")
+        student_ids = self.column("student.id")
+        classroom_ids = self.column("classroom.id")
+        for offset in range(0, len(indices), batch_size):
+            batch = indices[offset : offset + batch_size]
+            enrollment = self.column("attendance.enrollment")[batch]
+            columns = (
+                self.column("attendance.id")[batch].tolist(),
+                enrollment_ids[enrollment].tolist(),
+                student_ids[enrollment_students[enrollment]].tolist(),
+                classroom_ids[enrollment_classrooms[enrollment]].tolist(),
+                self.column("attendance.last_record")[batch].tolist(),
+                self.column("attendance.entry_time")[batch].tolist(),
+                self.column("attendance.punctuality")[batch].tolist(),
+            )
+            for id, en_id, st_id, cl_id, last, entry, punc in zip(*columns):
+                yield (
+                    id.decode(),
+                    en_id.decode(),
+                    st_id.decode(),
+                    cl_id.decode(),
+                    last,
+                    entry,
+                    PUNCTUALITY_CODES[punc],
+                )
+
+    def summary(self, indices: np.ndarray) -> np.ndarray:
+        codes = self.column("attendance.punctuality")[indices]
+        return np.bincount(codes, minlength=len(PUNCTUALITY_CODES))
+
+    def daily(self, indices: np.ndarray) -> dict[str, np.ndarray]:
+        """Punctuality counts per local calendar day of ``entry_time``.
+
+        Timestamps are bucketed by quarter hour first, the finest step any
+        UTC offset takes, so only one ``datetime`` is built per bucket
+        rather than per row.
+        """
+        if not len(indices):
+            return {}
+        entry_time = self.column("attendance.entry_time")[indices]
+        codes = self.column("attendance.punctuality")[indices]
+        buckets, bucket_of = np.unique(entry_time // 900, return_inverse=True)
+        days, day_of_bucket = np.unique(
+            [datetime.fromtimestamp(b * 900).date().isoformat() for b in buckets],
+            return_inverse=True,
+        )
+        counts = np.zeros((len(days), len(PUNCTUALITY_CODES)), dtype=np.int64)
+        np.add.at(counts, (day_of_bucket[bucket_of], codes), 1)
+        return dict(zip(days.tolist(), counts))
+
+    def details(self) -> List[ArchivedDetail]:
+        student_ids = self.column("student.id")
+        students = self.column("detail.student").tolist()
+        counters = [self.column("detail." + name).tolist() for name in DETAIL_COUNTERS]
+        return [
+            ArchivedDetail(
+                student_id=student_ids[code].decode(),
+                **dict(zip(DETAIL_COUNTERS, values)),
+            )
+            for code, *values in zip(students, *counters)
+        ]
+
+
+class ColumnarArchive:
+    """Closed terms converted from SQLite partitions into columnar files.
+
+    ``archive`` turns a closed partition (see ``AttendancePartitions``) into
+    one directory of NumPy columns holding its attendance rows plus snapshots
+    of the enrollments and attendance_detail counters they belong to, then
+    drops the partition's SQLite file. Archived terms are queried here with
+    vectorized filters and are never loaded back into SQLite.
+    """
+
+    def __init__(self, partitions: AttendancePartitions, directory: str | None = None):
+        self.partitions = partitions
+        self.directory = directory or os.path.join(partitions.directory, "archive")
+        self._lock = threading.Lock()
+        self._terms: dict[str, ArchivedTerm] = {}
+
+    def terms(self) -> List[ArchiveMeta]:
+        if not os.path.isdir(self.directory):
+            return []
+        names = sorted(
+            name
+            for name in os.listdir(self.directory)
+            if os.path.exists(os.path.join(self.directory, name, "meta.json"))
+        )
+        return [self.open(name).meta for name in names]
+
+    def open(self, name: str) -> ArchivedTerm:
+        with self._lock:
+            term = self._terms.get(name)
+            if term is None:
+                path = os.path.join(self.directory, name)
+                if os.path.basename(name) != name or not os.path.exists(
+                    os.path.join(path, "meta.json")
+                ):
+                    raise NotFoundError("Archived term {} not found".format(name))
+                term = ArchivedTerm(path)
+                self._terms[name] = term
+            return term
+
+    def _overlapping(self, start: float | None, end: float | None):
+        for meta in self.terms():
+            if (start is None or meta.end_time > start) and (
+                end is None or meta.start_time < end
+            ):
+                yield self.open(meta.name)
+
+    def export(
+        self,
+        class_id: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        student_id: str | None = None,
+        punctuality: Punctuality | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple]:
+        for term in self._overlapping(start, end):
+            indices = term.select(class_id, student_id, start, end, punctuality)
+            yield from term.rows(indices, batch_size)
+
+    def summary(
+        self,
+        class_id: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        student_id: str | None = None,
+    ) -> ArchiveSummary:
+        counts = np.zeros(len(PUNCTUALITY_CODES), dtype=np.int64)
+        for term in self._overlapping(start, end):
+            counts += term.summary(term.select(class_id, student_id, start, end))
+        by_value = dict(zip(PUNCTUALITY_CODES, counts.tolist()))
+        return ArchiveSummary(rows=int(counts.sum()), **by_value)
+
+    def daily(
+        self,
+        class_id: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> dict[str, np.ndarray]:
+        """Punctuality counts per day, indexed like ``PUNCTUALITY_CODES``."""
+        days: dict[str, np.ndarray] = {}
+        for term in self._overlapping(start, end):
+            indices = term.select(class_id, None, start, end)
+            for day, counts in term.daily(indices).items():
+                days[day] = days.get(day, 0) + counts
+        return days
+
+    def details(self, name: str) -> List[ArchivedDetail]:
+        return self.open(name).details()
+
+    def archive(self, partition: Partition) -> ArchiveMeta:
+        """Convert one closed partition and retire its SQLite file.
+
+        The rows are read, written out and the partition marked columnar in
+        one write transaction, so an update or delete of one of its rows,
+        made by this worker or another, cannot land in between and be lost.
+        Writers wait while the term is converted.
+        """
+        pool = self.partitions.pool
+        with pool.writer() as conn:
+            self.partitions.attach(conn, partition)
+            conn.execute("BEGIN IMMEDIATE")
+            rows = conn.execute(
+                """
+                SELECT a.id, a.enrollment_id, e.student_id, e.class_id,
+                       a.last_record, a.entry_time, a.punctuality
+                FROM {} a
+                LEFT JOIN enrollment e ON e.id = a.enrollment_id
+                ORDER BY a.entry_time
+                """.format(
+                    partition.table
+                )
+            ).fetchall()
+            enrollments = {row[1]: (row[2] or "", row[3] or "") for row in rows}
+            details = conn.execute(
+                """
+                SELECT student_id, absent_count, absent_with_permission,
+                       present_count, late_count
+                FROM attendance_detail
+                WHERE student_id IN (SELECT value FROM json_each(?))
+                ORDER BY student_id
+                """,
+                (json.dumps(sorted({pair[0] for pair in enrollments.values()})),),
+            ).fetchall()
+            meta = self._write_term(partition, rows, enrollments, details)
+            conn.execute(
+                "UPDATE attendance_partition SET columnar = 1 WHERE name = ?",
+                (partition.name,),
+            )
+            # its rows are no longer read by the SQLite attendance queries
+            bump_versions_internal(conn, "attendance")
+        # pooled connections would keep the removed file open, and its space
+        # allocated, for as long as they live
+        pool.detach(partition.alias)
+        os.remove(os.path.join(self.partitions.directory, partition.filename))
+        logger.info(
+            "Archived attendance partition %s, %d rows", partition.name, meta.rows
+        )
+        return meta
+
+    def _write_term(
+        self,
+        partition: Partition,
+        rows: list[tuple],
+        enrollments: dict[str, tuple[str, str]],
+        details: list[tuple],
+    ) -> ArchiveMeta:
+        enrollment_ids = sorted(enrollments)
+        student_keys, student_codes = np.unique(
+            _strings([enrollments[en_id][0] for en_id in enrollment_ids]),
+            return_inverse=True,
+        )
+        classroom_keys, classroom_codes = np.unique(
+            _strings([enrollments[en_id][1] for en_id in enrollment_ids]),
+            return_inverse=True,
+        )
+        enrollment_keys = _strings(enrollment_ids)
+        columns = {
+            "attendance.id": _strings([row[0] for row in rows]),
+            "attendance.enrollment": np.searchsorted(
+                enrollment_keys, _strings([row[1] for row in rows])
+            ).astype(np.int32),
+            "attendance.last_record": np.array(
+                [row[4] for row in rows], dtype=np.float64
+            ),
+            "attendance.entry_time": np.array(
+                [row[5] for row in rows], dtype=np.float64
+            ),
+            "attendance.punctuality": np.array(
+                [PUNCTUALITY_CODES.index(row[6]) for row in rows], dtype=np.uint8
+            ),
+            "enrollment.id": enrollment_keys,
+            "enrollment.student": student_codes.astype(np.int32),
+            "enrollment.classroom": classroom_codes.astype(np.int32),
+            "student.id": student_keys,
+            "classroom.id": classroom_keys,
+            "detail.student": np.searchsorted(
+                student_keys, _strings([row[0] for row in details])
+            ).astype(np.int32),
+        }
+        for index, name in enumerate(DETAIL_COUNTERS, start=1):
+            columns["detail." + name] = np.array(
+                [row[index] for row in details], dtype=np.int32
+            )
+
+        meta = ArchiveMeta(
+            version=ARCHIVE_FORMAT_VERSION,
+            name=partition.name,
+            start_time=partition.start_time,
+            end_time=partition.end_time,
+            rows=len(rows),
+            enrollments=len(enrollment_keys),
+            students=len(student_keys),
+            classrooms=len(classroom_keys),
+            created_at=time.time(),
+        )
+        # write next to the final directory and rename it into place, so a
+        # reader never sees a half written term
+        target = os.path.join(self.directory, partition.name)
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name, array in columns.items():
+            np.save(os.path.join(staging, name + ".npy"), array)
+        with open(os.path.join(staging, "meta.json"), "w") as file:
+            file.write(meta.model_dump_json())
+        shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+        with self._lock:
+            self._terms.pop(partition.name, None)
+        return meta
@@ -0,0 +1,275 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any
+
+from pydantic import BaseModel
+
+from src.db import ConnectionPool
+
+# tables whose writes the object cache has to notice, whoever makes them
+VERSIONED_TABLES = ("classroom", "student", "enrollment", "attendance_detail")
+
+TABLE_VERSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS table_version (
+    name TEXT PRIMARY KEY NOT NULL,
+    version INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+TABLE_VERSION_SEED_SQL = """
+INSERT OR IGNORE INTO table_version (name) VALUES {}
+""".format(
+    ", ".join("('{}')".format(table) for table in VERSIONED_TABLES)
+)
+
+
+def bump_versions_internal(conn, *tables: str):
+    """Count one write to each of ``tables`` in the caller's transaction.
+
+    Called once per write statement by the code writing these tables rather
+    than from row triggers, which would double the cost of bulk imports. A
+    table without a row yet starts at version 1.
+    """
+    conn.executemany(
+        """
+        INSERT INTO table_version (name, version) VALUES (?, 1)
+        ON CONFLICT (name) DO UPDATE SET version = version + 1
+        """,
+        [(table,) for table in tables],
+    )
+
+
+class CacheSettings(BaseModel):
+    """Read-through object cache settings.
+
+    Read from the environment with the ``MAS_CACHE_`` prefix, e.g.
+    ``MAS_CACHE_ENABLED=0`` to read every lookup from the database.
+    """
+
+    enabled: bool = True
+    max_entries: int = 4096
+    # an entry is reloaded after this long even if nothing says it changed
+    ttl_seconds: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "CacheSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_CACHE_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class CacheStats(BaseModel):
+    enabled: bool
+    entries: int
+    max_entries: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    # entries dropped because their table changed in another process
+    flushed: int
+    invalidations: int
+
+
+class TableVersionWatch:
+    """Tells which tables were written since the last look, by anyone.
+
+    ``PRAGMA data_version`` on a dedicated connection changes whenever
+    another connection, in this process or another, commits; only then are
+    the ``table_version`` counters read and compared. Not thread safe: the
+    owner calls it under its own lock.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.versions: dict[str, int] = {}
+        self._conn: sqlite3.Connection | None = None
+        self._data_version: int | None = None
+
+    def changed(self) -> set[str]:
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version:
+            return set()
+        self._data_version = data_version
+        versions = _table_versions(self._conn)
+        changed = {
+            table
+            for table, version in versions.items()
+            if self.versions.get(table) != version
+        }
+        self.versions = versions
+        return changed
+
+    def advance(self, conn: sqlite3.Connection, tables: tuple[str, ...]):
+        """Take this process's own write to ``tables`` as already seen.
+
+        ``conn`` is the writer the write, with one version bump per table,
+        was just committed on, and is still held. A table whose version moved
+        by exactly one was written by nobody else meanwhile, so ``changed``
+        will not report it; any other table still shows up there.
+        """
+        versions = _table_versions(conn)
+        for table in tables:
+            known = self.versions.get(table)
+            version = versions.get(table)
+            if version is not None and known is not None and version == known + 1:
+                self.versions[table] = version
+
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+_MISSING = object()
+
+
+class ObjectCache:
+    """Bounded LRU cache of handler lookups with a TTL.
+
+    Each entry names the tables it was read from, the one it is keyed on
+    first. Handlers drop the entries they write to after committing
+    (``written``), so this process never serves its own stale writes.
+    Writes made anywhere else, other workers included, are noticed through
+    ``table_version``, which every write bumps (``bump_versions_internal``):
+    before each lookup a ``TableVersionWatch`` says which tables moved
+    without this process knowing, and their entries are dropped.
+    """
+
+    def __init__(self, pool: ConnectionPool, settings: CacheSettings | None = None):
+        self.pool = pool
+        self.settings = settings or CacheSettings()
+        self._lock = threading.Lock()
+        # key -> (value, expires at, tables)
+        self._entries: OrderedDict[Hashable, tuple[Any, float, tuple[str, ...]]] = (
+            OrderedDict()
+        )
+        self._watch = TableVersionWatch(pool.path)
+        # bumped on every invalidation, so a load racing with a write is not
+        # cached
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+        self._flushed = 0
+        self._invalidations = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    def get(
+        self, key: Hashable, load: Callable[[], Any], tables: tuple[str, ...]
+    ) -> Any:
+        """Cached value for ``key``, calling ``load`` on a miss.
+
+        Values are shared between callers and must not be mutated.
+        """
+        if not self.enabled:
+            return load()
+        now = time.monotonic()
+        with self._lock:
+            self._check_versions()
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING:
+                if entry[1] > now:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return entry[0]
+                del self._entries[key]
+                self._expirations += 1
+            self._misses += 1
+            generation = self._generation
+
+        value = load()
+        with self._lock:
+            if generation == self._generation:
+                self._entries[key] = (value, now + self.settings.ttl_seconds, tables)
+                while len(self._entries) > self.settings.max_entries:
+                    self._entries.popitem(last=False)
+                    self._evictions += 1
+        return value
+
+    def written(self, conn: sqlite3.Connection, table: str, keys: list[Hashable]):
+        """Drop what a write this process just committed to ``table`` changed.
+
+        ``keys`` are the entries of the rows written and ``conn`` the writer
+        the write, and its one version bump, were committed on. Entries that
+        only join ``table`` are dropped too. If the table version moved by
+        exactly one, nobody else wrote to the table meanwhile and the other
+        entries read from it stay cached.
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if self._entries.pop(key, _MISSING) is not _MISSING:
+                    self._invalidations += 1
+            joined = [
+                key
+                for key, (_, _, tables) in self._entries.items()
+                if table in tables[1:]
+            ]
+            for key in joined:
+                del self._entries[key]
+            self._invalidations += len(joined)
+            self._watch.advance(conn, (table,))
+
+    def versions(self, tables: tuple[str, ...]) -> tuple[int, ...]:
+        """Current write counts of ``tables``; cheap while nothing commits."""
+        with self._lock:
+            self._check_versions()
+            return tuple(self._watch.versions.get(table, 0) for table in tables)
+
+    def clear(self):
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                enabled=self.enabled,
+                entries=len(self._entries),
+                max_entries=self.settings.max_entries,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                flushed=self._flushed,
+                invalidations=self._invalidations,
+            )
+
+    def close(self):
+        with self._lock:
+            self._watch.close()
+
+    def _check_versions(self):
+        # called with the lock held
+        changed = self._watch.changed()
+        if not changed:
+            return
+        self._generation += 1
+        stale = [
+            key
+            for key, (_, _, tables) in self._entries.items()
+            if changed.intersection(tables)
+        ]
+        for key in stale:
+            del self._entries[key]
+        self._flushed += len(stale)
+
+
+def _table_versions(conn: sqlite3.Connection) -> dict[str, int]:
+    return dict(conn.execute("SELECT name, version FROM table_version"))
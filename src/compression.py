@@ -0,0 +1,333 @@
+import asyncio
+import os
+import threading
+import time
+import zlib
+
+from pydantic import BaseModel
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+# types worth compressing; everything else (images, archives) is sent as is
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/x-ndjson",
+    "text/",
+)
+
+
+class CompressionSettings(BaseModel):
+    """Response compression settings.
+
+    Read from the environment with the ``MAS_COMPRESSION_`` prefix, e.g.
+    ``MAS_COMPRESSION_GZIP_LEVEL=9`` or ``MAS_COMPRESSION_ENABLED=0``.
+    """
+
+    enabled: bool = True
+    # bodies smaller than this are sent uncompressed; a gzip header and the
+    # CPU time cost more than they save
+    minimum_size: int = 1024
+    gzip_level: int = 6
+    brotli_level: int = 5
+    # streamed responses (the exports) are passed through unless this is
+    # set, since they are usually saved to a file and compressing them
+    # chunk by chunk compresses worse
+    compress_streams: bool = False
+    # bodies at least this large are compressed on a worker thread instead
+    # of the event loop
+    offload_size: int = 256 * 1024
+
+    @classmethod
+    def from_env(cls) -> "CompressionSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_COMPRESSION_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class CompressionStats(BaseModel):
+    enabled: bool
+    encodings: list[str]
+    gzip_level: int
+    brotli_level: int
+    # responses that were compressed, per encoding
+    gzip: int
+    br: int
+    # compressible responses sent as is: below minimum_size, or streamed
+    too_small: int
+    streams_skipped: int
+    bytes_in: int
+    bytes_out: int
+    bytes_saved: int
+    # CPU time spent in the compressors
+    cpu_seconds: float
+
+
+class ResponseCompression:
+    """Content negotiation, compressors and counters for compressed responses.
+
+    Shared by every request through ``CompressionMiddleware``; the counters
+    are updated from the event loop and from the threads large bodies are
+    compressed on.
+    """
+
+    def __init__(self, settings: CompressionSettings | None = None):
+        self.settings = settings or CompressionSettings()
+        self._lock = threading.Lock()
+        self._compressed = {"gzip": 0, "br": 0}
+        self._too_small = 0
+        self._streams_skipped = 0
+        self._bytes_in = 0
+        self._bytes_out = 0
+        self._cpu_time = 0.0
+
+    @property
+    def encodings(self) -> tuple[str, ...]:
+        """Encodings offered, most preferred first."""
+        return ("br", "gzip") if brotli is not None else ("gzip",)
+
+    def negotiate(self, accept_encoding: str) -> str | None:
+        """Best offered encoding the client accepts, or None for identity."""
+        weights: dict[str, float] = {}
+        for part in accept_encoding.split(","):
+            coding, _, params = part.partition(";")
+            coding = coding.strip().lower()
+            if not coding:
+                continue
+            weight = 1.0
+            params = params.strip()
+            if params.startswith("q="):
+                try:
+                    weight = float(params[2:])
+                except ValueError:
+                    weight = 0.0
+            weights[coding] = weight
+        best, best_weight = None, 0.0
+        for coding in self.encodings:
+            weight = weights.get(coding, weights.get("*", 0.0))
+            # ties go to the earlier, preferred encoding
+            if weight > best_weight:
+                best, best_weight = coding, weight
+        return best
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        started = time.thread_time()
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.settings.brotli_level)
+        else:
+            compressor = zlib.compressobj(self.settings.gzip_level, wbits=31)
+            compressed = compressor.compress(body) + compressor.flush()
+        self._count(encoding, len(body), len(compressed), started)
+        return compressed
+
+    def compressor(self, encoding: str) -> "StreamCompressor":
+        return StreamCompressor(self, encoding)
+
+    def skipped(self, streamed: bool):
+        with self._lock:
+            if streamed:
+                self._streams_skipped += 1
+            else:
+                self._too_small += 1
+
+    def stats(self) -> CompressionStats:
+        with self._lock:
+            return CompressionStats(
+                enabled=self.settings.enabled,
+                encodings=list(self.encodings),
+                gzip_level=self.settings.gzip_level,
+                brotli_level=self.settings.brotli_level,
+                gzip=self._compressed["gzip"],
+                br=self._compressed["br"],
+                too_small=self._too_small,
+                streams_skipped=self._streams_skipped,
+                bytes_in=self._bytes_in,
+                bytes_out=self._bytes_out,
+                bytes_saved=self._bytes_in - self._bytes_out,
+                cpu_seconds=self._cpu_time,
+            )
+
+    def _count(self, encoding: str | None, size: int, compressed: int, started: float):
+        elapsed = time.thread_time() - started
+        with self._lock:
+            if encoding is not None:
+                self._compressed[encoding] += 1
+            self._bytes_in += size
+            self._bytes_out += compressed
+            self._cpu_time += elapsed
+
+
+class StreamCompressor:
+    """Compresses a streamed body chunk by chunk.
+
+    Each chunk is flushed so the client can decode what it has received so
+    far; the response is counted once, when it is finished.
+    """
+
+    def __init__(self, compression: ResponseCompression, encoding: str):
+        self.compression = compression
+        self.encoding = encoding
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=compression.settings.brotli_level)
+        else:
+            self._zlib = zlib.compressobj(compression.settings.gzip_level, wbits=31)
+        self._counted = False
+
+    def compress(self, chunk: bytes, last: bool) -> bytes:
+        started = time.thread_time()
+        if self.encoding == "br":
+            out = self._brotli.process(chunk)
+            out += self._brotli.finish() if last else self._brotli.flush()
+        else:
+            out = self._zlib.compress(chunk)
+            out += self._zlib.flush(zlib.Z_FINISH if last else zlib.Z_SYNC_FLUSH)
+        # counted as one response, on the first chunk
+        encoding = None if self._counted else self.encoding
+        self._counted = True
+        self.compression._count(encoding, len(chunk), len(out), started)
+        return out
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing response bodies the client can decode.
+
+    A buffered response (one body message, as every ``to_json()`` route
+    sends) is compressed whole when it is at least ``minimum_size`` bytes,
+    with gzip or brotli as negotiated from ``Accept-Encoding``. Streamed
+    responses are left alone unless ``compress_streams`` is set.
+    Responses that are already encoded or not text are passed through.
+    """
+
+    def __init__(self, app, compression: ResponseCompression):
+        self.app = app
+        self.compression = compression
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.compression.settings.enabled:
+            await self.app(scope, receive, send)
+            return
+        accept = ""
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept = value.decode("latin-1")
+                break
+        encoding = self.compression.negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _Responder(self.compression, encoding, send))
+
+
+class _Responder:
+    # holds back the response start until the first body message says
+    # whether the body is buffered or streamed, and how large it is
+
+    def __init__(self, compression: ResponseCompression, encoding: str, send):
+        self.compression = compression
+        self.settings = compression.settings
+        self.encoding = encoding
+        self.send = send
+        self.start = None
+        self.stream: StreamCompressor | None = None
+        self.passthrough = False
+
+    async def __call__(self, message):
+        if self.passthrough:
+            await self.send(message)
+            return
+        if message["type"] == "http.response.start":
+            if _compressible(message):
+                self.start = message
+            else:
+                self.passthrough = True
+                await self.send(message)
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more = message.get("more_body", False)
+        if self.stream is not None:
+            await self.send(
+                {
+                    "type": "http.response.body",
+                    "body": self.stream.compress(body, not more),
+                    "more_body": more,
+                }
+            )
+            return
+
+        start, self.start = self.start, None
+        headers = _Headers(start)
+        headers.add_vary()
+        if more:
+            if not self.settings.compress_streams:
+                self.compression.skipped(streamed=True)
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+            self.stream = self.compression.compressor(self.encoding)
+            headers.remove(b"content-length")
+            headers.set(b"content-encoding", self.encoding)
+            await self.send(start)
+            await self(message)
+            return
+
+        if len(body) < self.settings.minimum_size:
+            self.compression.skipped(streamed=False)
+            await self.send(start)
+            await self.send(message)
+            return
+        if len(body) >= self.settings.offload_size:
+            loop = asyncio.get_running_loop()
+            body = await loop.run_in_executor(
+                None, self.compression.compress, body, self.encoding
+            )
+        else:
+            body = self.compression.compress(body, self.encoding)
+        headers.set(b"content-length", str(len(body)))
+        headers.set(b"content-encoding", self.encoding)
+        await self.send(start)
+        await self.send({"type": "http.response.body", "body": body})
+
+
+def _compressible(start) -> bool:
+    if start["status"] < 200 or start["status"] in (204, 304):
+        return False
+    content_type = b""
+    for name, value in start.get("headers", ()):
+        name = name.lower()
+        if name == b"content-encoding":
+            return False
+        if name == b"content-type":
+            content_type = value
+    return content_type.decode("latin-1").startswith(COMPRESSIBLE_TYPES)
+
+
+class _Headers:
+    # edits the raw header list of a response start message in place
+
+    def __init__(self, start):
+        self.raw = start["headers"] = list(start.get("headers", ()))
+
+    def remove(self, name: bytes):
+        self.raw[:] = [(k, v) for k, v in self.raw if k.lower() != name]
+
+    def set(self, name: bytes, value: str):
+        self.remove(name)
+        self.raw.append((name, value.encode("latin-1")))
+
+    def add_vary(self):
+        for i, (name, value) in enumerate(self.raw):
+            if name.lower() == b"vary":
+                if b"accept-encoding" not in value.lower():
+                    self.raw[i] = (name, value + b", Accept-Encoding")
+                return
+        self.raw.append((b"vary", b"Accept-Encoding"))
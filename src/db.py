@@ -1,5 +1,17 @@
+import asyncio
+import functools
 import os
+import queue
 import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Iterator
+
+from pydantic import BaseModel
+
+from src.model.model_exception import DatabaseConnectionError
 
 
 def init_db_root():
@@ -25,17 +37,293 @@ def open_db():
     return conn
 
 
-conn = open_db()
+class DatabaseSettings(BaseModel):
+    """Connection pool size and PRAGMAs applied to every pooled connection.
+
+    Every field can be overridden from the environment with the ``MAS_DB_``
+    prefix, e.g. ``MAS_DB_POOL_SIZE=8`` or ``MAS_DB_SYNCHRONOUS=FULL``.
+    """
+
+    pool_size: int = 4
+    pool_timeout: float = 10.0
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    # negative values are KiB, positive values are pages
+    cache_size: int = -20000
+    mmap_size: int = 256 * 1024 * 1024
+    temp_store: str = "MEMORY"
+    busy_timeout: int = 5000
+    # threads running blocking sqlite calls for the async routes; one per
+    # reader connection plus one for the writer
+    executor_workers: int = 5
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_DB_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class PoolStats(BaseModel):
+    pool_size: int
+    opened: int
+    idle: int
+    hits: int
+    misses: int
+    waits: int
+    wait_time: float
+    writer_waits: int
+    writer_wait_time: float
+
+
+class ConnectionPool:
+    """Bounded pool of reader connections plus one dedicated writer.
+
+    Readers are handed out from a queue and created lazily up to
+    ``pool_size``; once that many are open, borrowers block until one is
+    returned. Writes are serialized through a single connection guarded by a
+    lock, which matches SQLite's one-writer model and lets WAL readers carry
+    on while a write is in progress.
+    """
+
+    def __init__(self, path: str, settings: DatabaseSettings | None = None):
+        self.path = path
+        self.settings = settings or DatabaseSettings()
+        self._idle: queue.LifoQueue[sqlite3.Connection] = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._hits = 0
+        self._misses = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        # not reentrant: a writer() nested in another on the same thread
+        # would share its transaction, and the inner commit would commit the
+        # outer block's writes half way through
+        self._writer_lock = threading.Lock()
+        self._writer_owner: int | None = None
+        self._writer_waits = 0
+        self._writer_wait_time = 0.0
+        self._writer: sqlite3.Connection | None = None
+        self._closed = False
+        # readers handed out, and aliases to detach from each when returned
+        self._borrowed: set[sqlite3.Connection] = set()
+        self._detach_on_release: dict[sqlite3.Connection, set[str]] = {}
+
+    def _open(self) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(
+                self.path,
+                check_same_thread=False,
+                timeout=self.settings.busy_timeout / 1000,
+            )
+        except sqlite3.Error as e:
+            raise DatabaseConnectionError(str(e))
+
+        s = self.settings
+        conn.execute("PRAGMA journal_mode = {}".format(s.journal_mode))
+        conn.execute("PRAGMA synchronous = {}".format(s.synchronous))
+        conn.execute("PRAGMA cache_size = {}".format(int(s.cache_size)))
+        conn.execute("PRAGMA mmap_size = {}".format(int(s.mmap_size)))
+        conn.execute("PRAGMA temp_store = {}".format(s.temp_store))
+        conn.execute("PRAGMA busy_timeout = {}".format(int(s.busy_timeout)))
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise DatabaseConnectionError("Connection pool is closed")
+
+        try:
+            conn = self._idle.get_nowait()
+            with self._lock:
+                self._hits += 1
+                self._borrowed.add(conn)
+            return conn
+        except queue.Empty:
+            pass
+
+        with self._lock:
+            can_open = self._opened < self.settings.pool_size
+            if can_open:
+                self._opened += 1
+                self._misses += 1
+        if can_open:
+            try:
+                conn = self._open()
+            except Exception:
+                with self._lock:
+                    self._opened -= 1
+                raise
+            with self._lock:
+                self._borrowed.add(conn)
+            return conn
+
+        started = time.perf_counter()
+        try:
+            conn = self._idle.get(timeout=self.settings.pool_timeout)
+        except queue.Empty:
+            raise DatabaseConnectionError("Timed out waiting for a database connection")
+        with self._lock:
+            self._waits += 1
+            self._wait_time += time.perf_counter() - started
+            self._borrowed.add(conn)
+        return conn
+
+    def _release(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            self._borrowed.discard(conn)
+            aliases = self._detach_on_release.pop(conn, ())
+        for alias in aliases:
+            detach_internal(conn, alias)
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def reader(self) -> Iterator[sqlite3.Connection]:
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    @contextmanager
+    def writer(self) -> Iterator[sqlite3.Connection]:
+        if self._writer_owner == threading.get_ident():
+            raise RuntimeError("writer() is already held by this thread")
+        started = time.perf_counter()
+        if not self._writer_lock.acquire(blocking=False):
+            self._writer_lock.acquire()
+            self._writer_waits += 1
+            self._writer_wait_time += time.perf_counter() - started
+        self._writer_owner = threading.get_ident()
+        try:
+            if self._closed:
+                raise DatabaseConnectionError("Connection pool is closed")
+            if self._writer is None:
+                self._writer = self._open()
+            conn = self._writer
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+        finally:
+            self._writer_owner = None
+            self._writer_lock.release()
+
+    def detach(self, alias: str):
+        """Detach the attached database ``alias`` from every connection.
+
+        Call it before removing the attached file. The writer and the idle
+        readers detach it right away; readers that are checked out detach it
+        when they are returned.
+        """
+        with self._writer_lock:
+            if self._writer is not None:
+                detach_internal(self._writer, alias)
+            idle = []
+            with self._lock:
+                for conn in self._borrowed:
+                    self._detach_on_release.setdefault(conn, set()).add(alias)
+                while True:
+                    try:
+                        idle.append(self._idle.get_nowait())
+                    except queue.Empty:
+                        break
+            for conn in idle:
+                try:
+                    detach_internal(conn, alias)
+                finally:
+                    self._idle.put(conn)
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                pool_size=self.settings.pool_size,
+                opened=self._opened,
+                idle=self._idle.qsize(),
+                hits=self._hits,
+                misses=self._misses,
+                waits=self._waits,
+                wait_time=self._wait_time,
+                writer_waits=self._writer_waits,
+                writer_wait_time=self._writer_wait_time,
+            )
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+
+def detach_internal(conn: sqlite3.Connection, alias: str):
+    attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+    if alias in attached:
+        conn.execute("DETACH DATABASE {}".format(alias))
+
+
+def create_db_executor(settings: DatabaseSettings) -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(
+        max_workers=settings.executor_workers, thread_name_prefix="mas-db"
+    )
+
+
+class AsyncDBHandler:
+    """Expose a blocking handler to ``async def`` routes.
+
+    Every method call is shipped to the dedicated database executor, so
+    sqlite work never runs on the event loop and never competes with
+    Starlette's shared threadpool. The wrapped handler stays reachable as
+    ``handler`` for code that needs it synchronously.
+    """
+
+    def __init__(self, handler: Any, executor: ThreadPoolExecutor):
+        self.handler = handler
+        self.executor = executor
+
+    def __getattr__(self, name: str):
+        attr = getattr(self.handler, name)
+        if not callable(attr):
+            return attr
+
+        async def call(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self.executor, functools.partial(attr, *args, **kwargs)
+            )
 
+        return call
 
-# mapper = AttendanceMapper(conn)
-# mapper.init_table()
-# mapper.insert(
-#     create_attd(
-#         name="test", classroom="test", last_record=0, entry_time=0, subject="test"
-#     )
-# )
-# press = mapper.list()
-# res = mapper.get(press[0].id)
+    async def stream(self, iterator: Iterator) -> AsyncIterator:
+        """Drive a blocking iterator on the executor, one item per hop.
 
-# print(press, res)
+        The client sets the pace, so ``iterator`` should not hold a pooled
+        connection between items; see ``AttendanceDBHandler.export``.
+        """
+        loop = asyncio.get_running_loop()
+        done = object()
+        try:
+            while True:
+                item = await loop.run_in_executor(self.executor, next, iterator, done)
+                if item is done:
+                    break
+                yield item
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
@@ -2,7 +2,7 @@ import uvicorn
 from fastapi import APIRouter, FastAPI, HTTPException, Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 
 from src.model.model_exception import (
     DatabaseConnectionError,
@@ -10,6 +10,7 @@ from src.model.model_exception import (
     InvalidQueryError,
     NotFoundError,
 )
+from src.route.providers.conditional import NotModified
 
 
 def init_global_exception_handlers(app: FastAPI):
@@ -43,6 +44,11 @@ def init_global_exception_handlers(app: FastAPI):
             content={"message": exc.detail, "type": "NotFoundError"},
         )
 
+    # A conditional GET whose data has not changed since the client's copy
+    @app.exception_handler(NotModified)
+    async def not_modified_exception_handler(request: Request, exc: NotModified):
+        return Response(status_code=304, headers={"ETag": exc.etag})
+
     # Define global exception handler for DatabaseConnectionError
     @app.exception_handler(DatabaseConnectionError)
     async def database_connection_exception_handler(
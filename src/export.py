@@ -0,0 +1,62 @@
+import csv
+import io
+import json
+from enum import Enum
+from typing import Iterable, Iterator
+
+EXPORT_COLUMNS = (
+    "id",
+    "enrollment_id",
+    "student_id",
+    "class_id",
+    "last_record",
+    "entry_time",
+    "punctuality",
+)
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
+
+    def __str__(self):
+        return self.value
+
+    @property
+    def media_type(self) -> str:
+        if self == ExportFormat.CSV:
+            return "text/csv"
+        return "application/x-ndjson"
+
+
+def to_ndjson(rows: Iterable[tuple], flush_every: int = 500) -> Iterator[str]:
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(dict(zip(EXPORT_COLUMNS, row))))
+        if len(buffer) >= flush_every:
+            yield "\n".join(buffer) + "\n"
+            buffer.clear()
+    if buffer:
+        yield "\n".join(buffer) + "\n"
+
+
+def to_csv(rows: Iterable[tuple], flush_every: int = 500) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_every:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def encode_rows(rows: Iterable[tuple], fmt: ExportFormat) -> Iterator[str]:
+    if fmt == ExportFormat.CSV:
+        return to_csv(rows)
+    return to_ndjson(rows)
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from src.db import ConnectionPool
+from src.model.attendance import Attendance, insert_attendances_internal
+from src.model.attendance_detail import (
+    enrolled_students_internal,
+    uncache_counters_internal,
+)
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+
+
+class IngestSettings(BaseModel):
+    """Group-commit settings for attendance ingest.
+
+    Read from the environment with the ``MAS_INGEST_`` prefix, e.g.
+    ``MAS_INGEST_ENABLED=1`` to turn the queue on.
+    """
+
+    enabled: bool = False
+    # flush when this many rows are waiting ...
+    max_batch: int = 500
+    # ... or when the oldest waiting row is this old
+    flush_interval_ms: float = 20.0
+
+    @classmethod
+    def from_env(cls) -> "IngestSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_INGEST_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class IngestStats(BaseModel):
+    enabled: bool
+    pending: int
+    flushes: int
+    rows: int
+    last_batch_size: int
+    max_batch_size: int
+    avg_batch_size: float
+    last_flush_ms: float
+    avg_flush_ms: float
+
+
+class AttendanceIngestQueue:
+    """Write-behind queue that group-commits attendance rows.
+
+    Callers hand in already validated and scored rows and await a future that
+    resolves once the rows are committed; the attendance_detail counters are
+    updated by triggers in the same transaction. A single writer task drains
+    the queue and commits everything that arrived within ``flush_interval_ms``
+    (or ``max_batch`` rows) in one transaction. If a group fails, each
+    caller's rows are retried on their own so one bad request cannot fail its
+    neighbours.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        executor: ThreadPoolExecutor,
+        settings: IngestSettings | None = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.executor = executor
+        self.settings = settings or IngestSettings()
+        self.cache = cache
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._pending = 0
+        self._flushes = 0
+        self._rows = 0
+        self._last_batch_size = 0
+        self._max_batch_size = 0
+        self._last_flush = 0.0
+        self._flush_time = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.settings.enabled
+
+    async def start(self):
+        if not self.enabled or self._task is not None:
+            return
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def submit(self, attendance_list: list[Attendance]) -> list[Attendance]:
+        if self._task is None:
+            raise RuntimeError("Attendance ingest queue is not running")
+        future = asyncio.get_running_loop().create_future()
+        self._pending += len(attendance_list)
+        await self._queue.put((attendance_list, future))
+        return await future
+
+    def _write(self, attendance_list: list[Attendance]):
+        with self.pool.writer() as conn:
+            insert_attendances_internal(conn, attendance_list)
+            conn.commit()
+            if self.cache is not None:
+                uncache_counters_internal(
+                    conn,
+                    self.cache,
+                    enrolled_students_internal(
+                        conn, [row.enrollment_id for row in attendance_list]
+                    ),
+                )
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        interval = self.settings.flush_interval_ms / 1000
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            size = len(item[0])
+            deadline = loop.time() + interval
+            while size < self.settings.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+                size += len(item[0])
+            await self._flush(batch, size)
+
+    async def _flush(self, batch: list, size: int):
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        rows = [
+            attendance for attendance_list, _ in batch for attendance in attendance_list
+        ]
+        try:
+            await loop.run_in_executor(self.executor, self._write, rows)
+            for attendance_list, future in batch:
+                if not future.done():
+                    future.set_result(attendance_list)
+        except Exception:
+            for attendance_list, future in batch:
+                try:
+                    await loop.run_in_executor(
+                        self.executor, self._write, attendance_list
+                    )
+                    if not future.done():
+                        future.set_result(attendance_list)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+
+        elapsed = time.perf_counter() - started
+        self._pending -= size
+        self._flushes += 1
+        self._rows += size
+        self._last_batch_size = size
+        self._max_batch_size = max(self._max_batch_size, size)
+        self._last_flush = elapsed
+        self._flush_time += elapsed
+
+    def stats(self) -> IngestStats:
+        return IngestStats(
+            enabled=self.enabled,
+            pending=self._pending,
+            flushes=self._flushes,
+            rows=self._rows,
+            last_batch_size=self._last_batch_size,
+            max_batch_size=self._max_batch_size,
+            avg_batch_size=self._rows / self._flushes if self._flushes else 0.0,
+            last_flush_ms=self._last_flush * 1000,
+            avg_flush_ms=(
+                self._flush_time / self._flushes * 1000 if self._flushes else 0.0
+            ),
+        )
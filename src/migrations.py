@@ -0,0 +1,240 @@
+import logging
+import sqlite3
+
+from pydantic import BaseModel
+
+from src.cache import TABLE_VERSION_SEED_SQL, TABLE_VERSION_TABLE_SQL
+from src.db import ConnectionPool
+from src.model.attendance import (
+    ATTENDANCE_SESSION_COLUMN_SQL,
+    ATTENDANCE_SESSION_INDEX_SQL,
+    ATTENDANCE_TABLE_SQL,
+)
+from src.model.attendance_detail import (
+    ATTENDANCE_DETAIL_ARCHIVE_DELETE_TRIGGER_SQL,
+    ATTENDANCE_DETAIL_ROLLOVER_DELETE_TRIGGER_SQL,
+    ATTENDANCE_DETAIL_TABLE_SQL,
+    ATTENDANCE_DETAIL_TRIGGERS_SQL,
+)
+from src.model.classroom import CLASSROOM_TABLE_SQL
+from src.model.enrollments import ENROLLMENT_TABLE_SQL
+from src.model.lecture_session import (
+    LECTURE_SESSION_SWEPT_COLUMN_SQL,
+    LECTURE_SESSION_TABLE_SQL,
+)
+from src.model.student import STUDENT_TABLE_SQL
+from src.model.student_name import (
+    STUDENT_NAME_BACKFILL_SQL,
+    STUDENT_NAME_FTS_SQL,
+    STUDENT_NAME_LOWER_INDEX_SQL,
+    STUDENT_NAME_TABLE_SQL,
+    STUDENT_NAME_TRIGGERS_SQL,
+)
+from src.partitions import (
+    ATTENDANCE_PARTITION_COLUMNAR_SQL,
+    ATTENDANCE_PARTITION_TABLE_SQL,
+    ATTENDANCE_ROLLOVER_TABLE_SQL,
+)
+from src.scheduler import SCHEDULED_JOB_TABLE_SQL
+from src.stats import ATTENDANCE_CLASS_STATS_INDEX_SQL
+
+logger = logging.getLogger(__name__)
+
+
+class Migration(BaseModel):
+    version: int
+    name: str
+    statements: list[str]
+
+
+# Append new migrations to the end with the next version number. Never edit
+# or reorder a migration that has already shipped; every statement must be
+# safe to re-run (IF NOT EXISTS) in case a previous boot died half way.
+MIGRATIONS: list[Migration] = [
+    Migration(
+        version=1,
+        name="initial tables",
+        statements=[
+            STUDENT_TABLE_SQL,
+            CLASSROOM_TABLE_SQL,
+            ENROLLMENT_TABLE_SQL,
+            ATTENDANCE_TABLE_SQL,
+            ATTENDANCE_DETAIL_TABLE_SQL,
+        ],
+    ),
+    Migration(
+        version=2,
+        name="enrollment lookup indexes",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_enrollment_class_id"
+            " ON enrollment(class_id)",
+            "CREATE INDEX IF NOT EXISTS idx_enrollment_student_id"
+            " ON enrollment(student_id)",
+        ],
+    ),
+    Migration(
+        version=3,
+        name="attendance lookup indexes",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_attendance_enrollment_id"
+            " ON attendance(enrollment_id)",
+            "CREATE INDEX IF NOT EXISTS idx_attendance_detail_student_id"
+            " ON attendance_detail(student_id)",
+        ],
+    ),
+    Migration(
+        version=4,
+        name="student name index",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_student_name"
+            " ON student(firstname, lastname)",
+        ],
+    ),
+    Migration(
+        version=5,
+        name="enrollment keyset pagination index",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_enrollment_class_id_id"
+            " ON enrollment(class_id, id)",
+            "DROP INDEX IF EXISTS idx_enrollment_class_id",
+        ],
+    ),
+    Migration(
+        version=6,
+        name="attendance entry time index",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_attendance_entry_time"
+            " ON attendance(entry_time)",
+        ],
+    ),
+    Migration(
+        version=7,
+        name="attendance detail counter triggers",
+        statements=ATTENDANCE_DETAIL_TRIGGERS_SQL,
+    ),
+    Migration(
+        version=8,
+        name="attendance partition catalog",
+        statements=[
+            ATTENDANCE_PARTITION_TABLE_SQL,
+            "DROP TRIGGER IF EXISTS attendance_detail_count_delete",
+            ATTENDANCE_DETAIL_ARCHIVE_DELETE_TRIGGER_SQL,
+        ],
+    ),
+    Migration(
+        version=9,
+        name="columnar archive flag",
+        statements=[ATTENDANCE_PARTITION_COLUMNAR_SQL],
+    ),
+    Migration(
+        version=10,
+        name="enrollment student/class index",
+        statements=[
+            "CREATE INDEX IF NOT EXISTS idx_enrollment_student_id_class_id"
+            " ON enrollment(student_id, class_id)",
+            "DROP INDEX IF EXISTS idx_enrollment_student_id",
+        ],
+    ),
+    Migration(
+        version=11,
+        name="lecture sessions",
+        statements=[
+            LECTURE_SESSION_TABLE_SQL,
+            "CREATE UNIQUE INDEX IF NOT EXISTS idx_lecture_session_class_start"
+            " ON lecture_session(class_id, start_time)",
+            ATTENDANCE_SESSION_COLUMN_SQL,
+            ATTENDANCE_SESSION_INDEX_SQL,
+        ],
+    ),
+    Migration(
+        version=12,
+        name="student name search",
+        statements=[
+            STUDENT_NAME_TABLE_SQL,
+            STUDENT_NAME_FTS_SQL,
+            *STUDENT_NAME_TRIGGERS_SQL,
+            STUDENT_NAME_BACKFILL_SQL,
+            STUDENT_NAME_LOWER_INDEX_SQL,
+        ],
+    ),
+    Migration(
+        version=13,
+        name="absent sweep",
+        statements=[
+            LECTURE_SESSION_SWEPT_COLUMN_SQL,
+            # sessions that ended before the sweep existed are not swept
+            "UPDATE lecture_session SET swept_at = end_time"
+            " WHERE end_time <= CAST(strftime('%s', 'now') AS REAL)",
+            "CREATE INDEX IF NOT EXISTS idx_lecture_session_unswept"
+            " ON lecture_session(end_time) WHERE swept_at IS NULL",
+            "CREATE INDEX IF NOT EXISTS idx_attendance_enrollment_entry"
+            " ON attendance(enrollment_id, entry_time)",
+            "DROP INDEX IF EXISTS idx_attendance_enrollment_id",
+        ],
+    ),
+    Migration(
+        version=14,
+        name="scheduled jobs",
+        statements=[SCHEDULED_JOB_TABLE_SQL],
+    ),
+    Migration(
+        version=15,
+        name="class statistics covering index",
+        statements=[
+            ATTENDANCE_CLASS_STATS_INDEX_SQL,
+            "DROP INDEX IF EXISTS idx_attendance_enrollment_entry",
+        ],
+    ),
+    Migration(
+        version=16,
+        name="table version counters",
+        statements=[
+            TABLE_VERSION_TABLE_SQL,
+            TABLE_VERSION_SEED_SQL,
+        ],
+    ),
+    Migration(
+        version=17,
+        name="rollover flag for the attendance detail delete trigger",
+        statements=[
+            ATTENDANCE_ROLLOVER_TABLE_SQL,
+            "DROP TRIGGER IF EXISTS attendance_detail_count_delete",
+            ATTENDANCE_DETAIL_ROLLOVER_DELETE_TRIGGER_SQL,
+        ],
+    ),
+]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(pool: ConnectionPool, migrations: list[Migration] = MIGRATIONS) -> int:
+    """Bring the database up to the latest schema version.
+
+    The version is kept in ``PRAGMA user_version`` so a boot on an up to date
+    database costs a single read and runs no DDL. Each migration is applied in
+    its own ``BEGIN IMMEDIATE`` transaction together with the version bump, so
+    concurrent workers starting at the same time cannot apply one twice.
+    """
+    latest = migrations[-1].version if migrations else 0
+    with pool.reader() as conn:
+        if get_schema_version(conn) >= latest:
+            return latest
+
+    with pool.writer() as conn:
+        for migration in migrations:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                if get_schema_version(conn) >= migration.version:
+                    conn.rollback()
+                    continue
+                for statement in migration.statements:
+                    conn.execute(statement)
+                conn.execute("PRAGMA user_version = {}".format(migration.version))
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            logger.info("Applied migration %d, %s", migration.version, migration.name)
+        return get_schema_version(conn)
@@ -1,15 +1,37 @@
-import sqlite3
+import heapq
+import json
 import time
 import uuid
-from collections.abc import Callable
 from datetime import datetime
 from enum import Enum
+from itertools import islice
+from typing import TYPE_CHECKING, Iterator, Optional
 
 from pydantic import BaseModel
 
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.attendance_detail import (
+    enrolled_students_internal,
+    uncache_counters_internal,
+    uncount_archived_attendance_internal,
+)
 from src.model.classroom import Classroom, ClassroomModifiable
+from src.model.lecture_session import SessionSettings, session_for
 from src.model.model_exception import NotFoundError
-from src.model.utils import check_constraints
+from src.model.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    page_size,
+    paginate,
+)
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+    from src.model.roster import RosterSnapshot
+    from src.partitions import AttendancePartitions
 
 
 class Punctuality(str, Enum):
@@ -28,6 +50,7 @@ class Attendance(BaseModel):
     last_record: float
     entry_time: float
     punctuality: Punctuality
+    session_id: Optional[str] = None
 
 
 class AttendanceJoinStudent(BaseModel):
@@ -48,6 +71,31 @@ class AttendanceJoinClass(Classroom):
     punctuality: Punctuality
 
 
+attendance_from_row = row_factory(
+    Attendance,
+    ("id", "enrollment_id", "last_record", "entry_time", "punctuality", "session_id"),
+    converters={"punctuality": Punctuality},
+)
+
+attendance_join_class_from_row = row_factory(
+    AttendanceJoinClass,
+    (
+        "id",
+        "enrollment_id",
+        "last_record",
+        "entry_time",
+        "punctuality",
+        "lecturer_name",
+        "subject_name",
+        "duration",
+        "lecture_time",
+        "late_penalty_duration",
+        "record_interval",
+    ),
+    converters={"punctuality": Punctuality},
+)
+
+
 def create_attd(
     enrollment_id,
     last_record,
@@ -94,11 +142,6 @@ def justify_punctuality(attendance: Attendance, classroom: Classroom):
     punc = attendance.punctuality
     entry_dto = datetime.fromtimestamp(entry_time)
     lect_dto = datetime.fromtimestamp(lect_end_time)
-    print(
-        "ENNN",
-        datetime.fromtimestamp(entry_time),
-        datetime.fromtimestamp(lect_end_time),
-    )
 
     # Check if the entry time is in the same hour as the lecture end time
     if entry_dto.hour == lect_dto.hour:
@@ -142,100 +185,93 @@ def update_attd(old: Attendance, modified: AttendanceModifiable) -> Attendance:
             modified.entry_time if modified.entry_time is not None else old.entry_time
         ),
         punctuality=old.punctuality,
+        session_id=old.session_id,
     )
 
 
+ATTENDANCE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS `attendance`(
+    id TEXT NOT NULL,
+    enrollment_id TEXT NOT NULL,
+    last_record FLOAT NOT NULL,
+    entry_time FLOAT NOT NULL,
+    punctuality TEXT NOT NULL,
+    PRIMARY KEY (id),
+    FOREIGN KEY(enrollment_id) REFERENCES enrollment(id)
+)
+"""
+
+ATTENDANCE_SESSION_COLUMN_SQL = (
+    "ALTER TABLE attendance ADD COLUMN session_id TEXT NULL"
+    " REFERENCES lecture_session(id)"
+)
+
+ATTENDANCE_SESSION_INDEX_SQL = (
+    "CREATE INDEX IF NOT EXISTS idx_attendance_session_entry"
+    " ON attendance(session_id, entry_time)"
+)
+
+
 class AttendanceDBHandler:
-    def __init__(self, conn: Callable[..., sqlite3.Connection]):
-        self.connect = conn
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        roster: "RosterSnapshot | None" = None,
+        partitions: "AttendancePartitions | None" = None,
+        session_settings: SessionSettings | None = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.roster = roster
+        self.partitions = partitions
+        self.session_settings = session_settings or SessionSettings()
+        self.cache = cache
+
+    def _tables(self, conn, start=None, end=None, newest_first=False):
+        """Attendance tables covering ``[start, end)``, hot table included."""
+        if self.partitions is None:
+            return iter(("main.attendance",))
+        return self.partitions.tables(conn, start, end, newest_first)
+
+    def _locate(self, conn, id: str) -> str | None:
+        for table in self._tables(conn, newest_first=True):
+            found = conn.execute("SELECT 1 FROM {} WHERE id = ?".format(table), (id,))
+            if found.fetchone():
+                return table
+        return None
 
     def init_table(self):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                    CREATE TABLE IF NOT EXISTS `attendance`(
-                        id TEXT NOT NULL,
-                        enrollment_id TEXT NOT NULL,
-                        last_record FLOAT NOT NULL,
-                        entry_time FLOAT NOT NULL,
-                        punctuality TEXT NOT NULL,
-                        PRIMARY KEY (id),
-                        FOREIGN KEY(enrollment_id) REFERENCES enrollment(id)
-                    )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute(ATTENDANCE_TABLE_SQL)
             conn.commit()
 
     def create_many(self, attendance_list: list[Attendance]):
-        with self.connect() as conn:
-            modified = []
-            for attendance in attendance_list:
-                check_constraints(conn, "enrollment", attendance.enrollment_id)
-                # Retrieve classroom using enrollment_id
-                classroom_res = conn.execute(
-                    """
-                    SELECT c.* FROM classroom c
-                    JOIN enrollment e ON c.id = e.class_id
-                    WHERE e.id = ?
-                    """,
-                    (attendance.enrollment_id,),
-                ).fetchone()
-
-                classroom = Classroom.parse_sql(classroom_res)
-                punc = justify_punctuality(attendance, classroom)
-
-                conn.execute(
-                    """
-                        INSERT INTO "attendance" (id, enrollment_id, last_record,
-                                                  entry_time, punctuality) 
-                        VALUES (?, ?, ?, ?, ?);
-                    """,
-                    (
-                        attendance.id,
-                        attendance.enrollment_id,
-                        attendance.last_record,
-                        attendance.entry_time,
-                        punc,
+        modified = self.score_many(attendance_list)
+        with self.pool.writer() as conn:
+            insert_attendances_internal(conn, modified)
+            conn.commit()
+            if self.cache is not None:
+                uncache_counters_internal(
+                    conn,
+                    self.cache,
+                    enrolled_students_internal(
+                        conn, [attendance.enrollment_id for attendance in modified]
                     ),
                 )
-                modified.append(
-                    Attendance(**{**attendance.model_dump(), "punctuality": punc})
-                )
-            conn.commit()
             return modified
 
-    def create(self, attendance: Attendance):
-        with self.connect() as conn:
-            check_constraints(conn, "enrollment", attendance.enrollment_id)
-            # Retrieve classroom using enrollment_id
-            classroom_res = conn.execute(
-                """
-                SELECT c.* FROM classroom c
-                JOIN enrollment e ON c.id = e.class_id
-                WHERE e.id = ?
-                """,
-                (attendance.enrollment_id,),
-            ).fetchone()
-
-            classroom = Classroom.parse_sql(classroom_res)
-            punc = justify_punctuality(attendance, classroom)
+    def score_many(self, attendance_list: list[Attendance]) -> list[Attendance]:
+        """Validate enrollment ids and fill in punctuality without writing."""
+        enrollment_ids = [attendance.enrollment_id for attendance in attendance_list]
+        if self.roster is not None:
+            classrooms = self.roster.resolve(enrollment_ids)
+        else:
+            with self.pool.reader() as conn:
+                classrooms = get_classrooms_by_enrollment_internal(conn, enrollment_ids)
+        return score_attendances(attendance_list, classrooms, self.session_settings)
 
-            conn.execute(
-                """
-                    INSERT INTO "attendance" (id, enrollment_id, last_record,
-                                              entry_time, punctuality) 
-                    VALUES (?, ?, ?, ?, ?);
-                """,
-                (
-                    attendance.id,
-                    attendance.enrollment_id,
-                    attendance.last_record,
-                    attendance.entry_time,
-                    punc,
-                ),
-            )
-            conn.commit()
-            return attendance
+    def create(self, attendance: Attendance):
+        return self.create_many([attendance])[0]
 
     def update(self, id: str, modified: AttendanceModifiable):
         old = self.get(id)
@@ -243,60 +279,83 @@ class AttendanceDBHandler:
             raise NotFoundError("Attendance not found")
 
         updated = update_attd(old, modified)
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
+            table = self._locate(conn, id)
+            if table is None:
+                raise NotFoundError("Attendance not found")
             conn.execute(
                 """
-                UPDATE attendance
+                UPDATE {}
                 SET last_record = ?,
                     entry_time = ?
                 WHERE id = ?
-                """,
+                """.format(
+                    table
+                ),
                 (
                     updated.last_record,
                     updated.entry_time,
                     updated.id,
                 ),
             )
+            bump_versions_internal(conn, "attendance")
             conn.commit()
             return updated
 
     def delete(self, id: str):
-        with self.connect() as conn:
-            exec = conn.execute("DELETE FROM attendance WHERE id = ?", (id,))
+        with self.pool.writer() as conn:
+            table = self._locate(conn, id)
+            if table is None:
+                return 0
+            if table != "main.attendance":
+                uncount_archived_attendance_internal(conn, table, id)
+            deleted = conn.execute(
+                "DELETE FROM {} WHERE id = ? RETURNING enrollment_id".format(table),
+                (id,),
+            ).fetchall()
+            bump_versions_internal(conn, "attendance", "attendance_detail")
             conn.commit()
-            return exec.rowcount
+            if self.cache is not None:
+                uncache_counters_internal(
+                    conn,
+                    self.cache,
+                    enrolled_students_internal(conn, [row[0] for row in deleted]),
+                )
+            return len(deleted)
 
     def get(self, id: str):
-        with self.connect() as conn:
-            single_res = conn.execute("SELECT * FROM attendance WHERE id = ?", (id,))
-            row = single_res.fetchone()
-            if row:
-                result = Attendance(
-                    id=row[0],
-                    enrollment_id=row[1],
-                    last_record=row[2],
-                    entry_time=row[3],
-                    punctuality=row[4],
+        with self.pool.reader() as conn:
+            for table in self._tables(conn, newest_first=True):
+                single_res = conn.execute(
+                    "SELECT * FROM {} WHERE id = ?".format(table), (id,)
                 )
-                return result
+                row = single_res.fetchone()
+                if row:
+                    result = attendance_from_row(row)
+                    return result
             return None
 
     def get_by_subject(self, subject: str):
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             # attendance.id,enrollment.id,entry_time,last_record,punctuality,student.firstname,student.lastname
-            single_res = conn.execute(
-                """
-                    SELECT
-                    attendance.id,enrollment.id,entry_time,last_record,punctuality,student.firstname,student.lastname,classroom.subject_name
-                    FROM attendance 
-                    JOIN enrollment ON enrollment.id = attendance.enrollment_id
-                    JOIN student ON student.id = enrollment.student_id
-                    JOIN classroom ON classroom.id = enrollment.class_id
-                    WHERE subject_name = ?
-                """,
-                (subject,),
-            )
-            row = single_res.fetchone()
+            for table in self._tables(conn, newest_first=True):
+                single_res = conn.execute(
+                    """
+                        SELECT
+                        attendance.id,enrollment.id,entry_time,last_record,punctuality,student.firstname,student.lastname,classroom.subject_name
+                        FROM {} attendance
+                        JOIN enrollment ON enrollment.id = attendance.enrollment_id
+                        JOIN student ON student.id = enrollment.student_id
+                        JOIN classroom ON classroom.id = enrollment.class_id
+                        WHERE subject_name = ?
+                    """.format(
+                        table
+                    ),
+                    (subject,),
+                )
+                row = single_res.fetchone()
+                if row:
+                    break
 
             if row:
                 result = AttendanceJoinStudent(
@@ -312,74 +371,241 @@ class AttendanceDBHandler:
             return None
 
     def get_by_student(self, student_id) -> list[Attendance]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             # attendance.id,enrollment.id,entry_time,last_record,punctuality,student.firstname,student.lastname
-            single_res = conn.execute(
-                """
-                    SELECT * FROM attendance 
-                    JOIN enrollment e ON e.id = attendance.enrollment_id
-                    JOIN student s ON s.id = e.student_id
-                    WHERE s.id = ?
-                """,
-                (student_id,),
-            )
+            rows = []
+            for table in self._tables(conn):
+                single_res = conn.execute(
+                    """
+                        SELECT * FROM {} attendance
+                        JOIN enrollment e ON e.id = attendance.enrollment_id
+                        JOIN student s ON s.id = e.student_id
+                        WHERE s.id = ?
+                    """.format(
+                        table
+                    ),
+                    (student_id,),
+                )
+                rows.extend(single_res.fetchall())
 
-            rows = single_res.fetchall()
             results = []
             if rows:
                 for row in rows:
-                    result = Attendance(
-                        id=row[0],
-                        enrollment_id=row[1],
-                        last_record=row[2],
-                        entry_time=row[3],
-                        punctuality=row[4],
-                    )
+                    result = attendance_from_row(row)
                     results.append(result)
             return results
 
-    def list_attendance(self) -> list[Attendance]:
-        with self.connect() as conn:
-            raw_list = conn.execute("SELECT * FROM attendance")
-            rows = raw_list.fetchall()
+    def list_attendance(
+        self, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Page[Attendance]:
+        limit = page_size(limit)
+        after = decode_cursor(cursor)
+        with self.pool.reader() as conn:
+            # each partition is already in id order, so the page is the head
+            # of their merge
+            partition_rows = [
+                conn.execute(
+                    "SELECT * FROM {} WHERE id > ? ORDER BY id LIMIT ?".format(table),
+                    (after, limit + 1),
+                ).fetchall()
+                for table in self._tables(conn)
+            ]
+            merged = heapq.merge(*partition_rows, key=lambda row: row[0])
+            rows, next_cursor = paginate(list(islice(merged, limit + 1)), limit)
+            result = [attendance_from_row(row) for row in rows]
+            return Page(items=result, next_cursor=next_cursor)
+
+    def export(
+        self,
+        class_id: str | None = None,
+        start: float | None = None,
+        end: float | None = None,
+        batch_size: int = 1000,
+    ) -> Iterator[tuple]:
+        """Yield attendance rows joined with their enrollment, oldest first.
+
+        Rows are read ``batch_size`` at a time, each batch on a reader taken
+        from the pool just for that query and keyed on the last row's
+        ``(entry_time, id)``. A slow download therefore holds no connection
+        and no read snapshot between batches, so it neither keeps other
+        handlers waiting for a reader nor holds back WAL checkpoints. Only
+        the partitions that overlap ``[start, end)`` are read, one after the
+        other; they do not overlap in time, so the output stays ordered.
+        """
+        filters = ["a.entry_time >= ? AND (a.entry_time > ? OR a.id > ?)"]
+        params: list = []
+        if class_id is not None:
+            filters.append("e.class_id = ?")
+            params.append(class_id)
+        if start is not None:
+            filters.append("a.entry_time >= ?")
+            params.append(start)
+        if end is not None:
+            filters.append("a.entry_time < ?")
+            params.append(end)
+
+        with self.pool.reader() as conn:
+            tables = list(self._tables(conn, start, end))
+        for table in tables:
+            query = """
+                SELECT a.id, a.enrollment_id, e.student_id, e.class_id,
+                       a.last_record, a.entry_time, a.punctuality
+                FROM {} a
+                JOIN enrollment e ON e.id = a.enrollment_id
+                WHERE {}
+                ORDER BY a.entry_time, a.id
+                LIMIT ?
+                """.format(
+                table, " AND ".join(filters)
+            )
+            entry_time, id = float("-inf"), ""
+            while True:
+                with self.pool.reader() as conn:
+                    if (
+                        self.partitions is not None
+                        and not self.partitions.attach_table(conn, table)
+                    ):
+                        # converted to the columnar archive meanwhile
+                        break
+                    rows = conn.execute(
+                        query, (entry_time, entry_time, id, *params, batch_size)
+                    ).fetchall()
+                yield from rows
+                if len(rows) < batch_size:
+                    break
+                id, entry_time = rows[-1][0], rows[-1][5]
+
+    def list_by_session(
+        self,
+        session_id: str,
+        start: float | None = None,
+        end: float | None = None,
+    ) -> list[Attendance]:
+        """Check-ins of one lecture session, optionally within a time window.
+
+        Served from the ``(session_id, entry_time)`` index; only partitions
+        overlapping the session's own time span are read.
+        """
+        with self.pool.reader() as conn:
+            session = conn.execute(
+                "SELECT start_time, end_time FROM lecture_session WHERE id = ?",
+                (session_id,),
+            ).fetchone()
+            if session is None:
+                raise NotFoundError("Lecture session not found")
+            early = self.session_settings.early_minutes * 60
+            lo = session[0] - early if start is None else max(start, session[0] - early)
+            hi = session[1] if end is None else min(end, session[1])
             result = []
-            for row in rows:
-                result.append(
-                    Attendance(
-                        id=row[0],
-                        enrollment_id=row[1],
-                        last_record=row[2],
-                        entry_time=row[3],
-                        punctuality=row[4],
-                    )
+            for table in self._tables(conn, lo, hi):
+                raw_list = conn.execute(
+                    """
+                    SELECT * FROM {}
+                    WHERE session_id = ? AND entry_time >= ? AND entry_time < ?
+                    ORDER BY entry_time
+                    """.format(
+                        table
+                    ),
+                    (session_id, lo, hi),
                 )
+                result.extend(attendance_from_row(row) for row in raw_list)
             return result
 
     def list_by_classroom(self, class_id: str) -> list[AttendanceJoinClass]:
-        with self.connect() as conn:
-            raw_list = conn.execute(
-                """
-                    SELECT * FROM attendance 
-                    JOIN enrollment ON enrollment.id = attendance.enrollment_id 
-                    JOIN classroom ON classroom.id = enrollment.class_id
-                    WHERE classroom.id = ?
-                """,
-                (class_id,),
-            )
-            rows = raw_list.fetchall()
+        with self.pool.reader() as conn:
             result = []
-            for row in rows:
-                print(row)
-                joined = Classroom.parse_sql(row[8:]).model_dump()
-                del joined["id"]
-                result.append(
-                    AttendanceJoinClass(
-                        id=row[0],
-                        enrollment_id=row[1],
-                        last_record=row[2],
-                        entry_time=row[3],
-                        punctuality=row[4],
-                        **joined
-                    )
+            for table in self._tables(conn):
+                raw_list = conn.execute(
+                    """
+                        SELECT attendance.id, attendance.enrollment_id,
+                               attendance.last_record, attendance.entry_time,
+                               attendance.punctuality, classroom.lecturer_name,
+                               classroom.subject_name, classroom.duration,
+                               classroom.lecture_time, classroom.late_penalty_duration,
+                               classroom.record_interval
+                        FROM {} attendance
+                        JOIN enrollment ON enrollment.id = attendance.enrollment_id
+                        JOIN classroom ON classroom.id = enrollment.class_id
+                        WHERE classroom.id = ?
+                    """.format(
+                        table
+                    ),
+                    (class_id,),
                 )
+                result.extend(attendance_join_class_from_row(row) for row in raw_list)
             return result
+
+
+def get_classrooms_by_enrollment_internal(
+    conn, enrollment_ids: list[str]
+) -> dict[str, Classroom]:
+    # The ids are bound as one JSON array so a batch of any size is resolved
+    # in a single query without running into SQLite's host parameter limit.
+    rows = conn.execute(
+        """
+        SELECT e.id, c.* FROM enrollment e
+        JOIN classroom c ON c.id = e.class_id
+        WHERE e.id IN (SELECT value FROM json_each(?))
+        """,
+        (json.dumps(list(set(enrollment_ids))),),
+    ).fetchall()
+    return {row[0]: Classroom.parse_sql(row[1:]) for row in rows}
+
+
+def score_attendances(
+    attendance_list: list[Attendance],
+    classrooms: dict[str, Classroom],
+    session_settings: SessionSettings | None = None,
+) -> list[Attendance]:
+    missing = [
+        attendance.enrollment_id
+        for attendance in attendance_list
+        if attendance.enrollment_id not in classrooms
+    ]
+    if missing:
+        raise NotFoundError(
+            "Invalid enrollment id for attendance: {}".format(
+                ", ".join(dict.fromkeys(missing))
+            )
+        )
+
+    session_settings = session_settings or SessionSettings()
+    modified = []
+    for attendance in attendance_list:
+        classroom = classrooms[attendance.enrollment_id]
+        punc = justify_punctuality(attendance, classroom)
+        session = session_for(classroom, attendance.entry_time, session_settings)
+        modified.append(
+            Attendance(
+                **{
+                    **attendance.model_dump(),
+                    "punctuality": punc,
+                    "session_id": session.id if session else None,
+                }
+            )
+        )
+    return modified
+
+
+def insert_attendances_internal(conn, attendance_list: list[Attendance]):
+    conn.executemany(
+        """
+            INSERT INTO "attendance" (id, enrollment_id, last_record,
+                                      entry_time, punctuality, session_id)
+            VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        [
+            (
+                attendance.id,
+                attendance.enrollment_id,
+                attendance.last_record,
+                attendance.entry_time,
+                str(attendance.punctuality),
+                attendance.session_id,
+            )
+            for attendance in attendance_list
+        ],
+    )
+    # the attendance_detail triggers updated the counters
+    if attendance_list:
+        bump_versions_internal(conn, "attendance", "attendance_detail")
@@ -1,12 +1,16 @@
-import sqlite3
+import json
 import uuid
-from collections.abc import Callable
 from enum import Enum
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
 from pydantic import BaseModel
 
-from src.model.attendance import Punctuality
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
 
 
 class AttendanceDetail(BaseModel):
@@ -18,6 +22,19 @@ class AttendanceDetail(BaseModel):
     student_id: str
 
 
+attendance_detail_from_row = row_factory(
+    AttendanceDetail,
+    (
+        "id",
+        "absent_count",
+        "absent_with_permission",
+        "present_count",
+        "late_count",
+        "student_id",
+    ),
+)
+
+
 def create_attendance_detail(
     student_id: str,
     absent_count: int = 0,
@@ -26,7 +43,6 @@ def create_attendance_detail(
     late_count: int = 0,
 ) -> AttendanceDetail:
     attendance_id = str(uuid.uuid4())
-    print("DUMA", student_id, absent_count)
     return AttendanceDetail(
         id=attendance_id,
         absent_count=absent_count,
@@ -71,61 +87,174 @@ def update_attendance_detail(
     )
 
 
+ATTENDANCE_DETAIL_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS attendance_detail (
+    id TEXT PRIMARY KEY NOT NULL,
+    absent_count INTEGER NOT NULL,
+    absent_with_permission INTEGER NOT NULL,
+    present_count INTEGER NOT NULL,
+    late_count INTEGER NOT NULL,
+    student_id TEXT NOT NULL,
+    FOREIGN KEY (student_id) REFERENCES student(id)
+)
+"""
+
+
+def _counter_delta(row: str, sign: str) -> str:
+    # punctuality -> counter: ontime is present, late is late, absent and auto
+    # (no check-in before the lecture closed) are both absences
+    return """
+    UPDATE attendance_detail
+    SET present_count = present_count {sign} ({row}.punctuality = 'ontime'),
+        late_count = late_count {sign} ({row}.punctuality = 'late'),
+        absent_count = absent_count {sign} ({row}.punctuality IN ('absent', 'auto'))
+    WHERE student_id = (SELECT student_id FROM enrollment WHERE id = {row}.enrollment_id);
+    """.format(
+        row=row, sign=sign
+    )
+
+
+# The attendance_detail counters are derived from the attendance rows, so they
+# are kept in step by the database itself, inside the transaction that writes
+# the attendance: no extra round trips, and no way for an insert to commit
+# while its counter update is lost.
+ATTENDANCE_DETAIL_TRIGGERS_SQL = [
+    """
+    CREATE TRIGGER IF NOT EXISTS attendance_detail_count_insert
+    AFTER INSERT ON attendance
+    BEGIN {}
+    END
+    """.format(
+        _counter_delta("NEW", "+")
+    ),
+    """
+    CREATE TRIGGER IF NOT EXISTS attendance_detail_count_delete
+    AFTER DELETE ON attendance
+    BEGIN {}
+    END
+    """.format(
+        _counter_delta("OLD", "-")
+    ),
+    """
+    CREATE TRIGGER IF NOT EXISTS attendance_detail_count_update
+    AFTER UPDATE OF enrollment_id, punctuality ON attendance
+    BEGIN {} {}
+    END
+    """.format(
+        _counter_delta("OLD", "-"), _counter_delta("NEW", "+")
+    ),
+]
+
+
+# Replaces the delete trigger above once attendance can be archived: rows that
+# a rollover moves out of the hot table keep counting towards the totals.
+# Superseded by ATTENDANCE_DETAIL_ROLLOVER_DELETE_TRIGGER_SQL, since a row
+# inserted or deleted in the hot table with an entry_time inside an archived
+# range was never counted back out.
+ATTENDANCE_DETAIL_ARCHIVE_DELETE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS attendance_detail_count_delete
+AFTER DELETE ON attendance
+WHEN OLD.entry_time >= (SELECT COALESCE(MAX(end_time), 0) FROM attendance_partition)
+BEGIN {}
+END
+""".format(
+    _counter_delta("OLD", "-")
+)
+
+
+# Skips the rows a rollover moves out of the hot table, which it flags by
+# holding a row in attendance_rollover for the length of its transaction;
+# any other delete takes the attendance out of the counters.
+ATTENDANCE_DETAIL_ROLLOVER_DELETE_TRIGGER_SQL = """
+CREATE TRIGGER IF NOT EXISTS attendance_detail_count_delete
+AFTER DELETE ON attendance
+WHEN NOT EXISTS (SELECT 1 FROM attendance_rollover)
+BEGIN {}
+END
+""".format(
+    _counter_delta("OLD", "-")
+)
+
+
+def uncount_archived_attendance_internal(conn, table: str, attendance_id: str):
+    # Archived partitions live in other files, which the triggers cannot
+    # reach, so deleting from one adjusts the counters here instead.
+    conn.execute(
+        """
+        UPDATE attendance_detail
+        SET present_count = present_count - (a.punctuality = 'ontime'),
+            late_count = late_count - (a.punctuality = 'late'),
+            absent_count = absent_count - (a.punctuality IN ('absent', 'auto'))
+        FROM {} a JOIN enrollment e ON e.id = a.enrollment_id
+        WHERE a.id = ? AND attendance_detail.student_id = e.student_id
+        """.format(
+            table
+        ),
+        (attendance_id,),
+    )
+    bump_versions_internal(conn, "attendance_detail")
+
+
+def student_cache_keys(student_id: str) -> list[tuple]:
+    # StudentDBHandler.get caches a student, counters included, under these
+    return [("student", student_id, True), ("student", student_id, False)]
+
+
+def enrolled_students_internal(conn, enrollment_ids: Iterable[str]) -> list[str]:
+    return [
+        row[0]
+        for row in conn.execute(
+            """
+            SELECT DISTINCT student_id FROM enrollment
+            WHERE id IN (SELECT value FROM json_each(?))
+            """,
+            (json.dumps(list(set(enrollment_ids))),),
+        )
+    ]
+
+
+def uncache_counters_internal(
+    conn, cache: "ObjectCache | None", student_ids: Iterable[str]
+):
+    # Cached students are not invalidated through attendance_detail's table
+    # version, which every check-in moves; the writers of this process drop
+    # the students whose counters they changed instead, after committing on
+    # ``conn``. Check-ins made by other workers reach them through the TTL.
+    if cache is None:
+        return
+    keys = [key for id in set(student_ids) for key in student_cache_keys(id)]
+    cache.written(conn, "attendance_detail", keys)
+
+
 class AttendanceDetailDBHandler:
-    def __init__(self, conn: Callable[..., sqlite3.Connection]):
-        self.connect = conn
+    def __init__(self, pool: ConnectionPool, cache: "ObjectCache | None" = None):
+        self.pool = pool
+        self.cache = cache
 
     def init_table(self):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS attendance_detail (
-                    id TEXT PRIMARY KEY NOT NULL,
-                    absent_count INTEGER NOT NULL,
-                    absent_with_permission INTEGER NOT NULL,
-                    present_count INTEGER NOT NULL,
-                    late_count INTEGER NOT NULL,
-                    student_id TEXT NOT NULL,
-                    FOREIGN KEY (student_id) REFERENCES student(id)
-                )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute(ATTENDANCE_DETAIL_TABLE_SQL)
             conn.commit()
 
     def create(self, attendance_detail: AttendanceDetail):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO attendance_detail (id, absent_count, absent_with_permission, present_count, late_count, student_id) 
-                VALUES (?, ?, ?, ?, ?, ?);
-                """,
-                (
-                    attendance_detail.id,
-                    attendance_detail.absent_count,
-                    attendance_detail.absent_with_permission,
-                    attendance_detail.present_count,
-                    attendance_detail.late_count,
-                    attendance_detail.student_id,
-                ),
-            )
+        with self.pool.writer() as conn:
+            insert_attendance_details_internal(conn, [attendance_detail])
+            conn.commit()
+
+    def create_many(self, attendance_detail_list: list[AttendanceDetail]):
+        with self.pool.writer() as conn:
+            insert_attendance_details_internal(conn, attendance_detail_list)
             conn.commit()
+            return attendance_detail_list
 
     def get(self, id: str):
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             single_res = conn.execute(
                 "SELECT * FROM attendance_detail WHERE id = ?", (id,)
             )
             row = single_res.fetchone()
-            print("rowww", row)
             if row:
-                result = AttendanceDetail(
-                    id=row[0],
-                    absent_count=row[1],
-                    absent_with_permission=row[2],
-                    present_count=row[3],
-                    late_count=row[4],
-                    student_id=row[5],
-                )
+                result = attendance_detail_from_row(row)
                 return result
             return None
 
@@ -135,7 +264,7 @@ class AttendanceDetailDBHandler:
             raise Exception("AttendanceDetail not found")
 
         updated = update_attendance_detail(old, modified)
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             conn.execute(
                 """
                 UPDATE attendance_detail
@@ -150,50 +279,35 @@ class AttendanceDetailDBHandler:
                     updated.id,
                 ),
             )
+            bump_versions_internal(conn, "attendance_detail")
             conn.commit()
+            uncache_counters_internal(conn, self.cache, [updated.student_id])
 
     def delete(self, id: str):
-        with self.connect() as conn:
-            exec = conn.execute("DELETE FROM attendance_detail WHERE id = ?", (id,))
+        with self.pool.writer() as conn:
+            deleted = conn.execute(
+                "DELETE FROM attendance_detail WHERE id = ? RETURNING student_id", (id,)
+            ).fetchall()
+            bump_versions_internal(conn, "attendance_detail")
             conn.commit()
-            return exec.rowcount
+            uncache_counters_internal(conn, self.cache, [row[0] for row in deleted])
+            return len(deleted)
 
     def list(self) -> list[AttendanceDetail]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             raw_list = conn.execute("SELECT * FROM attendance_detail")
             rows = raw_list.fetchall()
-            result = []
-
-            for row in rows:
-                result.append(
-                    AttendanceDetail(
-                        id=row[0],
-                        absent_count=row[1],
-                        absent_with_permission=row[2],
-                        present_count=row[3],
-                        late_count=row[4],
-                        student_id=row[5],
-                    )
-                )
-            return result
+            return [attendance_detail_from_row(row) for row in rows]
 
     def get_by_student_id(self, student_id: str) -> Optional[AttendanceDetail]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             single_res = conn.execute(
                 "SELECT * FROM attendance_detail WHERE student_id = ?", (student_id,)
             )
 
             row = single_res.fetchone()
-            print("DUMA", row)
             if row:
-                result = AttendanceDetail(
-                    id=row[0],
-                    absent_count=row[1],
-                    absent_with_permission=row[2],
-                    present_count=row[3],
-                    late_count=row[4],
-                    student_id=row[5],
-                )
+                result = attendance_detail_from_row(row)
                 return result
             return None
 
@@ -202,7 +316,7 @@ class AttendanceDetailDBHandler:
         if attendance is None:
             raise Exception("AttendanceDetail not found for the given student_id")
 
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             conn.execute(
                 """
                 UPDATE attendance_detail
@@ -212,60 +326,31 @@ class AttendanceDetailDBHandler:
                 """,
                 (student_id,),
             )
+            bump_versions_internal(conn, "attendance_detail")
             conn.commit()
+            uncache_counters_internal(conn, self.cache, [student_id])
         return True
 
-    def consolidate(self, attd_id: str, punctuality: Punctuality):
 
-        with self.connect() as conn:
-            fetcher = conn.execute(
-                """
-                SELECT s.id FROM attendance a
-                JOIN enrollment e ON e.id = a.enrollment_id
-                JOIN student s ON s.id = e.student_id
-                WHERE a.id = ?
-                """,
-                (attd_id,),
+def insert_attendance_details_internal(
+    conn, attendance_detail_list: list[AttendanceDetail]
+):
+    conn.executemany(
+        """
+        INSERT INTO attendance_detail (id, absent_count, absent_with_permission, present_count, late_count, student_id) 
+        VALUES (?, ?, ?, ?, ?, ?);
+        """,
+        [
+            (
+                attendance_detail.id,
+                attendance_detail.absent_count,
+                attendance_detail.absent_with_permission,
+                attendance_detail.present_count,
+                attendance_detail.late_count,
+                attendance_detail.student_id,
             )
-
-            student_id = fetcher.fetchone()[0]
-            print("SSS", student_id)
-            if punctuality == Punctuality.LATE:
-                conn.execute(
-                    """
-                    UPDATE attendance_detail
-                    SET late_count = late_count + 1
-                    WHERE student_id = ?
-                    """,
-                    (student_id,),
-                )
-            elif punctuality == Punctuality.ONTIME:
-                conn.execute(
-                    """
-                    UPDATE attendance_detail
-                    SET present_count = present_count + 1
-                    WHERE student_id = ?
-                    """,
-                    (student_id,),
-                )
-            elif punctuality == Punctuality.ABSENT:
-                conn.execute(
-                    """
-                    UPDATE attendance_detail
-                    SET absent_count = absent_count + 1
-                    WHERE student_id = ?
-                    """,
-                    (student_id,),
-                )
-            elif punctuality == Punctuality.AUTO:
-                # Implement your logic for AUTO here
-                # For example, you might want to increment absent_count
-                conn.execute(
-                    """
-                    UPDATE attendance_detail
-                    SET absent_count = absent_count + 1
-                    WHERE student_id = ?
-                    """,
-                    (student_id,),
-                )
-            conn.commit()
+            for attendance_detail in attendance_detail_list
+        ],
+    )
+    if attendance_detail_list:
+        bump_versions_internal(conn, "attendance_detail")
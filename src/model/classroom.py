@@ -1,10 +1,25 @@
-import sqlite3
 import uuid
-from collections.abc import Callable
 from datetime import datetime
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    page_size,
+    paginate,
+)
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+    from src.model.lecture_session import LectureSessionDBHandler
+    from src.model.roster import RosterSnapshot
+
 
 # to calculate end time =
 class Classroom(BaseModel):
@@ -18,15 +33,21 @@ class Classroom(BaseModel):
 
     @classmethod
     def parse_sql(cls, row: tuple) -> "Classroom":
-        return cls(
-            id=row[0],
-            lecturer_name=row[1],
-            subject_name=row[2],
-            duration=row[3],
-            lecture_time=row[4],
-            late_penalty_duration=row[5],
-            record_interval=row[6],
-        )
+        return classroom_from_row(row)
+
+
+classroom_from_row = row_factory(
+    Classroom,
+    (
+        "id",
+        "lecturer_name",
+        "subject_name",
+        "duration",
+        "lecture_time",
+        "late_penalty_duration",
+        "record_interval",
+    ),
+)
 
 
 def create_classroom(
@@ -91,69 +112,50 @@ def update_classroom(old: Classroom, modified: ClassroomModifiable) -> Classroom
     )
 
 
+CLASSROOM_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS `classroom`(
+    id TEXT NOT NULL,
+    lecturer_name TEXT NOT NULL,
+    subject_name TEXT NOT NULL,
+    duration INTEGER NOT NULL,
+    lecture_time FLOAT NOT NULL,
+    late_penalty_duration FLOAT NOT NULL,
+    record_interval FLOAT NOT NULL,
+    PRIMARY KEY (id)
+)
+"""
+
+
 class ClassroomDBHandler:
-    def __init__(self, conn: Callable[..., sqlite3.Connection]):
-        self.connect = conn
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        roster: "RosterSnapshot | None" = None,
+        sessions: "LectureSessionDBHandler | None" = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.roster = roster
+        self.sessions = sessions
+        self.cache = cache
 
     def init_table(self):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                    CREATE TABLE IF NOT EXISTS `classroom`(
-                        id TEXT NOT NULL,
-                        lecturer_name TEXT NOT NULL,
-                        subject_name TEXT NOT NULL,
-                        duration INTEGER NOT NULL,
-                        lecture_time FLOAT NOT NULL,
-                        late_penalty_duration FLOAT NOT NULL,
-                        record_interval FLOAT NOT NULL,
-                        PRIMARY KEY (id)
-                    )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute(CLASSROOM_TABLE_SQL)
             conn.commit()
 
     def create_many(self, classroom_list: list[Classroom]):
-        with self.connect() as conn:
-            for classroom in classroom_list:
-                conn.execute(
-                    """
-                        INSERT INTO "classroom" (id, lecturer_name, subject_name, duration, 
-                                                 lecture_time, late_penalty_duration, record_interval) 
-                        VALUES (?, ?, ?, ?, ?, ?, ?);
-                    """,
-                    (
-                        classroom.id,
-                        classroom.lecturer_name,
-                        classroom.subject_name,
-                        classroom.duration,
-                        classroom.lecture_time,
-                        classroom.late_penalty_duration,
-                        classroom.record_interval,
-                    ),
-                )
+        with self.pool.writer() as conn:
+            insert_classrooms_internal(conn, classroom_list)
             conn.commit()
-            return classroom_list
+            if self.roster is not None:
+                self.roster.put_classrooms(conn, classroom_list)
+        if self.sessions is not None:
+            self.sessions.materialize([classroom.id for classroom in classroom_list])
+        return classroom_list
 
     def insert(self, classroom: Classroom):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                    INSERT INTO "classroom" (id, lecturer_name, subject_name, duration, 
-                                             lecture_time, late_penalty_duration, record_interval) 
-                    VALUES (?, ?, ?, ?, ?, ?, ?);
-                """,
-                (
-                    classroom.id,
-                    classroom.lecturer_name,
-                    classroom.subject_name,
-                    classroom.duration,
-                    classroom.lecture_time,
-                    classroom.late_penalty_duration,
-                    classroom.record_interval,
-                ),
-            )
-            conn.commit()
+        self.create_many([classroom])
 
     def update(self, id: str, modified: ClassroomModifiable):
         old = self.get(id)
@@ -161,7 +163,7 @@ class ClassroomDBHandler:
             raise Exception("Classroom not found")
 
         updated = update_classroom(old, modified)
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             conn.execute(
                 """
                 UPDATE classroom
@@ -181,17 +183,37 @@ class ClassroomDBHandler:
                     updated.id,
                 ),
             )
+            bump_versions_internal(conn, "classroom")
             conn.commit()
+            if self.cache is not None:
+                self.cache.written(conn, "classroom", [("classroom", id)])
+            if self.roster is not None:
+                self.roster.put_classrooms(conn, [updated])
+        if self.sessions is not None:
+            self.sessions.reschedule(id)
 
     def delete(self, id: str):
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             exec = conn.execute("DELETE FROM classroom WHERE id = ?", (id,))
+            bump_versions_internal(conn, "classroom")
             conn.commit()
-            print(exec.rowcount)
-            return exec.rowcount
+            if self.cache is not None:
+                self.cache.written(conn, "classroom", [("classroom", id)])
+            if self.roster is not None:
+                self.roster.remove_classroom(conn, id)
+        if self.sessions is not None:
+            self.sessions.delete_by_class(id)
+        return exec.rowcount
 
     def get(self, id: str) -> Classroom | None:
-        with self.connect() as conn:
+        if self.cache is not None:
+            return self.cache.get(
+                ("classroom", id), lambda: self._get(id), ("classroom",)
+            )
+        return self._get(id)
+
+    def _get(self, id: str) -> Classroom | None:
+        with self.pool.reader() as conn:
             single_res = conn.execute("SELECT * FROM classroom WHERE id = ?", (id,))
             row = single_res.fetchone()
             if row:
@@ -199,11 +221,39 @@ class ClassroomDBHandler:
                 return result
             return None
 
-    def list(self) -> list[Classroom]:
-        with self.connect() as conn:
-            raw_list = conn.execute("SELECT * FROM classroom")
-            rows = raw_list.fetchall()
-            result = []
-            for row in rows:
-                result.append(Classroom.parse_sql(row))
-            return result
+    def list(
+        self, cursor: str | None = None, limit: int = DEFAULT_PAGE_SIZE
+    ) -> Page[Classroom]:
+        limit = page_size(limit)
+        with self.pool.reader() as conn:
+            raw_list = conn.execute(
+                "SELECT * FROM classroom WHERE id > ? ORDER BY id LIMIT ?",
+                (decode_cursor(cursor), limit + 1),
+            )
+            rows, next_cursor = paginate(raw_list.fetchall(), limit)
+            result = [classroom_from_row(row) for row in rows]
+            return Page(items=result, next_cursor=next_cursor)
+
+
+def insert_classrooms_internal(conn, classroom_list: list[Classroom]):
+    conn.executemany(
+        """
+            INSERT INTO "classroom" (id, lecturer_name, subject_name, duration, 
+                                     lecture_time, late_penalty_duration, record_interval) 
+            VALUES (?, ?, ?, ?, ?, ?, ?);
+        """,
+        [
+            (
+                classroom.id,
+                classroom.lecturer_name,
+                classroom.subject_name,
+                classroom.duration,
+                classroom.lecture_time,
+                classroom.late_penalty_duration,
+                classroom.record_interval,
+            )
+            for classroom in classroom_list
+        ],
+    )
+    if classroom_list:
+        bump_versions_internal(conn, "classroom")
@@ -6,12 +6,26 @@
 #     PRIMARY KEY (student_id, classroom_id)
 # );
 
-import sqlite3
 import uuid
-from collections.abc import Callable
+from typing import TYPE_CHECKING
 
 from pydantic import BaseModel
 
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    page_size,
+    paginate,
+)
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+    from src.model.roster import RosterSnapshot
+
 
 class Enrollment(BaseModel):
     id: str
@@ -32,84 +46,103 @@ class EnrollmentJoinResult(BaseModel):
     record_interval: float | None
 
 
+enrollment_from_row = row_factory(Enrollment, ("id", "class_id", "student_id"))
+
+
 def create_enrollment(class_id: str, student_id: str) -> Enrollment:
     return Enrollment(id=str(uuid.uuid4()), class_id=class_id, student_id=student_id)
 
 
+ENROLLMENT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS enrollment (
+    id TEXT NOT NULL,
+    class_id TEXT NOT NULL,
+    student_id TEXT NOT NULL,
+    FOREIGN KEY (class_id) REFERENCES classroom(id),
+    FOREIGN KEY (student_id) REFERENCES student(id),
+    PRIMARY KEY (id)
+)
+"""
+
+
 class EnrollmentDBHandler:
-    def __init__(self, conn: Callable[..., sqlite3.Connection]):
-        self.connect = conn
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        roster: "RosterSnapshot | None" = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.roster = roster
+        self.cache = cache
 
     def init_table(self):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                CREATE TABLE IF NOT EXISTS enrollment (
-                    id TEXT NOT NULL,
-                    class_id TEXT NOT NULL,
-                    student_id TEXT NOT NULL,
-                    FOREIGN KEY (class_id) REFERENCES classroom(id),
-                    FOREIGN KEY (student_id) REFERENCES student(id),
-                    PRIMARY KEY (id)
-                )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute(ENROLLMENT_TABLE_SQL)
             conn.commit()
 
     def create(self, enrollment: Enrollment):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                INSERT INTO enrollment (id, class_id, student_id)
-                VALUES (?, ?, ?)
-                """,
-                (enrollment.id, enrollment.class_id, enrollment.student_id),
-            )
-            conn.commit()
-            return enrollment
+        self.create_many([enrollment])
+        return enrollment
 
     def create_many(self, enrollment_list: list[Enrollment]):
-        with self.connect() as conn:
-            for enrollment in enrollment_list:
-                conn.execute(
-                    """
-                    INSERT INTO enrollment (id, class_id, student_id)
-                    VALUES (?, ?, ?)
-                    """,
-                    (enrollment.id, enrollment.class_id, enrollment.student_id),
-                )
+        with self.pool.writer() as conn:
+            insert_enrollments_internal(conn, enrollment_list)
             conn.commit()
-            return enrollment_list
+            if self.roster is not None:
+                self.roster.put_enrollments(conn, enrollment_list)
+        return enrollment_list
 
     def delete(self, class_id: str, student_id: str):
-        with self.connect() as conn:
-            exec = conn.execute(
+        with self.pool.writer() as conn:
+            deleted = conn.execute(
                 """
                 DELETE FROM enrollment
                 WHERE class_id = ? AND student_id = ?
+                RETURNING id
                 """,
                 (class_id, student_id),
-            )
+            ).fetchall()
+            bump_versions_internal(conn, "enrollment")
             conn.commit()
-            return exec.rowcount
-
-    def get_by_class(self, class_id: str) -> list[Enrollment]:
-        with self.connect() as conn:
+            if self.cache is not None:
+                self.cache.written(
+                    conn, "enrollment", [("enrollment", row[0]) for row in deleted]
+                )
+            if self.roster is not None:
+                self.roster.remove_enrollments(conn, class_id, student_id)
+        return len(deleted)
+
+    def get_by_class(
+        self,
+        class_id: str,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Page[Enrollment]:
+        limit = page_size(limit)
+        with self.pool.reader() as conn:
             raw_list = conn.execute(
                 """
                 SELECT * FROM enrollment
-                WHERE class_id = ?
+                WHERE class_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
                 """,
-                (class_id,),
+                (class_id, decode_cursor(cursor), limit + 1),
             )
-            rows = raw_list.fetchall()
-            result = []
-            for row in rows:
-                result.append(Enrollment(id=row[0], class_id=row[1], student_id=row[2]))
-            return result
+            rows, next_cursor = paginate(raw_list.fetchall(), limit)
+            result = [enrollment_from_row(row) for row in rows]
+            return Page(items=result, next_cursor=next_cursor)
 
     def get(self, en_id: str) -> Enrollment:
-        with self.connect() as conn:
+        if self.cache is not None:
+            return self.cache.get(
+                ("enrollment", en_id), lambda: self._get(en_id), ("enrollment",)
+            )
+        return self._get(en_id)
+
+    def _get(self, en_id: str) -> Enrollment:
+        with self.pool.reader() as conn:
             raw_list = conn.execute(
                 """
                 SELECT * FROM enrollment
@@ -118,11 +151,10 @@ class EnrollmentDBHandler:
                 (en_id,),
             )
             row = raw_list.fetchone()
-            return Enrollment(id=row[0], class_id=row[1], student_id=row[2])
+            return enrollment_from_row(row)
 
     def get_by_student(self, student_id: str) -> list[Enrollment]:
-        print("stu", student_id)
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             raw_list = conn.execute(
                 """
                 SELECT * FROM enrollment
@@ -132,41 +164,32 @@ class EnrollmentDBHandler:
                 (student_id,),
             )
             rows = raw_list.fetchall()
-            result = []
-            for row in rows:
-                result.append(Enrollment(id=row[0], class_id=row[1], student_id=row[2]))
+            result = [enrollment_from_row(row) for row in rows]
             return result
 
     def list_enrollment(self) -> list[Enrollment]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             raw_list = conn.execute("SELECT * FROM enrollment")
             rows = raw_list.fetchall()
-            result = []
-            for row in rows:
-                result.append(Enrollment(id=row[0], class_id=row[1], student_id=row[2]))
+            result = [enrollment_from_row(row) for row in rows]
             return result
 
     def list_enrollment_by_class(self, class_id) -> list[Enrollment]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             raw_list = conn.execute(
                 """
-                SELECT * FROM enrollment e
-                JOIN classroom c on c.id = e.id
-                WHERE c.id == ?
+                SELECT * FROM enrollment WHERE class_id = ?
                 """,
                 (class_id,),
             )
             rows = raw_list.fetchall()
-            print(rows)
-            result = []
-            for row in rows:
-                result.append(Enrollment(id=row[0], class_id=row[1], student_id=row[2]))
+            result = [enrollment_from_row(row) for row in rows]
             return result
 
     def get_join_by_enrollment_id(
         self, enrollment_id: str
     ) -> list[EnrollmentJoinResult]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             return get_join_by_enrollment_id_internal(conn, enrollment_id)
 
 
@@ -212,3 +235,18 @@ def get_join_by_enrollment_id_internal(
             )
         )
     return result
+
+
+def insert_enrollments_internal(conn, enrollment_list: list[Enrollment]):
+    conn.executemany(
+        """
+        INSERT INTO enrollment (id, class_id, student_id)
+        VALUES (?, ?, ?)
+        """,
+        [
+            (enrollment.id, enrollment.class_id, enrollment.student_id)
+            for enrollment in enrollment_list
+        ],
+    )
+    if enrollment_list:
+        bump_versions_internal(conn, "enrollment")
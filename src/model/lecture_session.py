@@ -0,0 +1,382 @@
+import json
+import math
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, List, Optional
+
+from pydantic import BaseModel
+
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.attendance_detail import (
+    enrolled_students_internal,
+    uncache_counters_internal,
+)
+from src.model.classroom import Classroom, classroom_from_row
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+    from src.scheduler import Scheduler
+
+# scheduler job that runs sweep_absent
+ABSENT_SWEEP_JOB = "absent_sweep"
+# scheduler job that warms the rosters of lectures about to start
+LECTURE_WARMUP_JOB = "lecture_warmup"
+
+# lecture_time values before this (2000-01-01) are not the start of a first
+# lecture; older databases stored the hour of the day there
+MIN_LECTURE_TIME = 946684800.0
+
+# session ids are derived from (class id, start time) so every writer agrees
+# on them without looking anything up
+SESSION_NAMESPACE = uuid.UUID("6f1d7a52-3c1e-4b8e-9a57-2f0c3f7d5e11")
+
+
+class SessionSettings(BaseModel):
+    """How lecture sessions recur from a classroom's ``lecture_time``.
+
+    Read from the environment with the ``MAS_SESSION_`` prefix, e.g.
+    ``MAS_SESSION_PERIOD_DAYS=14`` for fortnightly lectures.
+    """
+
+    period_days: float = 7.0
+    # check-ins this long before a session starts still count towards it
+    early_minutes: float = 30.0
+    # how far ahead of now sessions are materialized
+    horizon_days: float = 14.0
+    # how far back of now sessions are materialized, e.g. on first boot
+    lookback_days: float = 7.0
+
+    @classmethod
+    def from_env(cls) -> "SessionSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_SESSION_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class LectureSession(BaseModel):
+    id: str
+    class_id: str
+    start_time: float
+    end_time: float
+    # when the absent sweep ran for this session
+    swept_at: Optional[float] = None
+
+
+class AbsentSweep(BaseModel):
+    sessions: int
+    absences: int
+
+
+lecture_session_from_row = row_factory(
+    LectureSession, ("id", "class_id", "start_time", "end_time", "swept_at")
+)
+
+
+LECTURE_SESSION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS lecture_session (
+    id TEXT PRIMARY KEY NOT NULL,
+    class_id TEXT NOT NULL,
+    start_time FLOAT NOT NULL,
+    end_time FLOAT NOT NULL,
+    FOREIGN KEY (class_id) REFERENCES classroom(id)
+)
+"""
+
+LECTURE_SESSION_SWEPT_COLUMN_SQL = """
+ALTER TABLE lecture_session ADD COLUMN swept_at FLOAT NULL
+"""
+
+# a random version 4 uuid, formatted like str(uuid.uuid4())
+_UUID4_SQL = """lower(
+    hex(randomblob(4)) || '-' || hex(randomblob(2)) || '-4'
+    || substr(hex(randomblob(2)), 2) || '-'
+    || substr('89ab', 1 + abs(random()) % 4, 1) || substr(hex(randomblob(2)), 2)
+    || '-' || hex(randomblob(6))
+)"""
+
+# One ABSENT row per enrollment of every ended, unswept session that has no
+# check-in linked to it or in its window. The attendance_detail triggers
+# count them as part of the same statement.
+ABSENT_SWEEP_SQL = """
+INSERT INTO attendance (id, enrollment_id, last_record, entry_time,
+                        punctuality, session_id)
+SELECT {}, e.id, 0, s.start_time, 'absent', s.id
+FROM lecture_session s
+JOIN enrollment e ON e.class_id = s.class_id
+WHERE s.swept_at IS NULL AND s.end_time <= :now
+  AND NOT EXISTS (
+      SELECT 1 FROM attendance a
+      WHERE a.enrollment_id = e.id
+        AND (a.session_id = s.id
+             OR (a.entry_time >= s.start_time - :early
+                 AND a.entry_time < s.end_time))
+  )
+RETURNING enrollment_id
+""".format(
+    _UUID4_SQL
+)
+
+
+def session_id(class_id: str, start_time: float) -> str:
+    return str(uuid.uuid5(SESSION_NAMESPACE, "{}:{:.3f}".format(class_id, start_time)))
+
+
+def late_until(start_time: float) -> float:
+    # justify_punctuality scores a check-in LATE up to the end of the clock
+    # hour the lecture starts in, which can outlast a short lecture
+    hour = datetime.fromtimestamp(start_time).replace(minute=0, second=0, microsecond=0)
+    return (hour + timedelta(hours=1)).timestamp()
+
+
+def make_session(classroom: Classroom, index: int, period: float) -> LectureSession:
+    start = classroom.lecture_time + index * period
+    return LectureSession(
+        id=session_id(classroom.id, start),
+        class_id=classroom.id,
+        start_time=start,
+        # duration is in seconds; the late window can outlast a short lecture
+        end_time=max(
+            start + max(classroom.duration, classroom.late_penalty_duration),
+            late_until(start),
+        ),
+    )
+
+
+def has_schedule(classroom: Classroom) -> bool:
+    return classroom.lecture_time >= MIN_LECTURE_TIME
+
+
+def session_for(
+    classroom: Classroom, entry_time: float, settings: SessionSettings
+) -> LectureSession | None:
+    """The occurrence of ``classroom`` a check-in at ``entry_time`` belongs to."""
+    if not has_schedule(classroom):
+        return None
+    period = settings.period_days * 86400
+    early = settings.early_minutes * 60
+    index = math.floor((entry_time + early - classroom.lecture_time) / period)
+    if index < 0:
+        return None
+    session = make_session(classroom, index, period)
+    if session.start_time - early <= entry_time < session.end_time:
+        return session
+    return None
+
+
+def sessions_until(
+    classroom: Classroom,
+    until: float,
+    settings: SessionSettings,
+    since: float | None = None,
+) -> List[LectureSession]:
+    """Occurrences of ``classroom`` starting in ``[since, until]``.
+
+    ``since`` defaults to ``lookback_days`` before now, so a classroom first
+    seen long after its first lecture does not get every past occurrence.
+    """
+    if not has_schedule(classroom):
+        return []
+    period = settings.period_days * 86400
+    if since is None:
+        since = time.time() - settings.lookback_days * 86400
+    first = max(0, math.ceil((since - classroom.lecture_time) / period))
+    count = max(0, math.floor((until - classroom.lecture_time) / period) + 1)
+    return [make_session(classroom, index, period) for index in range(first, count)]
+
+
+def insert_lecture_sessions_internal(conn, session_list: list[LectureSession]):
+    # sessions that are already over when they are created are history, not
+    # something the absent sweep should fill in
+    now = time.time()
+    conn.executemany(
+        """
+        INSERT OR IGNORE INTO lecture_session
+        (id, class_id, start_time, end_time, swept_at)
+        VALUES (?, ?, ?, ?, ?)
+        """,
+        [
+            (
+                session.id,
+                session.class_id,
+                session.start_time,
+                session.end_time,
+                session.end_time if session.end_time <= now else None,
+            )
+            for session in session_list
+        ],
+    )
+
+
+def materialize_sessions_internal(
+    conn,
+    classroom_list: list[Classroom],
+    settings: SessionSettings,
+    since: float | None = None,
+):
+    until = time.time() + settings.horizon_days * 86400
+    insert_lecture_sessions_internal(
+        conn,
+        [
+            session
+            for classroom in classroom_list
+            for session in sessions_until(classroom, until, settings, since)
+        ],
+    )
+
+
+class LectureSessionDBHandler:
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        settings: SessionSettings | None = None,
+        scheduler: "Scheduler | None" = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.settings = settings or SessionSettings()
+        self.scheduler = scheduler
+        self.cache = cache
+
+    def materialize(self, class_ids: list[str] | None = None) -> int:
+        """Create every session up to the horizon that does not exist yet."""
+        with self.pool.writer() as conn:
+            if class_ids is None:
+                rows = conn.execute("SELECT * FROM classroom")
+            else:
+                rows = conn.execute(
+                    "SELECT * FROM classroom"
+                    " WHERE id IN (SELECT value FROM json_each(?))",
+                    (json.dumps(class_ids),),
+                )
+            before = conn.total_changes
+            materialize_sessions_internal(
+                conn, [classroom_from_row(row) for row in rows], self.settings
+            )
+            created = conn.total_changes - before
+        self._expedite_sweep()
+        return created
+
+    def reschedule(self, class_id: str) -> int:
+        """Replace the upcoming sessions of a classroom after its schedule moved.
+
+        Past sessions keep their ids so attendance already linked to them
+        stays linked.
+        """
+        now = time.time()
+        with self.pool.writer() as conn:
+            conn.execute(
+                "DELETE FROM lecture_session WHERE class_id = ? AND start_time >= ?",
+                (class_id, now),
+            )
+            rows = conn.execute("SELECT * FROM classroom WHERE id = ?", (class_id,))
+            before = conn.total_changes
+            materialize_sessions_internal(
+                conn, [classroom_from_row(row) for row in rows], self.settings, now
+            )
+            created = conn.total_changes - before
+        self._expedite_sweep()
+        return created
+
+    def _expedite_sweep(self):
+        # a new session may close its late window before the sweep is due
+        if self.scheduler is None:
+            return
+        due = self.next_sweep_due()
+        if due is not None:
+            self.scheduler.expedite(ABSENT_SWEEP_JOB, due)
+
+    def sweep_absent(self, now: float | None = None) -> AbsentSweep:
+        """Record every no-show of the sessions whose late window has closed.
+
+        Two statements however large the classes are, ``ABSENT_SWEEP_SQL``
+        and marking the sessions swept, in one transaction (plus a version
+        bump when absences were recorded).
+        """
+        now = time.time() if now is None else now
+        with self.pool.writer() as conn:
+            absent = conn.execute(
+                ABSENT_SWEEP_SQL,
+                {"now": now, "early": self.settings.early_minutes * 60},
+            ).fetchall()
+            sessions = conn.execute(
+                """
+                UPDATE lecture_session SET swept_at = ?
+                WHERE swept_at IS NULL AND end_time <= ?
+                """,
+                (now, now),
+            ).rowcount
+            if absent:
+                bump_versions_internal(conn, "attendance", "attendance_detail")
+            conn.commit()
+            if absent and self.cache is not None:
+                uncache_counters_internal(
+                    conn,
+                    self.cache,
+                    enrolled_students_internal(conn, [row[0] for row in absent]),
+                )
+        return AbsentSweep(sessions=sessions, absences=len(absent))
+
+    def next_sweep_due(self) -> float | None:
+        """When the next unswept session's late window closes."""
+        with self.pool.reader() as conn:
+            return conn.execute(
+                "SELECT MIN(end_time) FROM lecture_session WHERE swept_at IS NULL"
+            ).fetchone()[0]
+
+    def starting(self, start: float, end: float) -> list[str]:
+        """Ids of the classrooms with a session starting in ``[start, end]``."""
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                """
+                SELECT DISTINCT class_id FROM lecture_session
+                WHERE start_time >= ? AND start_time <= ?
+                """,
+                (start, end),
+            )
+            return [row[0] for row in rows]
+
+    def next_start_after(self, after: float) -> float | None:
+        with self.pool.reader() as conn:
+            return conn.execute(
+                "SELECT MIN(start_time) FROM lecture_session WHERE start_time > ?",
+                (after,),
+            ).fetchone()[0]
+
+    def delete_by_class(self, class_id: str) -> int:
+        with self.pool.writer() as conn:
+            exec = conn.execute(
+                "DELETE FROM lecture_session WHERE class_id = ?", (class_id,)
+            )
+            return exec.rowcount
+
+    def get(self, id: str) -> LectureSession | None:
+        with self.pool.reader() as conn:
+            row = conn.execute(
+                "SELECT * FROM lecture_session WHERE id = ?", (id,)
+            ).fetchone()
+            return lecture_session_from_row(row) if row else None
+
+    def list_by_class(
+        self, class_id: str, start: float | None = None, end: float | None = None
+    ) -> List[LectureSession]:
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                """
+                SELECT * FROM lecture_session
+                WHERE class_id = ? AND start_time >= ? AND start_time < ?
+                ORDER BY start_time
+                """,
+                (
+                    class_id,
+                    float("-inf") if start is None else start,
+                    float("inf") if end is None else end,
+                ),
+            )
+            return [lecture_session_from_row(row) for row in rows]
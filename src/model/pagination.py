@@ -0,0 +1,49 @@
+import base64
+import binascii
+import json
+from typing import Generic, Optional, TypeVar
+
+from pydantic import BaseModel
+
+from src.model.model_exception import InvalidQueryError
+
+T = TypeVar("T")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class Page(BaseModel, Generic[T]):
+    items: list[T]
+    next_cursor: Optional[str] = None
+
+
+def encode_cursor(key: str) -> str:
+    raw = json.dumps([key]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> str:
+    """Return the key a page starts after; the empty string sorts first."""
+    if not cursor:
+        return ""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        (key,) = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidQueryError("Invalid page cursor")
+    if not isinstance(key, str):
+        raise InvalidQueryError("Invalid page cursor")
+    return key
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def paginate(rows: list, limit: int, key_index: int = 0) -> tuple[list, Optional[str]]:
+    """Split a ``LIMIT limit + 1`` result into a page and the next cursor."""
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_cursor(rows[-1][key_index])
@@ -0,0 +1,200 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from pydantic import BaseModel
+
+from src.cache import TableVersionWatch
+from src.db import ConnectionPool
+from src.model.classroom import Classroom
+from src.model.enrollments import Enrollment
+
+# a write to either by another process drops the snapshot
+ROSTER_TABLES = ("classroom", "enrollment")
+
+
+class RosterSettings(BaseModel):
+    """Read from the environment with the ``MAS_ROSTER_`` prefix."""
+
+    # how often a lookup checks for classroom and enrollment writes made by
+    # other processes; those can be missed for this long
+    check_interval_seconds: float = 1.0
+
+    @classmethod
+    def from_env(cls) -> "RosterSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_ROSTER_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class RosterSnapshot:
+    """In-memory enrollment -> (student, classroom schedule) lookup.
+
+    Loaded once at startup and kept current by the enrollment, classroom and
+    student handlers after each of their writes commits. Enrollments written
+    by another process are not known here yet; those are fetched on first
+    use and added to the snapshot. Writes by other processes are noticed
+    through the ``table_version`` counters of classrooms and enrollments:
+    at most once per ``check_interval_seconds`` a lookup reads
+    ``PRAGMA data_version``, and the counters when anything committed, and
+    drops the snapshot if either table moved, so a schedule changed or an
+    enrollment deleted by another worker is not used for longer than that.
+    Between checks, scoring a check-in whose enrollment is known reads
+    nothing from the database.
+    """
+
+    def __init__(self, pool: ConnectionPool, settings: RosterSettings | None = None):
+        self.pool = pool
+        self.settings = settings or RosterSettings()
+        self._lock = threading.Lock()
+        # enrollment id -> (student id, class id)
+        self._enrollments: dict[str, tuple[str, str]] = {}
+        self._classrooms: dict[str, Classroom] = {}
+        self._watch = TableVersionWatch(pool.path)
+        self._checked_at = float("-inf")
+        # bumped whenever the snapshot is dropped, so rows read before that
+        # are not put back
+        self._generation = 0
+
+    def load(self):
+        with self._lock:
+            # anything committed after this is noticed by the next check
+            self._watch.changed()
+            self._checked_at = time.monotonic()
+            generation = self._generation
+        with self.pool.reader() as conn:
+            enrollments = {
+                row[0]: (row[1], row[2])
+                for row in conn.execute(
+                    "SELECT id, student_id, class_id FROM enrollment"
+                )
+            }
+            classrooms = {
+                row[0]: Classroom.parse_sql(row)
+                for row in conn.execute("SELECT * FROM classroom")
+            }
+        with self._lock:
+            if generation == self._generation:
+                self._enrollments = enrollments
+                self._classrooms = classrooms
+
+    # The methods below apply a write this process just committed on
+    # ``conn``, the writer, which the caller still holds: the write's own
+    # version bumps are taken as seen so they do not drop the snapshot.
+
+    def put_enrollments(
+        self, conn: sqlite3.Connection, enrollment_list: list[Enrollment]
+    ):
+        with self._lock:
+            for enrollment in enrollment_list:
+                self._enrollments[enrollment.id] = (
+                    enrollment.student_id,
+                    enrollment.class_id,
+                )
+            self._watch.advance(conn, ("enrollment",))
+
+    def remove_enrollments(
+        self, conn: sqlite3.Connection, class_id: str, student_id: str
+    ):
+        with self._lock:
+            self._enrollments = {
+                en_id: pair
+                for en_id, pair in self._enrollments.items()
+                if pair != (student_id, class_id)
+            }
+            self._watch.advance(conn, ("enrollment",))
+
+    def put_classrooms(self, conn: sqlite3.Connection, classroom_list: list[Classroom]):
+        with self._lock:
+            for classroom in classroom_list:
+                self._classrooms[classroom.id] = classroom
+            self._watch.advance(conn, ("classroom",))
+
+    def remove_classroom(self, conn: sqlite3.Connection, class_id: str):
+        with self._lock:
+            self._classrooms.pop(class_id, None)
+            self._watch.advance(conn, ("classroom",))
+
+    def get_student_id(self, enrollment_id: str) -> str | None:
+        with self._lock:
+            self._check_versions()
+            pair = self._enrollments.get(enrollment_id)
+        return pair[0] if pair else None
+
+    def resolve(self, enrollment_ids: list[str]) -> dict[str, Classroom]:
+        """Map enrollment ids to their classroom, reading only the misses."""
+        found: dict[str, Classroom] = {}
+        missing = []
+        with self._lock:
+            self._check_versions()
+            generation = self._generation
+            for en_id in enrollment_ids:
+                pair = self._enrollments.get(en_id)
+                classroom = self._classrooms.get(pair[1]) if pair else None
+                if classroom is None:
+                    missing.append(en_id)
+                else:
+                    found[en_id] = classroom
+        if missing:
+            found.update(self._fetch(missing, generation))
+        return found
+
+    def warm(self, class_ids: list[str]) -> list[str]:
+        """Load the enrollments of ``class_ids`` ahead of their check-ins.
+
+        Returns the ids of the students enrolled in them.
+        """
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                """
+                SELECT id, student_id FROM enrollment
+                WHERE class_id IN (SELECT value FROM json_each(?))
+                """,
+                (json.dumps(class_ids),),
+            ).fetchall()
+        self.resolve([row[0] for row in rows])
+        return sorted({row[1] for row in rows})
+
+    def close(self):
+        with self._lock:
+            self._watch.close()
+
+    def _check_versions(self):
+        # called with the lock held
+        now = time.monotonic()
+        if now - self._checked_at < self.settings.check_interval_seconds:
+            return
+        self._checked_at = now
+        if self._watch.changed().intersection(ROSTER_TABLES):
+            self._generation += 1
+            self._enrollments = {}
+            self._classrooms = {}
+
+    def _fetch(
+        self, enrollment_ids: list[str], generation: int
+    ) -> dict[str, Classroom]:
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                """
+                SELECT e.id, e.student_id, c.* FROM enrollment e
+                JOIN classroom c ON c.id = e.class_id
+                WHERE e.id IN (SELECT value FROM json_each(?))
+                """,
+                (json.dumps(list(set(enrollment_ids))),),
+            ).fetchall()
+
+        fetched = {}
+        with self._lock:
+            keep = generation == self._generation
+            for row in rows:
+                classroom = Classroom.parse_sql(row[2:])
+                if keep:
+                    self._enrollments[row[0]] = (row[1], classroom.id)
+                    self._classrooms[classroom.id] = classroom
+                fetched[row[0]] = classroom
+        return fetched
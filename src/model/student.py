@@ -1,12 +1,36 @@
-import sqlite3
+import json
 import uuid
-from collections.abc import Callable
-from typing import List, Optional, Union
+from typing import TYPE_CHECKING, List, Optional, Union
 
 from pydantic import BaseModel
 
-from src.model.attendance_detail import AttendanceDetail
-from src.model.enrollments import Enrollment
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.attendance_detail import (
+    AttendanceDetail,
+    attendance_detail_from_row,
+    create_attendance_detail,
+    insert_attendance_details_internal,
+    student_cache_keys,
+)
+from src.model.enrollments import (
+    Enrollment,
+    enrollment_from_row,
+    insert_enrollments_internal,
+)
+from src.model.pagination import (
+    DEFAULT_PAGE_SIZE,
+    Page,
+    decode_cursor,
+    page_size,
+    paginate,
+)
+from src.model.student_name import find_by_name_internal, search_names_internal
+from src.model.utils import row_factory
+
+if TYPE_CHECKING:
+    from src.cache import ObjectCache
+    from src.model.roster import RosterSnapshot
 
 # from src.model.enrollments import Enrollment, EnrollmentDBHandler
 # from src.model.utils import check_constraints
@@ -29,6 +53,20 @@ class StudentAttendanceEnrollment(BaseModel):
     enrollments: Union[list[str], list[Enrollment]]
 
 
+class StudentMatch(BaseModel):
+    student: Student
+    # "word" when every query term is a whole word of the name, "prefix" when
+    # every term starts one, "fuzzy" for a likely misspelling
+    match: str
+    # how closely the query terms match words of the name, from 0 to 1
+    score: float
+
+
+student_from_row = row_factory(
+    Student, ("id", "firstname", "lastname", "generation", "gender", "major")
+)
+
+
 def create_stud(
     firstname: str,
     lastname: str,
@@ -66,29 +104,44 @@ def update_stud(old: Student, modified: StudentModifiable) -> Student:
     )
 
 
+STUDENT_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS student (
+    id TEXT PRIMARY KEY NOT NULL,
+    firstname TEXT NOT NULL,
+    lastname TEXT NOT NULL,
+    generation INTEGER NOT NULL,
+    gender TEXT NOT NULL,
+    major TEXT NULL
+)
+"""
+
+
+# a student read with their counters and enrollments, e.g. the listing
+STUDENT_TABLES = ("student", "attendance_detail", "enrollment", "classroom")
+# a cached get() reads the same, but is dropped per student when their
+# counters change (uncache_counters_internal) rather than on every check-in
+STUDENT_CACHE_TABLES = ("student", "enrollment", "classroom")
+
+
 class StudentDBHandler:
-    def __init__(self, conn: Callable[..., sqlite3.Connection]):
-        self.connect = conn
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        roster: "RosterSnapshot | None" = None,
+        cache: "ObjectCache | None" = None,
+    ):
+        self.pool = pool
+        self.roster = roster
+        self.cache = cache
         # self.enrollmentHandler = EnrollmentDBHandler(conn)
 
     def init_table(self):
-        with self.connect() as conn:
-            conn.execute(
-                """
-                    CREATE TABLE IF NOT EXISTS student (
-                        id TEXT PRIMARY KEY NOT NULL,
-                        firstname TEXT NOT NULL,
-                        lastname TEXT NOT NULL,
-                        generation INTEGER NOT NULL,
-                        gender TEXT NOT NULL,
-                        major TEXT NULL
-                    )
-                """
-            )
+        with self.pool.writer() as conn:
+            conn.execute(STUDENT_TABLE_SQL)
             conn.commit()
 
     def create(self, student: Student):
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             conn.execute(
                 """
                     INSERT INTO student (id, firstname, lastname, generation,
@@ -104,40 +157,21 @@ class StudentDBHandler:
                     student.major or "",
                 ),
             )
+            bump_versions_internal(conn, "student")
             conn.commit()
 
     def get_by_name(self, fullname: str):
-        with self.connect() as conn:
-            splt = fullname.split(" ")
-            firstname = splt[0]
-
-            with self.connect() as conn:
-                single_res = None
-                if len(splt) < 2:
-                    single_res = conn.execute(
-                        "SELECT * FROM student WHERE firstname = ?",
-                        (firstname.lower(),),
-                    )
-                else:
-                    lastname = splt[1]
-                    single_res = conn.execute(
-                        "SELECT * FROM student WHERE firstname = ? AND lastname = ?",
-                        (firstname.lower(), lastname.lower()),
-                    )
-
-                row = single_res.fetchone()
-                if row:
-                    result = Student(
-                        id=row[0],
-                        firstname=row[1],
-                        lastname=row[2],
-                        generation=row[3],
-                        gender=row[4],
-                        major=row[5] or "",
-                    )
-                    return result
-
-                return None
+        with self.pool.reader() as conn:
+            row = find_by_name_internal(conn, fullname)
+            return student_from_row(row) if row else None
+
+    def search(self, query: str, limit: int = 10) -> List[StudentMatch]:
+        with self.pool.reader() as conn:
+            matches = search_names_internal(conn, query, limit)
+        return [
+            StudentMatch(student=student_from_row(row), match=match, score=score)
+            for row, match, score in matches
+        ]
 
     # def get_all_by_class(self,class_id:str):
     #     with self.connect() as conn:
@@ -164,38 +198,41 @@ class StudentDBHandler:
     #             return None
 
     def create_many(self, student_list: list[Student]):
-        with self.connect() as conn:
-            for student in student_list:
-                conn.execute(
-                    """
-                        INSERT INTO student (id, firstname, lastname,
-                                             generation, gender, major) 
-                        VALUES (?, ?, ?, ?, ?, ?);
-                    """,
-                    (
-                        student.id,
-                        student.firstname,
-                        "" if student.lastname is None else student.lastname.lower(),
-                        student.generation,
-                        student.gender,
-                        student.major,
-                    ),
-                )
-                conn.commit()
-                # Enrollment handling
-                # Assuming you have a function to get classroom id or pass it along with student creation
-                # self.enrollmentHandler.create(
-                #     Enrollment(class_id=class_id, student_id=student.id)
-                # )
+        with self.pool.writer() as conn:
+            insert_students_internal(conn, student_list)
+            conn.commit()
             return student_list
 
+    def register_many(
+        self,
+        student_list: list[Student],
+        enrollment_list: list[Enrollment] | None = None,
+    ) -> list[Student]:
+        """Insert students with their attendance_detail rows and enrollments.
+
+        All rows are prepared up front and written with ``executemany`` in a
+        single transaction, so a roster either lands completely or not at all.
+        """
+        attendance_details = [
+            create_attendance_detail(student_id=student.id) for student in student_list
+        ]
+        with self.pool.writer() as conn:
+            insert_students_internal(conn, student_list)
+            insert_attendance_details_internal(conn, attendance_details)
+            if enrollment_list:
+                insert_enrollments_internal(conn, enrollment_list)
+            conn.commit()
+            if enrollment_list and self.roster is not None:
+                self.roster.put_enrollments(conn, enrollment_list)
+        return student_list
+
     def update(self, id: str, modified: StudentModifiable):
         old = self.get(id)
         if old is None:
             raise Exception("Student not found")
 
         updated = update_stud(old, modified)
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             conn.execute(
                 """
                 UPDATE student
@@ -204,16 +241,31 @@ class StudentDBHandler:
                 """,
                 (updated.generation, updated.id),
             )
+            bump_versions_internal(conn, "student")
             conn.commit()
+            if self.cache is not None:
+                self.cache.written(conn, "student", student_cache_keys(id))
 
     def delete(self, id: str):
-        with self.connect() as conn:
+        with self.pool.writer() as conn:
             exec = conn.execute("DELETE FROM student WHERE id = ?", (id,))
+            bump_versions_internal(conn, "student")
             conn.commit()
+            if self.cache is not None:
+                self.cache.written(conn, "student", student_cache_keys(id))
             return exec.rowcount
 
     def get(self, id: str, full_enrollment: bool = True):
-        with self.connect() as conn:
+        if self.cache is not None:
+            return self.cache.get(
+                ("student", id, full_enrollment),
+                lambda: self._get(id, full_enrollment),
+                STUDENT_CACHE_TABLES,
+            )
+        return self._get(id, full_enrollment)
+
+    def _get(self, id: str, full_enrollment: bool = True):
+        with self.pool.reader() as conn:
             # Join student and attendance_detail tables
             query = """
             SELECT s.*, ad.*
@@ -225,44 +277,22 @@ class StudentDBHandler:
             result = conn.execute(query, (id,))
             row = result.fetchone()
 
-            student = Student(
-                id=row[0],
-                firstname=row[1],
-                lastname=row[2],
-                generation=row[3],
-                gender=row[4],
-                major=row[5],
-            )
+            student = student_from_row(row)
 
-            attendance = (
-                AttendanceDetail(
-                    id=row[6],
-                    absent_count=row[7],
-                    absent_with_permission=row[8],
-                    present_count=row[9],
-                    late_count=row[10],
-                    student_id=row[11],
-                )
-                if row[6]
-                else None
-            )
+            attendance = attendance_detail_from_row(row[6:12]) if row[6] else None
 
             # Fetch enrollments
             if full_enrollment:
-                enrollment_query = """
-                SELECT c.subject_name, c.lecturer_name, c.duration FROM enrollment e
-                JOIN classroom c ON e.class_id = c.id
-                WHERE student_id = ?
-                """
-                cursor = conn.execute(enrollment_query, (student.id,))
-                print(cursor.fetchall())
                 enrollments = [
-                    Enrollment(id=e_row[0], class_id=e_row[1], student_id=e_row[2])
-                    for e_row in cursor.fetchall()
+                    enrollment_from_row(e_row)
+                    for e_row in conn.execute(
+                        """
+                        SELECT id, class_id, student_id FROM enrollment
+                        WHERE student_id = ?
+                        """,
+                        (student.id,),
+                    )
                 ]
-                return StudentAttendanceEnrollment(
-                    student=student, attendance=attendance, enrollments=enrollments
-                )
             else:
                 enrollment_query = """
                 SELECT c.subject_name FROM enrollment e
@@ -273,90 +303,105 @@ class StudentDBHandler:
                     e_row[0] for e_row in conn.execute(enrollment_query, (student.id,))
                 ]
 
-                return StudentAttendanceEnrollment(
-                    student=student, attendance=attendance, enrollments=enrollments
-                )
+            return StudentAttendanceEnrollment.model_construct(
+                student=student, attendance=attendance, enrollments=enrollments
+            )
 
     def list(self) -> list[Student]:
-        with self.connect() as conn:
+        with self.pool.reader() as conn:
             raw_list = conn.execute("SELECT * FROM student")
             rows = raw_list.fetchall()
-            result = []
-
-            for row in rows:
-                result.append(
-                    Student(
-                        id=row[0],
-                        firstname=row[1],
-                        lastname=row[2],
-                        generation=row[3],
-                        gender=row[4],
-                    )
-                )
-            return result
+            return [student_from_row(row) for row in rows]
 
     def list_student_attendance_enrollment(
-        self, full_enrollment: bool = False
-    ) -> List[StudentAttendanceEnrollment]:
-        with self.connect() as conn:
+        self,
+        full_enrollment: bool = False,
+        cursor: str | None = None,
+        limit: int = DEFAULT_PAGE_SIZE,
+    ) -> Page[StudentAttendanceEnrollment]:
+        # Enrollments are folded into a JSON array per student by a correlated
+        # subquery on idx_enrollment_student_id, so the whole listing is a
+        # single statement no matter how many students there are.
+        if full_enrollment:
+            enrollment_json = """
+                SELECT json_group_array(json_object(
+                    'id', e.id, 'class_id', e.class_id, 'student_id', e.student_id
+                ))
+                FROM enrollment e
+                WHERE e.student_id = s.id
+            """
+        else:
+            enrollment_json = """
+                SELECT json_group_array(c.subject_name)
+                FROM enrollment e
+                JOIN classroom c ON e.class_id = c.id
+                WHERE e.student_id = s.id
+            """
+
+        limit = page_size(limit)
+        with self.pool.reader() as conn:
             # Join student and attendance_detail tables
             query = """
-            SELECT s.*, ad.*
+            SELECT s.*, ad.*, ({}) AS enrollments
             FROM student s
             LEFT JOIN attendance_detail ad ON s.id = ad.student_id
-            """
-            result = conn.execute(query)
-            rows = result.fetchall()
+            WHERE s.id > ?
+            ORDER BY s.id
+            LIMIT ?
+            """.format(
+                enrollment_json
+            )
+            result = conn.execute(query, (decode_cursor(cursor), limit + 1))
+            rows, next_cursor = paginate(result.fetchall(), limit)
 
             student_data = []
             for row in rows:
-                student = Student(
-                    id=row[0],
-                    firstname=row[1],
-                    lastname=row[2],
-                    generation=row[3],
-                    gender=row[4],
-                    major=row[5],
-                )
-                attendance = (
-                    AttendanceDetail(
-                        id=row[6],
-                        absent_count=row[7],
-                        absent_with_permission=row[8],
-                        present_count=row[9],
-                        late_count=row[10],
-                        student_id=row[11],
-                    )
-                    if row[6]
-                    else None
-                )
+                student = student_from_row(row)
+                attendance = attendance_detail_from_row(row[6:12]) if row[6] else None
 
-                # Fetch enrollments
+                enrollments = json.loads(row[12])
                 if full_enrollment:
-                    enrollment_query = """
-                    SELECT c.subject_name, c.lecturer_name, c.duration FROM enrollment e
-                    JOIN classroom c ON e.class_id = c.id
-                    WHERE student_id = ?
-                    """
                     enrollments = [
-                        Enrollment(id=e_row[0], class_id=e_row[1], student_id=e_row[2])
-                        for e_row in conn.execute(enrollment_query, (student.id,))
+                        enrollment_from_row((e["id"], e["class_id"], e["student_id"]))
+                        for e in enrollments
                     ]
-                else:
-                    enrollment_query = """
-                    SELECT c.subject_name FROM enrollment e
-                    JOIN classroom c ON e.class_id = c.id
-                    WHERE student_id = ?
-                    """
-                    enrollments = [
-                        e_row[0]
-                        for e_row in conn.execute(enrollment_query, (student.id,))
-                    ]
-                print("ENC", enrollments)
+
                 student_data.append(
-                    StudentAttendanceEnrollment(
+                    StudentAttendanceEnrollment.model_construct(
                         student=student, attendance=attendance, enrollments=enrollments
                     )
                 )
 
-            return student_data
+            return Page(items=student_data, next_cursor=next_cursor)
+
+
+def insert_students_internal(conn, student_list: list[Student]):
+    # One statement rather than executemany: every insert fires the name
+    # search triggers, and FTS5 flushes its pending index data at the
+    # statement savepoint those open, once per statement.
+    conn.execute(
+        """
+        INSERT INTO student (id, firstname, lastname, generation, gender, major)
+        SELECT json_extract(value, '$[0]'), json_extract(value, '$[1]'),
+               json_extract(value, '$[2]'), json_extract(value, '$[3]'),
+               json_extract(value, '$[4]'), json_extract(value, '$[5]')
+        FROM json_each(?)
+        """,
+        (
+            json.dumps(
+                [
+                    (
+                        student.id,
+                        student.firstname,
+                        "" if student.lastname is None else student.lastname.lower(),
+                        student.generation,
+                        student.gender,
+                        student.major,
+                    )
+                    for student in student_list
+                ]
+            ),
+        ),
+    )
+    if student_list:
+        bump_versions_internal(conn, "student")
@@ -0,0 +1,214 @@
+import re
+import unicodedata
+from difflib import SequenceMatcher
+
+# Names are searched through ``student_name``, a copy of each student's
+# normalized first and last name kept by triggers on ``student``. It has an
+# INTEGER PRIMARY KEY, so its rowids survive VACUUM and the external content
+# FTS5 index over it stays valid; ``student`` itself has a TEXT key.
+STUDENT_NAME_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS student_name (
+    rowid INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL UNIQUE,
+    firstname TEXT NOT NULL,
+    lastname TEXT NOT NULL
+)
+"""
+
+# unicode61 folds case and diacritics; prefix='2 3' indexes short prefixes so
+# "jo"* does not have to walk every term starting with "jo"
+STUDENT_NAME_FTS_SQL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS student_name_fts USING fts5(
+    firstname, lastname,
+    content='student_name', content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+)
+"""
+
+# exact lookups match case-insensitively on this index
+STUDENT_NAME_LOWER_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_student_name_lower
+ON student(lower(firstname), lower(lastname))
+"""
+
+_NORMALIZED = "lower(trim(NEW.firstname)), lower(trim(COALESCE(NEW.lastname, '')))"
+
+_FTS_INSERT = """
+    INSERT INTO student_name_fts (rowid, firstname, lastname)
+    VALUES (NEW.rowid, NEW.firstname, NEW.lastname);
+"""
+
+_FTS_DELETE = """
+    INSERT INTO student_name_fts (student_name_fts, rowid, firstname, lastname)
+    VALUES ('delete', OLD.rowid, OLD.firstname, OLD.lastname);
+"""
+
+STUDENT_NAME_TRIGGERS_SQL = [
+    "CREATE TRIGGER IF NOT EXISTS student_name_fts_insert"
+    " AFTER INSERT ON student_name BEGIN {} END".format(_FTS_INSERT),
+    "CREATE TRIGGER IF NOT EXISTS student_name_fts_delete"
+    " AFTER DELETE ON student_name BEGIN {} END".format(_FTS_DELETE),
+    "CREATE TRIGGER IF NOT EXISTS student_name_fts_update"
+    " AFTER UPDATE ON student_name BEGIN {} {} END".format(_FTS_DELETE, _FTS_INSERT),
+    """
+    CREATE TRIGGER IF NOT EXISTS student_name_sync_insert AFTER INSERT ON student
+    BEGIN
+        INSERT INTO student_name (student_id, firstname, lastname)
+        VALUES (NEW.id, {});
+    END
+    """.format(
+        _NORMALIZED
+    ),
+    """
+    CREATE TRIGGER IF NOT EXISTS student_name_sync_delete AFTER DELETE ON student
+    BEGIN
+        DELETE FROM student_name WHERE student_id = OLD.id;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS student_name_sync_update
+    AFTER UPDATE OF id, firstname, lastname ON student
+    BEGIN
+        DELETE FROM student_name WHERE student_id = OLD.id;
+        INSERT INTO student_name (student_id, firstname, lastname)
+        VALUES (NEW.id, {});
+    END
+    """.format(
+        _NORMALIZED
+    ),
+]
+
+STUDENT_NAME_BACKFILL_SQL = """
+INSERT OR IGNORE INTO student_name (student_id, firstname, lastname)
+SELECT id, lower(trim(firstname)), lower(trim(COALESCE(lastname, '')))
+FROM student
+"""
+
+# fuzzy matches below this similarity to the query are dropped
+FUZZY_THRESHOLD = 0.6
+# index hits fetched and re-ranked in Python per match kind
+SEARCH_CANDIDATES = 50
+
+
+def name_terms(text: str) -> list[str]:
+    """Lower case words of ``text`` with diacritics removed, like the index."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return re.findall(
+        r"\w+", "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    )
+
+
+def similarity(terms: list[str], firstname: str, lastname: str) -> float:
+    """How well each query term matches its closest word of the name.
+
+    A term is scored with ``SequenceMatcher.ratio`` against the words of the
+    name. When the term starts a word that ratio is known without running
+    the matcher, which is the common case for index hits.
+    """
+    words = name_terms("{} {}".format(firstname, lastname))
+    if not words:
+        return 0.0
+    total = 0.0
+    for term in terms:
+        prefixed = [len(word) for word in words if word.startswith(term)]
+        if prefixed:
+            total += 2 * len(term) / (len(term) + min(prefixed))
+        else:
+            total += max(SequenceMatcher(None, term, word).ratio() for word in words)
+    return total / len(terms)
+
+
+def find_by_name_internal(conn, fullname: str):
+    """First student whose name equals ``fullname``, ignoring case."""
+    parts = fullname.split(maxsplit=1)
+    if not parts:
+        return None
+    if len(parts) == 1:
+        return conn.execute(
+            "SELECT * FROM student WHERE lower(firstname) = lower(?) LIMIT 1",
+            (parts[0],),
+        ).fetchone()
+    return conn.execute(
+        """
+        SELECT * FROM student
+        WHERE lower(firstname) = lower(?) AND lower(lastname) = lower(?)
+        LIMIT 1
+        """,
+        (parts[0], parts[1]),
+    ).fetchone()
+
+
+def search_names_internal(conn, query: str, limit: int) -> list[tuple]:
+    """Ranked ``(student row, match, score)`` triples for a free text query.
+
+    Students whose name contains every query term as a whole word come
+    first ("word"), then those where every term starts a word ("prefix").
+    Only when neither finds anyone are likely misspellings looked up
+    ("fuzzy"). Each kind reads at most ``SEARCH_CANDIDATES`` index hits and
+    ranks them by ``similarity``; bm25 ordering would have to score every
+    hit of a common name first.
+    """
+    terms = name_terms(query)
+    if not terms:
+        return []
+    searches = (
+        ("word", _all('"{}"'.format(term) for term in terms)),
+        ("prefix", _all('"{}"*'.format(term) for term in terms)),
+        (
+            "fuzzy",
+            _all(
+                "({})".format(" OR ".join('"{}"*'.format(v) for v in _edits(term)))
+                for term in terms
+            ),
+        ),
+    )
+
+    found: list[tuple] = []
+    seen: set[str] = set()
+    for match, expression in searches:
+        if match == "fuzzy" and found:
+            break
+        rows = conn.execute(
+            """
+            SELECT s.*, n.firstname, n.lastname FROM student_name_fts f
+            JOIN student_name n ON n.rowid = f.rowid
+            JOIN student s ON s.id = n.student_id
+            WHERE student_name_fts MATCH ?
+            LIMIT ?
+            """,
+            (expression, SEARCH_CANDIDATES),
+        ).fetchall()
+        for row, _, score in _ranked(rows, terms, match):
+            if row[0] in seen or (match == "fuzzy" and score < FUZZY_THRESHOLD):
+                continue
+            seen.add(row[0])
+            found.append((row, match, score))
+            if len(found) == limit:
+                return found
+    return found
+
+
+def _all(expressions) -> str:
+    return " AND ".join(expressions)
+
+
+def _edits(term: str) -> set[str]:
+    """``term`` with any two neighbouring letters swapped or one letter dropped.
+
+    Looked up as prefixes, these find "john" for "jhon" or "johhn". Letters
+    are only dropped from terms of four or more, so no prefix gets shorter
+    than three letters.
+    """
+    edits = {term}
+    edits.update(
+        term[:i] + term[i + 1] + term[i] + term[i + 2 :] for i in range(len(term) - 1)
+    )
+    if len(term) >= 4:
+        edits.update(term[:i] + term[i + 1 :] for i in range(len(term)))
+    return edits
+
+
+def _ranked(rows: list[tuple], terms: list[str], match: str) -> list[tuple]:
+    scored = [(row[:-2], match, similarity(terms, row[-2], row[-1])) for row in rows]
+    # sorted() is stable, so equally similar names stay in index order
+    return sorted(scored, key=lambda item: -item[2])
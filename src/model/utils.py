@@ -1,4 +1,8 @@
 import sqlite3
+from collections.abc import Callable, Sequence
+from enum import Enum
+
+from pydantic import BaseModel
 
 from src.model.model_exception import NotFoundError
 
@@ -10,3 +14,67 @@ def check_constraints(conn: sqlite3.Connection, table: str, id: str):
     if entity is None:
         raise NotFoundError("Invalid {} id for attendance".format(table))
     return entity
+
+
+def row_factory(
+    model: type[BaseModel],
+    columns: Sequence[str],
+    converters: dict[str, Callable] | None = None,
+) -> Callable[[Sequence], BaseModel]:
+    """Compile a mapper from a trusted database row to ``model``.
+
+    Rows read back from our own tables were validated on the way in, so the
+    mapper skips pydantic validation entirely: it fills a copy of the model's
+    defaults with the row values in ``columns`` order and attaches it to a
+    bare instance, the same way ``model_construct`` does but without its
+    per-call field introspection. ``converters`` turn raw column values into
+    the field's type where serialization cares, e.g. str -> Enum; an Enum
+    class is swapped for a plain value -> member lookup, which is several
+    times cheaper than calling the class.
+    """
+    fields = model.model_fields
+    required = {name for name, field in fields.items() if field.is_required()}
+    if not required <= set(columns):
+        raise ValueError(
+            "{} row factory is missing {}".format(
+                model.__name__, ", ".join(sorted(required - set(columns)))
+            )
+        )
+
+    template = {
+        name: (
+            None
+            if field.is_required()
+            else field.get_default(call_default_factory=True)
+        )
+        for name, field in fields.items()
+    }
+    covers_all = set(columns) == set(fields)
+    fields_set = set(columns)
+    names = tuple(columns)
+    width = len(names)
+    convert = []
+    for name, converter in (converters or {}).items():
+        if isinstance(converter, type) and issubclass(converter, Enum):
+            converter = {member.value: member for member in converter}.__getitem__
+        convert.append((name, converter))
+    new = model.__new__
+    setattr_ = object.__setattr__
+
+    def build(row: Sequence) -> BaseModel:
+        if covers_all and len(row) == width:
+            values = dict(zip(names, row))
+        else:
+            values = template.copy()
+            values.update(zip(names, row))
+        for name, converter in convert:
+            if values[name] is not None:
+                values[name] = converter(values[name])
+        instance = new(model)
+        setattr_(instance, "__dict__", values)
+        setattr_(instance, "__pydantic_fields_set__", set(fields_set))
+        setattr_(instance, "__pydantic_extra__", None)
+        setattr_(instance, "__pydantic_private__", None)
+        return instance
+
+    return build
@@ -0,0 +1,397 @@
+import argparse
+import logging
+import os
+import sqlite3
+import time
+from datetime import datetime
+from typing import Iterator, List
+
+from pydantic import BaseModel
+
+from src.cache import bump_versions_internal
+from src.db import ConnectionPool
+from src.model.attendance import (
+    ATTENDANCE_SESSION_COLUMN_SQL,
+    ATTENDANCE_SESSION_INDEX_SQL,
+    ATTENDANCE_TABLE_SQL,
+)
+
+logger = logging.getLogger(__name__)
+
+HOT_TABLE = "main.attendance"
+
+ATTENDANCE_PARTITION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS attendance_partition (
+    name TEXT PRIMARY KEY NOT NULL,
+    filename TEXT NOT NULL,
+    start_time FLOAT NOT NULL,
+    end_time FLOAT NOT NULL,
+    row_count INTEGER NOT NULL
+)
+"""
+
+# Holds the partition being rolled, and only inside the rollover's own
+# transaction, so no other connection ever sees a row here. The
+# attendance_detail delete trigger reads it to tell a row moving to its
+# partition from a row being deleted.
+ATTENDANCE_ROLLOVER_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS attendance_rollover (
+    name TEXT PRIMARY KEY NOT NULL
+)
+"""
+
+ATTENDANCE_PARTITION_COLUMNAR_SQL = """
+ALTER TABLE attendance_partition
+ADD COLUMN columnar INTEGER NOT NULL DEFAULT 0
+"""
+
+
+class PartitionSettings(BaseModel):
+    """Where closed attendance partitions live and how wide they are.
+
+    Read from the environment with the ``MAS_PARTITION_`` prefix, e.g.
+    ``MAS_PARTITION_MONTHS=6`` for half-year partitions.
+    """
+
+    # defaults to the directory holding the main database
+    directory: str | None = None
+    # months per partition, must divide 12; 4 is one term
+    months: int = 4
+    # SQLite allows 10 attached databases per connection by default
+    max_attached: int = 8
+
+    @classmethod
+    def from_env(cls) -> "PartitionSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_PARTITION_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class Partition(BaseModel):
+    name: str
+    filename: str
+    start_time: float
+    end_time: float
+    row_count: int
+    # converted to the columnar archive; no longer readable through SQLite
+    columnar: bool = False
+
+    @property
+    def alias(self) -> str:
+        return "p_" + self.name
+
+    @property
+    def table(self) -> str:
+        return self.alias + ".attendance"
+
+
+def partition_bounds(ts: float, months: int) -> tuple[str, float, float]:
+    """Name and [start, end) timestamps of the partition holding ``ts``."""
+    dto = datetime.fromtimestamp(ts)
+    first = (dto.month - 1) // months * months + 1
+    last = first + months
+    start = datetime(dto.year, first, 1)
+    end = datetime(dto.year + (last - 1) // 12, (last - 1) % 12 + 1, 1)
+    name = "{:04d}_{:02d}".format(dto.year, first)
+    return name, start.timestamp(), end.timestamp()
+
+
+class AttendancePartitions:
+    """Catalog of closed attendance partitions stored in their own files.
+
+    The ``attendance`` table in the main database is the hot partition that
+    every write goes to. ``rollover`` moves rows from before the current
+    partition into one SQLite file per closed partition and records it in
+    ``attendance_partition``; readers ATTACH those files on demand, only for
+    the partitions a query's time range overlaps.
+    """
+
+    def __init__(self, pool: ConnectionPool, settings: PartitionSettings | None = None):
+        self.pool = pool
+        self.settings = settings or PartitionSettings()
+        if 12 % self.settings.months:
+            raise ValueError("Partition width must divide 12 months")
+        self.directory = self.settings.directory or os.path.dirname(pool.path)
+
+    def list(self, conn: sqlite3.Connection | None = None) -> List[Partition]:
+        if conn is None:
+            with self.pool.reader() as conn:
+                return self.list(conn)
+        rows = conn.execute(
+            """
+            SELECT name, filename, start_time, end_time, row_count, columnar
+            FROM attendance_partition ORDER BY start_time
+            """
+        )
+        return [
+            Partition(
+                name=row[0],
+                filename=row[1],
+                start_time=row[2],
+                end_time=row[3],
+                row_count=row[4],
+                columnar=row[5],
+            )
+            for row in rows
+        ]
+
+    def tables(
+        self,
+        conn: sqlite3.Connection,
+        start: float | None = None,
+        end: float | None = None,
+        newest_first: bool = False,
+    ) -> Iterator[str]:
+        """Yield the attendance tables overlapping ``[start, end)``.
+
+        Partitions are attached lazily as the caller advances, so a lookup
+        that is satisfied by the hot table never opens an archive file.
+        """
+        partitions = [
+            partition
+            for partition in self.list(conn)
+            if not partition.columnar
+            and (start is None or partition.end_time > start)
+            and (end is None or partition.start_time < end)
+        ]
+        if newest_first:
+            yield HOT_TABLE
+            for partition in reversed(partitions):
+                self.attach(conn, partition)
+                yield partition.table
+        else:
+            for partition in partitions:
+                self.attach(conn, partition)
+                yield partition.table
+            yield HOT_TABLE
+
+    def attach_table(self, conn: sqlite3.Connection, table: str) -> bool:
+        """Attach the partition behind ``table``, a name ``tables`` yielded on
+        another connection; False if it is no longer readable through SQLite.
+        """
+        if table == HOT_TABLE:
+            return True
+        for partition in self.list(conn):
+            if partition.table == table and not partition.columnar:
+                self.attach(conn, partition)
+                return True
+        return False
+
+    def attach(self, conn: sqlite3.Connection, partition: Partition):
+        attached = [row[1] for row in conn.execute("PRAGMA database_list")]
+        if partition.alias in attached:
+            return
+        archives = [alias for alias in attached if alias.startswith("p_")]
+        if len(archives) >= self.settings.max_attached:
+            for alias in archives:
+                conn.execute("DETACH DATABASE {}".format(alias))
+        conn.execute(
+            "ATTACH DATABASE ? AS {}".format(partition.alias),
+            (os.path.join(self.directory, partition.filename),),
+        )
+
+    def rollover(self, now: float | None = None) -> List[Partition]:
+        """Move every row older than the current partition into its archive.
+
+        Each partition is copied and removed from the hot table in one
+        transaction on the writer. WAL makes that atomic per file only, so a
+        crash between the two commits can leave rows in both places. The copy
+        is ``INSERT OR IGNORE`` and simply finishes on the next run, and until
+        then ``recover``, which the app runs on startup, removes the hot
+        copies of rows the partition already holds.
+        """
+        _, hot_start, _ = partition_bounds(now or time.time(), self.settings.months)
+        rolled = []
+        after = float("-inf")
+        while True:
+            with self.pool.reader() as conn:
+                oldest = conn.execute(
+                    """
+                    SELECT MIN(entry_time) FROM main.attendance
+                    WHERE entry_time >= ? AND entry_time < ?
+                    """,
+                    (after, hot_start),
+                ).fetchone()[0]
+            if oldest is None:
+                return rolled
+            rolled.append(self._roll(*partition_bounds(oldest, self.settings.months)))
+            after = rolled[-1].end_time
+
+    def recover(self) -> int:
+        """Finish rollovers a crash left half done; return the rows removed.
+
+        ``_roll`` commits the partition file and the main database one after
+        the other. A crash between the two can leave a registered partition
+        holding rows that are still in the hot table too, which every read
+        would then return twice. The hot copies are deleted under the
+        rollover flag, since the counters already count each row once. A
+        partition that never got registered is not read, and the next
+        rollover finishes it.
+        """
+        removed = 0
+        for partition in self.list():
+            if partition.columnar:
+                continue
+            bounds = (partition.start_time, partition.end_time)
+            with self.pool.writer() as conn:
+                hot = conn.execute(
+                    "SELECT 1 FROM main.attendance"
+                    " WHERE entry_time >= ? AND entry_time < ? LIMIT 1",
+                    bounds,
+                ).fetchone()
+                if hot is None:
+                    continue
+                self.attach(conn, partition)
+                conn.execute("BEGIN IMMEDIATE")
+                conn.execute(
+                    "INSERT INTO attendance_rollover (name) VALUES (?)",
+                    (partition.name,),
+                )
+                deleted = conn.execute(
+                    """
+                    DELETE FROM main.attendance
+                    WHERE entry_time >= ? AND entry_time < ?
+                    AND id IN (SELECT id FROM {})
+                    """.format(
+                        partition.table
+                    ),
+                    bounds,
+                ).rowcount
+                conn.execute("DELETE FROM attendance_rollover")
+                if deleted:
+                    bump_versions_internal(conn, "attendance")
+                    logger.warning(
+                        "Removed %d rows already rolled to partition %s",
+                        deleted,
+                        partition.name,
+                    )
+                removed += deleted
+        return removed
+
+    def _roll(self, name: str, start: float, end: float) -> Partition:
+        partition = Partition(
+            name=name,
+            filename="attendance_{}.db".format(name),
+            start_time=start,
+            end_time=end,
+            row_count=0,
+        )
+        archive = sqlite3.connect(os.path.join(self.directory, partition.filename))
+        try:
+            archive.execute(ATTENDANCE_TABLE_SQL)
+            # files rolled before attendance had a session_id get it here
+            info = archive.execute("PRAGMA table_info(attendance)")
+            if "session_id" not in [row[1] for row in info]:
+                archive.execute(ATTENDANCE_SESSION_COLUMN_SQL)
+            archive.execute(ATTENDANCE_SESSION_INDEX_SQL)
+            archive.execute(
+                "CREATE INDEX IF NOT EXISTS idx_attendance_entry_time"
+                " ON attendance(entry_time)"
+            )
+            archive.execute(
+                "CREATE INDEX IF NOT EXISTS idx_attendance_enrollment_id"
+                " ON attendance(enrollment_id)"
+            )
+            archive.commit()
+        finally:
+            archive.close()
+
+        with self.pool.writer() as conn:
+            self.attach(conn, partition)
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                """
+                INSERT OR IGNORE INTO {} SELECT * FROM main.attendance
+                WHERE entry_time >= ? AND entry_time < ?
+                """.format(
+                    partition.table
+                ),
+                (start, end),
+            )
+            partition.row_count = conn.execute(
+                "SELECT COUNT(*) FROM {}".format(partition.table)
+            ).fetchone()[0]
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO attendance_partition
+                (name, filename, start_time, end_time, row_count)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (name, partition.filename, start, end, partition.row_count),
+            )
+            # the moved rows keep counting in attendance_detail; the flag
+            # makes its delete trigger leave the counters alone
+            conn.execute("INSERT INTO attendance_rollover (name) VALUES (?)", (name,))
+            conn.execute(
+                "DELETE FROM main.attendance WHERE entry_time >= ? AND entry_time < ?",
+                (start, end),
+            )
+            conn.execute("DELETE FROM attendance_rollover")
+            bump_versions_internal(conn, "attendance")
+        logger.info(
+            "Rolled attendance partition %s, %d rows", name, partition.row_count
+        )
+        return partition
+
+
+def main() -> None:
+    from src.db import DatabaseSettings, init_db_root
+    from src.migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Attendance partition maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    rollover = commands.add_parser(
+        "rollover", help="archive attendance older than the current partition"
+    )
+    rollover.add_argument(
+        "--now", type=float, help="unix timestamp to treat as the current time"
+    )
+    rollover.add_argument(
+        "--vacuum", action="store_true", help="shrink the main database afterwards"
+    )
+    archive = commands.add_parser(
+        "archive", help="convert closed partitions to the columnar archive"
+    )
+    archive.add_argument(
+        "names", nargs="*", help="partitions to convert (default: all closed ones)"
+    )
+    commands.add_parser("list", help="show archived partitions")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    pool = ConnectionPool(init_db_root(), DatabaseSettings.from_env())
+    try:
+        migrate(pool)
+        partitions = AttendancePartitions(pool, PartitionSettings.from_env())
+        if args.command == "rollover":
+            partitions.rollover(args.now)
+            if args.vacuum:
+                with pool.writer() as conn:
+                    conn.execute("VACUUM")
+        elif args.command == "archive":
+            from src.archive import ColumnarArchive
+
+            columnar = ColumnarArchive(partitions)
+            for partition in partitions.list():
+                if partition.columnar:
+                    continue
+                if not args.names or partition.name in args.names:
+                    columnar.archive(partition)
+        for partition in partitions.list():
+            print(
+                partition.name,
+                partition.filename,
+                datetime.fromtimestamp(partition.start_time).date(),
+                datetime.fromtimestamp(partition.end_time).date(),
+                partition.row_count,
+                "columnar" if partition.columnar else "sqlite",
+            )
+    finally:
+        pool.close()
+
+
+if __name__ == "__main__":
+    main()
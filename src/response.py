@@ -1,69 +1,84 @@
-from typing import Generic, TypeVar, Union
+from typing import Generic, Optional, TypeVar, Union
 
-from fastapi.responses import JSONResponse
+import pydantic_core
+from fastapi.responses import Response
 from pydantic import BaseModel
-from pydantic.generics import GenericModel
 
 T = TypeVar("T")
 
 
-class ResponseTemplate(GenericModel, Generic[T]):
+def _construct(model: BaseModel, **values):
+    # what model_construct does: the payload is built by the server from
+    # models that were validated when they were made, so it is not walked
+    # and validated again against Union[T, list[T]]
+    object.__setattr__(model, "__dict__", values)
+    object.__setattr__(model, "__pydantic_fields_set__", set(values))
+    object.__setattr__(model, "__pydantic_extra__", None)
+    object.__setattr__(model, "__pydantic_private__", None)
+
+
+def _json_response(content: dict, status_code: int) -> Response:
+    # pydantic_core serializes the models inside ``content`` with their own
+    # compiled serializers straight to bytes, without an intermediate
+    # model_dump() dict or the stdlib json encoder
+    return Response(
+        pydantic_core.to_json(content),
+        status_code=status_code,
+        media_type="application/json",
+    )
+
+
+class ResponseTemplate(BaseModel, Generic[T]):
     message: str
     data: Union[T, list[T]]  # Allow both single object and list of objects
     status_code: int
 
     def __init__(self, data: Union[T, list[T]], msg: str, status_code=200):
-        super().__init__(message=msg, data=data, status_code=status_code)
-        self.message = msg
-        self.data = data
-        self.status_code = status_code
+        _construct(self, message=msg, data=data, status_code=status_code)
 
     def to_json(self):
-        return JSONResponse(
-            content={"message": self.message, "data": self._prepare_data(self.data)},
-            status_code=self.status_code,
+        return _json_response(
+            {"message": self.message, "data": self.data}, self.status_code
         )
 
-    def _prepare_data(self, data: Union[T, list[T]]):
-        # Check if data is a list and process accordingly
-        if isinstance(data, list):
-            return [
-                item.model_dump() if isinstance(item, BaseModel) else item
-                for item in data
-            ]
-        # If it's a single object and is a BaseModel, return its dictionary
-        if isinstance(data, BaseModel):
-            return data.model_dump()
-        # If it's not a list or BaseModel, return the data as is
-        return data
-
-
-class ErrorTemplate(GenericModel, Generic[T]):
+
+class PageTemplate(BaseModel, Generic[T]):
+    message: str
+    data: list[T]
+    next_cursor: Optional[str]
+    status_code: int
+
+    def __init__(
+        self, data: list[T], next_cursor: Optional[str], msg: str, status_code=200
+    ):
+        _construct(
+            self,
+            message=msg,
+            data=data,
+            next_cursor=next_cursor,
+            status_code=status_code,
+        )
+
+    def to_json(self):
+        return _json_response(
+            {
+                "message": self.message,
+                "data": self.data,
+                "next_cursor": self.next_cursor,
+            },
+            self.status_code,
+        )
+
+
+class ErrorTemplate(BaseModel, Generic[T]):
     message: str
     errors: Union[T, list[T]]  # Allow both single object and list of objects
     status_code: int
 
     def __init__(self, errors: Union[T, list[T]], msg: str, status_code=400):
-        super().__init__(message=msg, errors=errors, status_code=status_code)
-        self.message = msg
-        self.errors = errors
-        self.status_code = status_code
+        _construct(self, message=msg, errors=errors, status_code=status_code)
 
     def to_json(self):
-        return JSONResponse(
-            content={"message": self.message, "data": self._prepare_data(self.errors)},
-            status_code=self.status_code,
+        return _json_response(
+            {"message": self.message, "data": self.errors}, self.status_code
         )
-
-    def _prepare_data(self, errors: Union[T, list[T]]):
-        # Check if errors is a list and process accordingly
-        if isinstance(errors, list):
-            return [
-                item.model_dump() if isinstance(item, BaseModel) else item
-                for item in errors
-            ]
-        # If it's a single object and is a BaseModel, return its dictionary
-        if isinstance(errors, BaseModel):
-            return errors.model_dump()
-        # If it's not a list or BaseModel, return the errors as is
-        return errors
@@ -0,0 +1,270 @@
+import argparse
+import csv
+import json
+import string
+from itertools import islice
+from typing import IO, TYPE_CHECKING, Iterable, Iterator
+
+from pydantic import BaseModel, ValidationError
+
+from src.db import ConnectionPool
+from src.model.attendance_detail import (
+    create_attendance_detail,
+    insert_attendance_details_internal,
+)
+from src.model.classroom import Classroom, create_classroom, insert_classrooms_internal
+from src.model.enrollments import create_enrollment, insert_enrollments_internal
+from src.model.lecture_session import SessionSettings, materialize_sessions_internal
+from src.model.student import create_stud, insert_students_internal
+from src.schema.roster import RosterRow
+
+if TYPE_CHECKING:
+    from src.model.roster import RosterSnapshot
+
+DEFAULT_CHUNK_SIZE = 500
+
+
+class RosterImportError(BaseModel):
+    line: int
+    message: str
+
+
+class RosterImportReport(BaseModel):
+    rows: int = 0
+    imported: int = 0
+    students_created: int = 0
+    classrooms_created: int = 0
+    enrollments_created: int = 0
+    enrollments_existing: int = 0
+    errors: list[RosterImportError] = []
+
+
+# SQLite's lower() only folds ASCII letters; keys are folded the same way
+_ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+
+def _student_key(row: RosterRow) -> tuple[str, str, int]:
+    # names are stored as registered, so they are matched on lower(), the
+    # way get_by_name looks them up through idx_student_name_lower
+    return (
+        row.firstname.strip().translate(_ASCII_LOWER),
+        row.lastname.strip().translate(_ASCII_LOWER),
+        row.generation,
+    )
+
+
+def _classroom_key(row: RosterRow) -> tuple[str, str]:
+    return (row.subject_name.strip(), row.lecturer_name.strip())
+
+
+def read_roster_csv(file: IO[str]) -> Iterator[tuple[int, dict]]:
+    """Yield ``(line number, row)`` pairs; blank cells are left out."""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, {
+            key.strip(): value.strip()
+            for key, value in row.items()
+            if key is not None and value not in (None, "")
+        }
+
+
+class RosterImporter:
+    """Bulk enroll students from a roster CSV.
+
+    Each row names a student (firstname, lastname, generation, gender,
+    major) and a classroom (subject_name, lecturer_name). Rows are consumed
+    ``chunk_size`` at a time. For each chunk, the students, classrooms and
+    existing enrollments it mentions are resolved with one query per table,
+    and whatever is missing is created with ``executemany``, all in one
+    transaction. A row that cannot be imported is reported with its line
+    number and skipped; the rest of the file is still imported.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        roster: "RosterSnapshot | None" = None,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        session_settings: SessionSettings | None = None,
+    ):
+        self.pool = pool
+        self.roster = roster
+        self.chunk_size = chunk_size
+        self.session_settings = session_settings or SessionSettings()
+
+    def import_csv(self, file: IO[str]) -> RosterImportReport:
+        return self.import_rows(read_roster_csv(file))
+
+    def import_rows(self, rows: Iterable[tuple[int, dict]]) -> RosterImportReport:
+        report = RosterImportReport()
+        rows = iter(rows)
+        while True:
+            chunk = list(islice(rows, self.chunk_size))
+            if not chunk:
+                return report
+            report.rows += len(chunk)
+            self._import_chunk(chunk, report)
+
+    def _import_chunk(self, chunk: list[tuple[int, dict]], report: RosterImportReport):
+        parsed: list[tuple[int, RosterRow]] = []
+        for line, raw in chunk:
+            try:
+                parsed.append((line, RosterRow(**raw)))
+            except ValidationError as e:
+                report.errors.append(RosterImportError(line=line, message=_describe(e)))
+
+        with self.pool.writer() as conn:
+            classrooms = self._resolve_classrooms(conn, parsed)
+            new_classrooms: dict[tuple[str, str], Classroom] = {}
+            valid: list[tuple[int, RosterRow]] = []
+            for line, row in parsed:
+                key = _classroom_key(row)
+                if key in classrooms or key in new_classrooms:
+                    valid.append((line, row))
+                elif row.duration is None or row.late_penalty_duration is None:
+                    report.errors.append(
+                        RosterImportError(
+                            line=line,
+                            message="Unknown classroom {} by {}; duration and "
+                            "late_penalty_duration are needed to create it".format(
+                                *key
+                            ),
+                        )
+                    )
+                else:
+                    new_classrooms[key] = create_classroom(
+                        lecturer_name=key[1],
+                        subject_name=key[0],
+                        duration=row.duration,
+                        late_penalty_duration=row.late_penalty_duration,
+                        lecture_time=row.lecture_time,
+                        record_interval=row.record_interval or 5 * 60,
+                    )
+                    valid.append((line, row))
+            classrooms.update(
+                {key: classroom.id for key, classroom in new_classrooms.items()}
+            )
+
+            students = self._resolve_students(conn, valid)
+            new_students = {}
+            for _, row in valid:
+                key = _student_key(row)
+                if key not in students and key not in new_students:
+                    new_students[key] = create_stud(
+                        firstname=row.firstname.strip(),
+                        lastname=row.lastname.strip(),
+                        generation=row.generation,
+                        gender=row.gender,
+                        major=row.major,
+                    )
+            students.update({key: student.id for key, student in new_students.items()})
+
+            pairs = {
+                (students[_student_key(row)], classrooms[_classroom_key(row)])
+                for _, row in valid
+            }
+            existing = self._existing_enrollments(conn, pairs)
+            new_enrollments = [
+                create_enrollment(class_id=class_id, student_id=student_id)
+                for student_id, class_id in sorted(pairs - existing)
+            ]
+
+            insert_classrooms_internal(conn, list(new_classrooms.values()))
+            materialize_sessions_internal(
+                conn, list(new_classrooms.values()), self.session_settings
+            )
+            insert_students_internal(conn, list(new_students.values()))
+            insert_attendance_details_internal(
+                conn,
+                [
+                    create_attendance_detail(student_id=student.id)
+                    for student in new_students.values()
+                ],
+            )
+            insert_enrollments_internal(conn, new_enrollments)
+            conn.commit()
+
+            if self.roster is not None:
+                self.roster.put_classrooms(conn, list(new_classrooms.values()))
+                self.roster.put_enrollments(conn, new_enrollments)
+        report.imported += len(valid)
+        report.students_created += len(new_students)
+        report.classrooms_created += len(new_classrooms)
+        report.enrollments_created += len(new_enrollments)
+        report.enrollments_existing += len(existing)
+
+    def _resolve_classrooms(self, conn, rows) -> dict[tuple[str, str], str]:
+        keys = sorted({_classroom_key(row) for _, row in rows})
+        found = conn.execute(
+            """
+            SELECT c.subject_name, c.lecturer_name, MIN(c.id) FROM json_each(?) k
+            JOIN classroom c ON c.subject_name = json_extract(k.value, '$[0]')
+                            AND c.lecturer_name = json_extract(k.value, '$[1]')
+            GROUP BY c.subject_name, c.lecturer_name
+            """,
+            (json.dumps(keys),),
+        )
+        return {(row[0], row[1]): row[2] for row in found}
+
+    def _resolve_students(self, conn, rows) -> dict[tuple[str, str, int], str]:
+        keys = sorted({_student_key(row) for _, row in rows})
+        found = conn.execute(
+            """
+            SELECT lower(s.firstname), lower(s.lastname), s.generation, MIN(s.id)
+            FROM json_each(?) k
+            JOIN student s ON lower(s.firstname) = json_extract(k.value, '$[0]')
+                          AND lower(s.lastname) = json_extract(k.value, '$[1]')
+                          AND s.generation = json_extract(k.value, '$[2]')
+            GROUP BY lower(s.firstname), lower(s.lastname), s.generation
+            """,
+            (json.dumps(keys),),
+        )
+        return {(row[0], row[1], row[2]): row[3] for row in found}
+
+    def _existing_enrollments(self, conn, pairs) -> set[tuple[str, str]]:
+        found = conn.execute(
+            """
+            SELECT DISTINCT e.student_id, e.class_id FROM json_each(?) k
+            JOIN enrollment e ON e.student_id = json_extract(k.value, '$[0]')
+                             AND e.class_id = json_extract(k.value, '$[1]')
+            """,
+            (json.dumps(sorted(pairs)),),
+        )
+        return {(row[0], row[1]) for row in found}
+
+
+def _describe(error: ValidationError) -> str:
+    return "; ".join(
+        "{}: {}".format(".".join(str(part) for part in e["loc"]), e["msg"])
+        for e in error.errors()
+    )
+
+
+def main() -> None:
+    from src.db import DatabaseSettings, init_db_root
+    from src.migrations import migrate
+
+    parser = argparse.ArgumentParser(description="Import a roster CSV")
+    parser.add_argument("path", help="CSV file with a header row")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(init_db_root(), DatabaseSettings.from_env())
+    try:
+        migrate(pool)
+        importer = RosterImporter(
+            pool,
+            chunk_size=args.chunk_size,
+            session_settings=SessionSettings.from_env(),
+        )
+        with open(args.path, newline="") as file:
+            report = importer.import_csv(file)
+    finally:
+        pool.close()
+    for error in report.errors:
+        print("line {}: {}".format(error.line, error.message))
+    print(report.model_dump_json(exclude={"errors"}))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,201 @@
-from src.db import init_db_root, open_db
+import time
+
+from src.archive import ColumnarArchive
+from src.cache import CacheSettings, ObjectCache
+from src.compression import CompressionSettings, ResponseCompression
+from src.db import (
+    AsyncDBHandler,
+    ConnectionPool,
+    DatabaseSettings,
+    create_db_executor,
+    init_db_root,
+)
+from src.ingest import AttendanceIngestQueue, IngestSettings
 from src.model.attendance import AttendanceDBHandler
 from src.model.attendance_detail import AttendanceDetailDBHandler
 from src.model.classroom import ClassroomDBHandler
 from src.model.enrollments import EnrollmentDBHandler
+from src.model.lecture_session import (
+    ABSENT_SWEEP_JOB,
+    LECTURE_WARMUP_JOB,
+    LectureSessionDBHandler,
+    SessionSettings,
+)
+from src.model.roster import RosterSettings, RosterSnapshot
 from src.model.student import StudentDBHandler
+from src.partitions import AttendancePartitions, PartitionSettings
+from src.roster_import import RosterImporter
+from src.scheduler import Scheduler, SchedulerSettings
+from src.stats import ClassStatsDBHandler
+
+db_settings = DatabaseSettings.from_env()
+db_pool = ConnectionPool(init_db_root(), db_settings)
+db_executor = create_db_executor(db_settings)
+roster = RosterSnapshot(db_pool, RosterSettings.from_env())
+object_cache = ObjectCache(db_pool, CacheSettings.from_env())
+scheduler_settings = SchedulerSettings.from_env()
+scheduler = Scheduler(db_pool, db_executor, scheduler_settings)
+session_settings = SessionSettings.from_env()
+sessions = LectureSessionDBHandler(db_pool, session_settings, scheduler, object_cache)
+partitions = AttendancePartitions(db_pool, PartitionSettings.from_env())
+columnar_archive = ColumnarArchive(partitions)
+ingest_queue = AttendanceIngestQueue(
+    db_pool, db_executor, IngestSettings.from_env(), object_cache
+)
+compression = ResponseCompression(CompressionSettings.from_env())
+
+
+def sweep_absent_job(arg: str | None) -> float:
+    # runs again when the next late window closes, or at the recheck
+    # interval to pick up sessions created in the meantime
+    sessions.sweep_absent()
+    recheck = time.time() + scheduler_settings.sweep_recheck_minutes * 60
+    due = sessions.next_sweep_due()
+    return recheck if due is None else min(due, recheck)
+
+
+def lecture_warmup_job(arg: str | None) -> float:
+    # loads the rosters and cached rows of the lectures about to start, so
+    # their first check-ins read nothing; runs again ahead of the next start,
+    # or at the recheck interval to pick up sessions created in the meantime
+    now = time.time()
+    lead = scheduler_settings.warmup_minutes * 60
+    class_ids = sessions.starting(now, now + lead)
+    classrooms = ClassroomDBHandler(pool=db_pool, roster=roster, cache=object_cache)
+    students = StudentDBHandler(pool=db_pool, roster=roster, cache=object_cache)
+    for class_id in class_ids:
+        classrooms.get(class_id)
+    for student_id in roster.warm(class_ids):
+        students.get(student_id)
+    recheck = now + scheduler_settings.sweep_recheck_minutes * 60
+    due = sessions.next_start_after(now + lead)
+    return recheck if due is None else min(due - lead, recheck)
+
+
+def materialize_sessions_job(arg: str | None):
+    sessions.materialize()
+
+
+def partition_rollover_job(arg: str | None):
+    partitions.rollover()
+
+
+scheduler.register(
+    ABSENT_SWEEP_JOB,
+    sweep_absent_job,
+    every=scheduler_settings.sweep_recheck_minutes * 60,
+)
+scheduler.register(
+    LECTURE_WARMUP_JOB,
+    lecture_warmup_job,
+    every=scheduler_settings.sweep_recheck_minutes * 60,
+)
+scheduler.register(
+    "materialize_sessions",
+    materialize_sessions_job,
+    every=scheduler_settings.maintenance_hours * 3600,
+)
+scheduler.register(
+    "partition_rollover",
+    partition_rollover_job,
+    every=scheduler_settings.maintenance_hours * 3600,
+)
+
+
+def get_db_pool():
+    return db_pool
+
+
+def get_object_cache():
+    return object_cache
+
 
-init_db_root()
-connection = open_db()
+def get_cache_db():
+    return AsyncDBHandler(object_cache, db_executor)
+
+
+def get_ingest_queue():
+    return ingest_queue
+
+
+def get_compression():
+    return compression
+
+
+def get_scheduler():
+    return scheduler
+
+
+def get_partitions():
+    return partitions
+
+
+def get_archive():
+    return AsyncDBHandler(columnar_archive, db_executor)
 
 
 def get_student_db():
-    studentDB = StudentDBHandler(conn=open_db)
+    studentDB = AsyncDBHandler(
+        StudentDBHandler(pool=db_pool, roster=roster, cache=object_cache),
+        db_executor,
+    )
     return studentDB
 
 
 def get_attendance_db():
-    attendanceDB = AttendanceDBHandler(conn=open_db)
+    attendanceDB = AsyncDBHandler(
+        AttendanceDBHandler(
+            pool=db_pool,
+            roster=roster,
+            partitions=partitions,
+            session_settings=session_settings,
+            cache=object_cache,
+        ),
+        db_executor,
+    )
     return attendanceDB
 
 
 def get_classroom_db():
-    attendanceDB = ClassroomDBHandler(conn=open_db)
+    attendanceDB = AsyncDBHandler(
+        ClassroomDBHandler(
+            pool=db_pool, roster=roster, sessions=sessions, cache=object_cache
+        ),
+        db_executor,
+    )
     return attendanceDB
 
 
 def get_enrollment_db():
-    enrollmentDB = EnrollmentDBHandler(conn=open_db)
+    enrollmentDB = AsyncDBHandler(
+        EnrollmentDBHandler(pool=db_pool, roster=roster, cache=object_cache),
+        db_executor,
+    )
     return enrollmentDB
 
 
+def get_roster_importer():
+    return AsyncDBHandler(
+        RosterImporter(pool=db_pool, roster=roster, session_settings=session_settings),
+        db_executor,
+    )
+
+
+def get_session_db():
+    return AsyncDBHandler(sessions, db_executor)
+
+
 def get_stats_db():
-    enrollmentDB = AttendanceDetailDBHandler(conn=open_db)
+    enrollmentDB = AsyncDBHandler(
+        AttendanceDetailDBHandler(pool=db_pool, cache=object_cache), db_executor
+    )
     return enrollmentDB
+
+
+def get_class_stats_db():
+    return AsyncDBHandler(
+        ClassStatsDBHandler(
+            pool=db_pool, partitions=partitions, archive=columnar_archive
+        ),
+        db_executor,
+    )
@@ -0,0 +1,46 @@
+from fastapi import Depends, Request
+from fastapi.responses import Response
+
+from src.route.providers.base import get_cache_db
+
+
+class NotModified(Exception):
+    def __init__(self, etag: str):
+        self.etag = etag
+
+
+class Conditional:
+    """The ETag of a read endpoint's data, to send with its response."""
+
+    def __init__(self, etag: str):
+        self.etag = etag
+
+    def apply(self, response: Response) -> Response:
+        response.headers["ETag"] = self.etag
+        return response
+
+
+def _matches(etag: str, if_none_match: str) -> bool:
+    # If-None-Match uses the weak comparison, so W/ prefixes are ignored
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def conditional(*tables: str):
+    """Dependency turning the versions of ``tables`` into an ETag.
+
+    ``tables`` must be every table the response is built from; any write to
+    one of them bumps its version and so changes the tag. A request whose
+    ``If-None-Match`` matches is answered with a 304 by raising
+    ``NotModified`` before the route body runs any query.
+    """
+
+    async def dependency(request: Request, cache=Depends(get_cache_db)) -> Conditional:
+        versions = await cache.versions(tables)
+        etag = 'W/"{}"'.format(".".join(str(version) for version in versions))
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and _matches(etag, if_none_match):
+            raise NotModified(etag)
+        return Conditional(etag)
+
+    return dependency
@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+
+from src.archive import ArchivedDetail, ArchiveMeta, ArchiveSummary
+from src.export import ExportFormat, encode_rows
+from src.model.attendance import Punctuality
+from src.response import ResponseTemplate
+from src.route.providers.base import get_archive
+
+archive_router = APIRouter()
+
+
+@archive_router.get("/terms", response_model=ResponseTemplate[list[ArchiveMeta]])
+async def list_archived_terms(service=Depends(get_archive)):
+    res = await service.terms()
+    return ResponseTemplate(res, "Successfully retrieved archived terms").to_json()
+
+
+@archive_router.get("/attendance")
+async def export_archived_attendance(
+    format: ExportFormat = ExportFormat.NDJSON,
+    class_id: str | None = None,
+    student_id: str | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    punctuality: Punctuality | None = None,
+    service=Depends(get_archive),
+):
+    rows = service.handler.export(
+        class_id=class_id,
+        start=start,
+        end=end,
+        student_id=student_id,
+        punctuality=punctuality,
+    )
+    return StreamingResponse(
+        service.stream(encode_rows(rows, format)),
+        media_type=format.media_type,
+        headers={
+            "Content-Disposition": "attachment; filename=archived_attendance.{}".format(
+                format
+            )
+        },
+    )
+
+
+@archive_router.get("/summary", response_model=ResponseTemplate[ArchiveSummary])
+async def summarize_archived_attendance(
+    class_id: str | None = None,
+    student_id: str | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_archive),
+):
+    res = await service.summary(
+        class_id=class_id, start=start, end=end, student_id=student_id
+    )
+    return ResponseTemplate(
+        res, "Successfully summarized archived attendance"
+    ).to_json()
+
+
+@archive_router.get(
+    "/terms/{name}/details", response_model=ResponseTemplate[list[ArchivedDetail]]
+)
+async def list_archived_details(name: str, service=Depends(get_archive)):
+    res = await service.details(name)
+    return ResponseTemplate(
+        res, "Successfully retrieved archived attendance details"
+    ).to_json()
@@ -1,88 +1,137 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import StreamingResponse
 
+from src.export import ExportFormat, encode_rows
 from src.model.attendance import Attendance, AttendanceJoinStudent, create_attd
-from src.response import ErrorTemplate, ResponseTemplate
+from src.model.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.response import ErrorTemplate, PageTemplate, ResponseTemplate
 from src.route.providers.base import (
     get_attendance_db,
     get_enrollment_db,
+    get_ingest_queue,
     get_stats_db,
     get_student_db,
 )
+from src.route.providers.conditional import conditional
 from src.schema.attendance import CreateAttendance
 
 attendance_router = APIRouter()
 
 
-@attendance_router.get("/", response_model=ResponseTemplate[list[Attendance]])
-def list_attendance(service=Depends(get_attendance_db)):
-    res = service.list_attendance()
-    return ResponseTemplate(res, "Successfully retrieved attendance")
+@attendance_router.get("/", response_model=PageTemplate[Attendance])
+async def list_attendance(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    service=Depends(get_attendance_db),
+):
+    page = await service.list_attendance(cursor, limit)
+    return PageTemplate(
+        page.items, page.next_cursor, "Successfully retrieved attendance"
+    ).to_json()
+
+
+@attendance_router.get("/export")
+async def export_attendance(
+    format: ExportFormat = ExportFormat.NDJSON,
+    class_id: str | None = None,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_attendance_db),
+):
+    rows = service.handler.export(class_id=class_id, start=start, end=end)
+    return StreamingResponse(
+        service.stream(encode_rows(rows, format)),
+        media_type=format.media_type,
+        headers={
+            "Content-Disposition": "attachment; filename=attendance.{}".format(format)
+        },
+    )
+
+
+@attendance_router.get(
+    "/session/{session_id}", response_model=ResponseTemplate[list[Attendance]]
+)
+async def list_attendance_by_session(
+    session_id: str,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_attendance_db),
+):
+    res = await service.list_by_session(session_id, start, end)
+    return ResponseTemplate(res, "Successfully retrieved attendance").to_json()
 
 
 @attendance_router.get(
     "/classroom/{class_id}", response_model=ResponseTemplate[list[Attendance]]
 )
-def list_attendance_by_class(class_id, service=Depends(get_attendance_db)):
-    res = service.list_by_classroom(class_id)
-    return ResponseTemplate(res, "Successfully retrieved attendance")
+async def list_attendance_by_class(
+    class_id,
+    service=Depends(get_attendance_db),
+    etag=Depends(conditional("attendance", "enrollment", "classroom")),
+):
+    res = await service.list_by_classroom(class_id)
+    return etag.apply(
+        ResponseTemplate(res, "Successfully retrieved attendance").to_json()
+    )
 
 
 @attendance_router.get(
     "/classroom/subject/{subject_name}",
     # response_model=ResponseTemplate[list[AttendanceJoinStudent]],
 )
-def list_attendance_by_subject(subject_name, service=Depends(get_attendance_db)):
-    res = service.get_by_subject(subject_name)
+async def list_attendance_by_subject(subject_name, service=Depends(get_attendance_db)):
+    res = await service.get_by_subject(subject_name)
     return ResponseTemplate(
         res,
         "Successfully retrieved attendance",
-    )
+    ).to_json()
 
 
 @attendance_router.post("/")
-def take_attendance(
+async def take_attendance(
     attendance_data: list[CreateAttendance],
-    stat_db=Depends(get_stats_db),
     service=Depends(get_attendance_db),
+    ingest=Depends(get_ingest_queue),
 ):
     attendances = []
     for attend in attendance_data:
         attendances.append(create_attd(**attend.model_dump()))
 
-    res = service.create_many(attendances)
-    print("ress")
-    for attendance in res:
-        stat_db.consolidate(attendance.id, attendance.punctuality)
+    if ingest.enabled:
+        scored = await service.score_many(attendances)
+        res = await ingest.submit(scored)
+    else:
+        res = await service.create_many(attendances)
 
-    return ResponseTemplate(res, "Successfully attend attendance")
+    return ResponseTemplate(res, "Successfully attend attendance").to_json()
 
 
 @attendance_router.post(
     "/mark-as-permission/{attendance_id}",
     response_model=ResponseTemplate[bool],
 )
-def mark_absent_as_perm(
+async def mark_absent_as_perm(
     attd_id: str,
     stat_db=Depends(get_stats_db),
     attendance_db=Depends(get_attendance_db),
     enrol_db=Depends(get_enrollment_db),
 ):
 
-    attendance = attendance_db.get(attd_id)
+    attendance = await attendance_db.get(attd_id)
     if attendance is None:
         return ErrorTemplate(
             "No attendance is founded.".format(attd_id),
             "Retrieval error",
         ).to_json()
 
-    enrollment = enrol_db.get(attendance.enrollment_id)
+    enrollment = await enrol_db.get(attendance.enrollment_id)
     if enrollment is None:
         return ErrorTemplate(
             "Fatal failure???".format(attd_id),
             "Retrieval error",
         ).to_json()
 
-    res = stat_db.mark_permission(enrollment.student_id)
+    res = await stat_db.mark_permission(enrollment.student_id)
     # print("rr", res)
     if not res:
         return ErrorTemplate(
@@ -100,9 +149,9 @@ def mark_absent_as_perm(
     "/student/{student_id}",
     # response_model=ResponseTemplate[list[AttendanceJoinStudent]],
 )
-def list_attendance_by_subject(student_id, service=Depends(get_attendance_db)):
-    res = service.get_by_student(student_id)
+async def list_attendance_by_subject(student_id, service=Depends(get_attendance_db)):
+    res = await service.get_by_student(student_id)
     return ResponseTemplate(
         res,
         "Successfully retrieved attendance",
-    )
+    ).to_json()
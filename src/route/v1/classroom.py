@@ -1,34 +1,46 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from src.model.classroom import Classroom, create_classroom
-from src.response import ErrorTemplate, ResponseTemplate
-from src.route.providers.base import get_classroom_db
+from src.model.lecture_session import LectureSession
+from src.model.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.response import ErrorTemplate, PageTemplate, ResponseTemplate
+from src.route.providers.base import get_classroom_db, get_session_db
+from src.route.providers.conditional import conditional
 from src.schema.classroom import CreateClassroom
 
 classroom_router = APIRouter()
 
 
-@classroom_router.get("/", response_model=ResponseTemplate[list[Classroom]])
-def list_classroom_names(service=Depends(get_classroom_db)):
-    res = service.list()
-    return ResponseTemplate(res, "Successfully retrieved classrooms").to_json()
+@classroom_router.get("/", response_model=PageTemplate[Classroom])
+async def list_classroom_names(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    service=Depends(get_classroom_db),
+    etag=Depends(conditional("classroom")),
+):
+    page = await service.list(cursor, limit)
+    return etag.apply(
+        PageTemplate(
+            page.items, page.next_cursor, "Successfully retrieved classrooms"
+        ).to_json()
+    )
 
 
 @classroom_router.post("/", response_model=ResponseTemplate[list[Classroom]])
-def register_classroom(
+async def register_classroom(
     classroom_list: list[CreateClassroom], service=Depends(get_classroom_db)
 ):
     classrooms = []
     for classroom_data in classroom_list:
         classrooms.append(create_classroom(**classroom_data.model_dump()))
 
-    res = service.create_many(classrooms)
+    res = await service.create_many(classrooms)
     return ResponseTemplate(res, "Successfully registered classrooms").to_json()
 
 
 @classroom_router.get("/{id}", response_model=ResponseTemplate[Classroom])
-def get_classroom(id: str, service=Depends(get_classroom_db)):
-    res = service.get(id)
+async def get_classroom(id: str, service=Depends(get_classroom_db)):
+    res = await service.get(id)
     if res is None:
         return ErrorTemplate(
             "No classroom with this id found {}".format(id), "Retrieval error"
@@ -41,8 +53,8 @@ def get_classroom(id: str, service=Depends(get_classroom_db)):
 
 
 @classroom_router.delete("/{id}", response_model=ResponseTemplate[Classroom])
-def delete_classroom(id: str, service=Depends(get_classroom_db)):
-    res = service.delete(id)
+async def delete_classroom(id: str, service=Depends(get_classroom_db)):
+    res = await service.delete(id)
     if res is None or res == 0:
         return ErrorTemplate(
             "No classroom with this id found {}".format(id), "Retrieval error"
@@ -52,3 +64,18 @@ def delete_classroom(id: str, service=Depends(get_classroom_db)):
         res,
         "Successfully retrieved classroom with id {}".format(id),
     ).to_json()
+
+
+@classroom_router.get(
+    "/{class_id}/sessions", response_model=ResponseTemplate[list[LectureSession]]
+)
+async def list_classroom_sessions(
+    class_id: str,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_session_db),
+):
+    res = await service.list_by_class(class_id, start, end)
+    return ResponseTemplate(
+        res, "Successfully retrieved sessions of classroom {}".format(class_id)
+    ).to_json()
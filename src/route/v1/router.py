@@ -1,9 +1,11 @@
 from fastapi import APIRouter
 
+from .archive import archive_router
 from .attendance import attendance_router
 from .classroom import classroom_router
 from .stats import stat_router
 from .student import student_router
+from .system import system_router
 
 
 def init_router(app: APIRouter):
@@ -11,3 +13,5 @@ def init_router(app: APIRouter):
     app.include_router(attendance_router, prefix="/attendances", tags=["attendances"])
     app.include_router(classroom_router, prefix="/classrooms", tags=["classrooms"])
     app.include_router(stat_router, prefix="/stats", tags=["attendance_statistics"])
+    app.include_router(archive_router, prefix="/archive", tags=["archive"])
+    app.include_router(system_router, prefix="/system", tags=["system"])
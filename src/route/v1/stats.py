@@ -1,37 +1,68 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 
 from src.model.attendance_detail import AttendanceDetail
 from src.model.enrollments import Enrollment
-from src.response import ErrorTemplate, ResponseTemplate
-from src.route.providers.base import get_attendance_db, get_enrollment_db, get_stats_db
+from src.model.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.response import ErrorTemplate, PageTemplate, ResponseTemplate
+from src.route.providers.base import (
+    get_attendance_db,
+    get_class_stats_db,
+    get_enrollment_db,
+    get_stats_db,
+)
+from src.stats import ClassSummary, DailyStats
 
 stat_router = APIRouter()
 
 
+@stat_router.get("/classroom/{class_id}", response_model=ResponseTemplate[ClassSummary])
+async def summarize_classroom(
+    class_id: str,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_class_stats_db),
+):
+    res = await service.summary(class_id, start, end)
+    return ResponseTemplate(res, "Successfully summarized classroom").to_json()
+
+
+@stat_router.get(
+    "/classroom/{class_id}/daily", response_model=ResponseTemplate[list[DailyStats]]
+)
+async def summarize_classroom_daily(
+    class_id: str,
+    start: float | None = None,
+    end: float | None = None,
+    service=Depends(get_class_stats_db),
+):
+    res = await service.daily(class_id, start, end)
+    return ResponseTemplate(res, "Successfully summarized classroom by day").to_json()
+
+
 @stat_router.get("/{student_id}", response_model=ResponseTemplate[AttendanceDetail])
-def list_attendance_by_student(student_id, service=Depends(get_stats_db)):
-    res = service.get_by_student_id(student_id)
+async def list_attendance_by_student(student_id, service=Depends(get_stats_db)):
+    res = await service.get_by_student_id(student_id)
     if res is None:
-        return ErrorTemplate([], "Cannot found attendance details", 404)
+        return ErrorTemplate([], "Cannot found attendance details", 404).to_json()
 
-    return ResponseTemplate(res, "bruh")
+    return ResponseTemplate(res, "bruh").to_json()
 
 
 @stat_router.get("/", response_model=ResponseTemplate[list[AttendanceDetail]])
-def list_attendance_by_student_full(student_id, service=Depends(get_stats_db)):
-    res = service.get_by_student_id(student_id)
+async def list_attendance_by_student_full(student_id, service=Depends(get_stats_db)):
+    res = await service.get_by_student_id(student_id)
     if res is None:
-        return ErrorTemplate([], "Cannot found attendance details", 404)
-
-    return ResponseTemplate(res, "bruh")
+        return ErrorTemplate([], "Cannot found attendance details", 404).to_json()
 
+    return ResponseTemplate(res, "bruh").to_json()
 
-@stat_router.get(
-    "/enrollment/{class_id}", response_model=ResponseTemplate[list[Enrollment]]
-)
-def list_enrollment_by_class(class_id, service=Depends(get_enrollment_db)):
-    res = get_enrollment_db().get_by_class(class_id)
-    if res is None:
-        return ErrorTemplate([], "Cannot found enrollment details by class", 404)
 
-    return ResponseTemplate(res, "bruh")
+@stat_router.get("/enrollment/{class_id}", response_model=PageTemplate[Enrollment])
+async def list_enrollment_by_class(
+    class_id,
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    service=Depends(get_enrollment_db),
+):
+    page = await service.get_by_class(class_id, cursor, limit)
+    return PageTemplate(page.items, page.next_cursor, "bruh").to_json()
@@ -1,46 +1,88 @@
-from fastapi import APIRouter, Depends
+import io
+
+from fastapi import APIRouter, Depends, Query, UploadFile
 
-from src.model.attendance_detail import create_attendance_detail
 from src.model.enrollments import Enrollment, create_enrollment
-from src.model.student import Student, create_stud
-from src.response import ErrorTemplate, ResponseTemplate
-from src.route.providers.base import get_enrollment_db, get_stats_db, get_student_db
+from src.model.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+from src.model.student import (
+    STUDENT_TABLES,
+    Student,
+    StudentAttendanceEnrollment,
+    StudentMatch,
+    create_stud,
+)
+from src.response import ErrorTemplate, PageTemplate, ResponseTemplate
+from src.roster_import import RosterImportReport
+from src.route.providers.base import (
+    get_enrollment_db,
+    get_roster_importer,
+    get_stats_db,
+    get_student_db,
+)
+from src.route.providers.conditional import conditional
 from src.schema.student import CreateStudent, EnrollStudent
 
 student_router = APIRouter()
 
 
-@student_router.get("/", response_model=ResponseTemplate[list[Student]])
-def list_student_names(service=Depends(get_student_db)):
-    res = service.list_student_attendance_enrollment()
-    # res = service.list()
-    return ResponseTemplate(res, "successfully retrieved students").to_json()
+@student_router.get("/", response_model=PageTemplate[StudentAttendanceEnrollment])
+async def list_student_names(
+    cursor: str | None = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    service=Depends(get_student_db),
+    etag=Depends(conditional(*STUDENT_TABLES)),
+):
+    page = await service.list_student_attendance_enrollment(cursor=cursor, limit=limit)
+    return etag.apply(
+        PageTemplate(
+            page.items, page.next_cursor, "successfully retrieved students"
+        ).to_json()
+    )
 
 
 @student_router.post("/", response_model=ResponseTemplate[list[Student]])
-def register_student(
+async def register_student(
     student_list: list[CreateStudent],
     stud_service=Depends(get_student_db),
-    stats_db=Depends(get_stats_db),
 ):
     students = []
     for student_data in student_list:
         students.append(create_stud(**student_data.model_dump()))
 
-    res = stud_service.create_many(students)
-    attendance_details = []
-    for stud_res in res:
-        adt = stats_db.create(create_attendance_detail(student_id=stud_res.id))
-        attendance_details.append(adt)
-    if len(attendance_details) != len(res):
-        return ErrorTemplate([], "Corrupted student data. Cannot create!", 400)
-
+    res = await stud_service.register_many(students)
     return ResponseTemplate(res, "successfully register students").to_json()
 
 
+@student_router.post("/import", response_model=ResponseTemplate[RosterImportReport])
+async def import_roster(file: UploadFile, importer=Depends(get_roster_importer)):
+    # the upload is spooled to disk by the multipart parser and read back
+    # chunk by chunk on the database executor
+    text = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        res = await importer.import_csv(text)
+    finally:
+        text.detach()
+    return ResponseTemplate(
+        res,
+        "imported {} of {} roster rows".format(res.imported, res.rows),
+    ).to_json()
+
+
+@student_router.get("/search", response_model=ResponseTemplate[list[StudentMatch]])
+async def search_students(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    service=Depends(get_student_db),
+):
+    res = await service.search(q, limit)
+    return ResponseTemplate(
+        res, "Found {} students matching {}".format(len(res), q)
+    ).to_json()
+
+
 @student_router.get("/{id}", response_model=ResponseTemplate[Student])
-def get_student(id: str, service=Depends(get_student_db)):
-    res = service.get(id)
+async def get_student(id: str, service=Depends(get_student_db)):
+    res = await service.get(id)
     if res is None:
         return ErrorTemplate(
             "No student with this id found {}".format(id), "Retrieval error"
@@ -53,8 +95,8 @@ def get_student(id: str, service=Depends(get_student_db)):
 
 
 @student_router.delete("/{id}", response_model=ResponseTemplate[Student])
-def delete_student(id: str, service=Depends(get_student_db)):
-    res = service.delete(id)
+async def delete_student(id: str, service=Depends(get_student_db)):
+    res = await service.delete(id)
     if res is None or res == 0:
         return ErrorTemplate(
             "No student with this id found {}".format(id), "Retrieval error"
@@ -67,8 +109,8 @@ def delete_student(id: str, service=Depends(get_student_db)):
 
 
 @student_router.get("/name/{name}", response_model=ResponseTemplate[Student])
-def get_student_name(name: str, service=Depends(get_student_db)):
-    res = service.get_by_name(name)
+async def get_student_name(name: str, service=Depends(get_student_db)):
+    res = await service.get_by_name(name)
     if res is None:
         return ErrorTemplate(
             "No student with this name found {}".format(name), "Retrieval error"
@@ -83,16 +125,16 @@ def get_student_name(name: str, service=Depends(get_student_db)):
 @student_router.get(
     "/enrollment/{student_id}/list", response_model=ResponseTemplate[Student]
 )
-def get_student_enrollment(
+async def get_student_enrollment(
     id: str, service=Depends(get_student_db), enrollment_db=Depends(get_enrollment_db)
 ):
-    res = service.get(id)
+    res = await service.get(id)
     if res is None:
         return ErrorTemplate(
             "No student with this id found {}".format(id), "Retrieval error"
         ).to_json()
 
-    enrollment = enrollment_db.get_by_student(id)
+    enrollment = await enrollment_db.get_by_student(id)
     return ResponseTemplate(
         enrollment,
         "successfully retrieved student enrollment with id {}".format(id),
@@ -100,19 +142,19 @@ def get_student_enrollment(
 
 
 @student_router.post("/enrollment", response_model=ResponseTemplate[EnrollStudent])
-def enroll_student(
+async def enroll_student(
     enroll: EnrollStudent,
     service=Depends(get_student_db),
     enrollment_db=Depends(get_enrollment_db),
 ):
-    res = service.get(enroll.student_id)
+    res = await service.get(enroll.student_id)
     if res is None:
         return ErrorTemplate(
             "No student with this id found {}".format(enroll.student_id),
             "Retrieval error",
         ).to_json()
 
-    enrollment = enrollment_db.create(create_enrollment(**enroll.model_dump()))
+    enrollment = await enrollment_db.create(create_enrollment(**enroll.model_dump()))
     return ResponseTemplate(
         enrollment,
         "successfully enroll student with id {}".format(enroll.student_id),
@@ -122,11 +164,11 @@ def enroll_student(
 @student_router.get(
     "/enrollment/{enroll_id}", response_model=ResponseTemplate[EnrollStudent]
 )
-def get_enroll_student_info(
+async def get_enroll_student_info(
     enroll_id: str,
     enrollment_db=Depends(get_enrollment_db),
 ):
-    res = enrollment_db.get_join_by_enrollment_id(enroll_id)
+    res = await enrollment_db.get_join_by_enrollment_id(enroll_id)
     # print("rr", res)
     if res is None:
         return ErrorTemplate(
@@ -142,11 +184,11 @@ def get_enroll_student_info(
 @student_router.post(
     "/mark-permission/{student_id}", response_model=ResponseTemplate[EnrollStudent]
 )
-def mark_perm(
+async def mark_perm(
     student_id: str,
     stat_db=Depends(get_stats_db),
 ):
-    res = stat_db.mark_permission(student_id)
+    res = await stat_db.mark_permission(student_id)
     # print("rr", res)
     if not res:
         return ErrorTemplate(
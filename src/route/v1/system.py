@@ -0,0 +1,71 @@
+from fastapi import APIRouter, Depends
+
+from src.cache import CacheStats
+from src.compression import CompressionStats
+from src.db import PoolStats
+from src.ingest import IngestStats
+from src.model.lecture_session import AbsentSweep
+from src.partitions import Partition
+from src.response import ResponseTemplate
+from src.route.providers.base import (
+    get_compression,
+    get_db_pool,
+    get_ingest_queue,
+    get_object_cache,
+    get_partitions,
+    get_scheduler,
+    get_session_db,
+)
+from src.scheduler import JobStatus
+
+system_router = APIRouter()
+
+
+@system_router.get("/db/pool", response_model=ResponseTemplate[PoolStats])
+def get_pool_stats(pool=Depends(get_db_pool)):
+    return ResponseTemplate(
+        pool.stats(), "Successfully retrieved connection pool stats"
+    ).to_json()
+
+
+@system_router.get("/cache", response_model=ResponseTemplate[CacheStats])
+def get_cache_stats(cache=Depends(get_object_cache)):
+    return ResponseTemplate(
+        cache.stats(), "Successfully retrieved object cache stats"
+    ).to_json()
+
+
+@system_router.get("/compression", response_model=ResponseTemplate[CompressionStats])
+def get_compression_stats(compression=Depends(get_compression)):
+    return ResponseTemplate(
+        compression.stats(), "Successfully retrieved response compression stats"
+    ).to_json()
+
+
+@system_router.get("/ingest", response_model=ResponseTemplate[IngestStats])
+def get_ingest_stats(ingest=Depends(get_ingest_queue)):
+    return ResponseTemplate(
+        ingest.stats(), "Successfully retrieved attendance ingest stats"
+    ).to_json()
+
+
+@system_router.get(
+    "/attendance/partitions", response_model=ResponseTemplate[list[Partition]]
+)
+def list_attendance_partitions(partitions=Depends(get_partitions)):
+    return ResponseTemplate(
+        partitions.list(), "Successfully retrieved attendance partitions"
+    ).to_json()
+
+
+@system_router.get("/scheduler/jobs", response_model=ResponseTemplate[list[JobStatus]])
+def list_scheduled_jobs(scheduler=Depends(get_scheduler)):
+    return ResponseTemplate(
+        scheduler.jobs(), "Successfully retrieved scheduled jobs"
+    ).to_json()
+
+
+@system_router.post("/sessions/sweep", response_model=ResponseTemplate[AbsentSweep])
+async def sweep_absent(service=Depends(get_session_db)):
+    res = await service.sweep_absent()
+    return ResponseTemplate(res, "Recorded {} absences".format(res.absences)).to_json()
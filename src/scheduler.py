@@ -0,0 +1,373 @@
+import asyncio
+import heapq
+import logging
+import os
+import socket
+import time
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.db import ConnectionPool
+
+logger = logging.getLogger(__name__)
+
+SCHEDULED_JOB_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS scheduled_job (
+    name TEXT PRIMARY KEY NOT NULL,
+    kind TEXT NOT NULL,
+    arg TEXT NULL,
+    next_run FLOAT NOT NULL,
+    interval FLOAT NULL,
+    claimed_by TEXT NULL,
+    claimed_until FLOAT NULL,
+    last_run FLOAT NULL,
+    last_status TEXT NULL,
+    last_error TEXT NULL,
+    last_duration FLOAT NULL,
+    runs INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# a job function takes the job's ``arg`` and may return when it should run
+# next; otherwise a recurring job runs again after its interval and a one-off
+# job is dropped
+JobFunction = Callable[[Optional[str]], Optional[float]]
+
+
+class SchedulerSettings(BaseModel):
+    """In-process job scheduler settings.
+
+    Read from the environment with the ``MAS_SCHEDULER_`` prefix, e.g.
+    ``MAS_SCHEDULER_ENABLED=0`` on workers that should only serve requests.
+    """
+
+    enabled: bool = True
+    # jobs running at once, each on a db executor thread
+    max_concurrency: int = 2
+    # a claimed job whose process died is run again after this long
+    lease_seconds: float = 600.0
+    # a job that raised runs again after this long
+    retry_seconds: float = 300.0
+    # the absent sweep fires when the next late window closes, and at least
+    # this often to pick up sessions created since
+    sweep_recheck_minutes: float = 15.0
+    # the rosters and cached rows of lectures starting within this long are
+    # loaded ahead of their first check-ins; the warmup runs this long
+    # before each start, and at least every sweep_recheck_minutes
+    warmup_minutes: float = 10.0
+    # session materialization and partition rollover
+    maintenance_hours: float = 24.0
+
+    @classmethod
+    def from_env(cls) -> "SchedulerSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_SCHEDULER_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+
+class Job(BaseModel):
+    name: str
+    kind: str
+    arg: Optional[str] = None
+    next_run: float
+    interval: Optional[float] = None
+    claimed_by: Optional[str] = None
+    claimed_until: Optional[float] = None
+    last_run: Optional[float] = None
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    last_duration: Optional[float] = None
+    runs: int = 0
+
+
+class JobStatus(Job):
+    # seconds the job is overdue; 0 while it is not due yet
+    lag: float
+    running: bool
+
+
+def _job_from_row(row) -> Job:
+    return Job(**dict(zip(Job.model_fields, row)))
+
+
+class Scheduler:
+    """Heap-ordered job scheduler running on the app's event loop.
+
+    Jobs live in the ``scheduled_job`` table, the heap only orders this
+    process's view of them. When the earliest job is due it is re-read and
+    claimed with a compare-and-set on its ``next_run`` and lease, so when
+    several workers run a scheduler each run still happens once, and a run
+    whose process died is picked up again once its lease expires. Jobs that
+    came due while the app was down are found overdue at ``start`` and run
+    right away. Job functions are blocking and run on ``executor``, at most
+    ``max_concurrency`` at a time.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        executor: ThreadPoolExecutor,
+        settings: SchedulerSettings | None = None,
+    ):
+        self.pool = pool
+        self.executor = executor
+        self.settings = settings or SchedulerSettings()
+        self.owner = "{}:{}".format(socket.gethostname(), os.getpid())
+        self._functions: dict[str, JobFunction] = {}
+        self._recurring: dict[str, float] = {}
+        self._heap: list[tuple[float, int, str]] = []
+        self._due: dict[str, float] = {}
+        self._seq = 0
+        self._running: dict[str, asyncio.Task] = {}
+        self._wakeup: asyncio.Event | None = None
+        self._slots: asyncio.Semaphore | None = None
+        self._task: asyncio.Task | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def register(self, kind: str, fn: JobFunction, every: float | None = None):
+        """Make ``kind`` runnable; with ``every``, also keep one recurring job
+        named after it, first due at startup."""
+        self._functions[kind] = fn
+        if every is not None:
+            self._recurring[kind] = every
+
+    async def start(self):
+        if not self.settings.enabled or self._task is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.settings.max_concurrency)
+        loop = self._loop = asyncio.get_running_loop()
+        jobs = await loop.run_in_executor(self.executor, self._load)
+        for job in jobs:
+            self._push(job.name, job.next_run)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop dispatching and wait for the jobs already running."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self._running:
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+    async def schedule(
+        self,
+        name: str,
+        kind: str,
+        at: float,
+        interval: float | None = None,
+        arg: str | None = None,
+    ):
+        """Create or move the job ``name`` to run at ``at``."""
+        if kind not in self._functions:
+            raise ValueError("Unknown job kind {}".format(kind))
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(
+            self.executor, self._upsert, name, kind, at, interval, arg
+        )
+        if self._task is not None:
+            self._push(name, at)
+
+    def expedite(self, name: str, at: float):
+        """Bring the job ``name`` forward to ``at`` if it is due later.
+
+        Blocking and safe to call from any thread, e.g. a handler that just
+        created work the job should pick up sooner.
+        """
+        with self.pool.writer() as conn:
+            moved = conn.execute(
+                """
+                UPDATE scheduled_job SET next_run = ?
+                WHERE name = ? AND next_run > ? AND claimed_until IS NULL
+                """,
+                (at, name, at),
+            ).rowcount
+        if moved and self._task is not None:
+            self._loop.call_soon_threadsafe(self._push, name, at)
+
+    def jobs(self) -> list[JobStatus]:
+        now = time.time()
+        with self.pool.reader() as conn:
+            rows = conn.execute(
+                "SELECT {} FROM scheduled_job ORDER BY next_run".format(
+                    ", ".join(Job.model_fields)
+                )
+            ).fetchall()
+        return [
+            JobStatus(
+                **job.model_dump(),
+                lag=max(0.0, now - job.next_run),
+                running=job.name in self._running,
+            )
+            for job in map(_job_from_row, rows)
+        ]
+
+    def _load(self) -> list[Job]:
+        now = time.time()
+        with self.pool.writer() as conn:
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO scheduled_job (name, kind, next_run, interval)
+                VALUES (?, ?, ?, ?)
+                """,
+                [(kind, kind, now, every) for kind, every in self._recurring.items()],
+            )
+            rows = conn.execute(
+                "SELECT {} FROM scheduled_job".format(", ".join(Job.model_fields))
+            ).fetchall()
+        return [_job_from_row(row) for row in rows]
+
+    def _upsert(self, name, kind, at, interval, arg):
+        with self.pool.writer() as conn:
+            conn.execute(
+                """
+                INSERT INTO scheduled_job (name, kind, arg, next_run, interval)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (name) DO UPDATE SET
+                    kind = excluded.kind, arg = excluded.arg,
+                    next_run = excluded.next_run, interval = excluded.interval
+                """,
+                (name, kind, arg, at, interval),
+            )
+
+    def _push(self, name: str, at: float):
+        # superseded heap entries are skipped when they surface
+        self._due[name] = at
+        self._seq += 1
+        heapq.heappush(self._heap, (at, self._seq, name))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                at, _, name = heapq.heappop(self._heap)
+                if self._due.get(name) != at:
+                    continue
+                del self._due[name]
+                if name in self._running:
+                    # the run in progress queues the job again when it ends
+                    continue
+                await self._slots.acquire()
+                self._running[name] = loop.create_task(self._fire(name))
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _fire(self, name: str):
+        loop = asyncio.get_running_loop()
+        try:
+            retry_at = await loop.run_in_executor(self.executor, self._execute, name)
+        except Exception:
+            logger.exception("Could not run job %s", name)
+            retry_at = time.time() + self.settings.retry_seconds
+        finally:
+            self._slots.release()
+            self._running.pop(name, None)
+        if retry_at is not None and name not in self._due:
+            self._push(name, retry_at)
+
+    def _execute(self, name: str) -> float | None:
+        """Claim and run one job; returns when to look at it again."""
+        now = time.time()
+        with self.pool.writer() as conn:
+            # read and claim under one write lock, other workers included
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT {} FROM scheduled_job WHERE name = ?".format(
+                    ", ".join(Job.model_fields)
+                ),
+                (name,),
+            ).fetchone()
+            if row is None:
+                return None
+            job = _job_from_row(row)
+            if job.next_run > now:
+                return job.next_run
+            if job.claimed_until is not None and job.claimed_until > now:
+                return job.claimed_until
+            claimed = conn.execute(
+                """
+                UPDATE scheduled_job SET claimed_by = ?, claimed_until = ?
+                WHERE name = ? AND next_run = ?
+                  AND (claimed_until IS NULL OR claimed_until <= ?)
+                """,
+                (
+                    self.owner,
+                    now + self.settings.lease_seconds,
+                    name,
+                    job.next_run,
+                    now,
+                ),
+            ).rowcount
+        if not claimed:
+            return now + 1.0
+
+        started = time.perf_counter()
+        status, error, next_run = "ok", None, None
+        fn = self._functions.get(job.kind)
+        try:
+            if fn is None:
+                raise LookupError("No function registered for {}".format(job.kind))
+            next_run = fn(job.arg)
+        except Exception as e:
+            logger.exception("Job %s failed", name)
+            status, error = "error", repr(e)
+        duration = time.perf_counter() - started
+
+        finished = time.time()
+        if error is not None:
+            next_run = finished + self.settings.retry_seconds
+        elif next_run is None and job.interval is not None:
+            # a job that missed several runs while the app was down runs
+            # once, then keeps its original phase
+            next_run = job.next_run + job.interval
+            if next_run <= finished:
+                next_run += ((finished - next_run) // job.interval + 1) * job.interval
+        with self.pool.writer() as conn:
+            # schedule() may have moved the job while it ran; that wins
+            if next_run is None:
+                conn.execute(
+                    "DELETE FROM scheduled_job WHERE name = ? AND next_run = ?",
+                    (name, job.next_run),
+                )
+            conn.execute(
+                """
+                UPDATE scheduled_job
+                SET next_run = CASE WHEN next_run = ? THEN ? ELSE next_run END,
+                    claimed_by = NULL, claimed_until = NULL,
+                    last_run = ?, last_status = ?, last_error = ?,
+                    last_duration = ?, runs = runs + 1
+                WHERE name = ? AND claimed_by = ?
+                """,
+                (
+                    job.next_run,
+                    next_run,
+                    now,
+                    status,
+                    error,
+                    duration,
+                    name,
+                    self.owner,
+                ),
+            )
+            row = conn.execute(
+                "SELECT next_run FROM scheduled_job WHERE name = ?", (name,)
+            ).fetchone()
+        return row[0] if row else None
@@ -1,18 +1,22 @@
 from typing import Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+
+# durations are in seconds; anything shorter than a minute is taken to be a
+# count of hours, which older clients sent
+MIN_DURATION = 60
 
 
 class CreateClassroom(BaseModel):
     lecturer_name: str
-    duration: int
+    duration: int = Field(ge=MIN_DURATION)
     lecture_time: float
     late_penalty_duration: float
     subject_name: str
 
 
 class UpdateClassroom(BaseModel):
-    duration: Optional[int] = None
+    duration: Optional[int] = Field(None, ge=MIN_DURATION)
     lecture_time: Optional[float] = None
     late_penalty_duration: Optional[float] = None
 
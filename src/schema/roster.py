@@ -0,0 +1,18 @@
+from pydantic import BaseModel, Field
+
+from src.schema.classroom import MIN_DURATION
+
+
+class RosterRow(BaseModel):
+    firstname: str
+    lastname: str = ""
+    generation: int
+    gender: str
+    major: str | None = None
+    subject_name: str
+    lecturer_name: str
+    # only needed when the classroom does not exist yet
+    duration: int | None = Field(None, ge=MIN_DURATION)
+    late_penalty_duration: float | None = None
+    lecture_time: float | None = None
+    record_interval: float | None = None
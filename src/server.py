@@ -0,0 +1,133 @@
+import argparse
+import importlib.util
+import logging
+import logging.config
+import os
+
+import uvicorn
+from pydantic import BaseModel
+from uvicorn.config import LOGGING_CONFIG
+
+from src.db import ConnectionPool
+
+logger = logging.getLogger("uvicorn.error")
+
+
+class ServerSettings(BaseModel):
+    """How ``poetry run start`` serves the app.
+
+    Read from the environment with the ``MAS_SERVER_`` prefix, e.g.
+    ``MAS_SERVER_PRODUCTION=1 MAS_SERVER_WORKERS=8``; command line flags take
+    precedence. Without ``production`` the app runs in one process with the
+    auto reloader, for development.
+    """
+
+    production: bool = False
+    host: str = "0.0.0.0"
+    port: int = 8000
+    # worker processes in production; 0 starts one per CPU. Workers share
+    # nothing but the database, so caches and the roster snapshot in each
+    # one only learn about the others' writes through table_version
+    workers: int = 1
+    # idle keep-alive connections are closed after this long; tablets on a
+    # weak network reuse their connection between polls instead of paying
+    # for a new handshake
+    keep_alive: int = 15
+    # connections the kernel queues while every worker is busy
+    backlog: int = 2048
+    # on shutdown, requests in flight get this long to finish before they
+    # are cancelled and the lifespan shutdown flushes ingest and the
+    # scheduler
+    graceful_timeout: int = 30
+
+    @classmethod
+    def from_env(cls) -> "ServerSettings":
+        overrides = {}
+        for name in cls.model_fields:
+            value = os.environ.get("MAS_SERVER_" + name.upper())
+            if value is not None:
+                overrides[name] = value
+        return cls(**overrides)
+
+    def worker_count(self) -> int:
+        if not self.production:
+            return 1
+        return self.workers or os.cpu_count() or 1
+
+
+def parse_server_args(argv: list[str] | None = None) -> ServerSettings:
+    parser = argparse.ArgumentParser(description="Run the attendance server")
+    parser.add_argument(
+        "--production",
+        action="store_true",
+        default=None,
+        help="serve with worker processes and no reloader",
+    )
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument(
+        "--workers", type=int, help="worker processes, 0 for one per CPU (default: 1)"
+    )
+    parser.add_argument(
+        "--keep-alive", type=int, help="seconds an idle connection is kept"
+    )
+    parser.add_argument("--backlog", type=int, help="pending connection queue")
+    parser.add_argument(
+        "--graceful-timeout",
+        type=int,
+        help="seconds requests in flight get to finish on shutdown",
+    )
+    args = parser.parse_args(argv)
+    overrides = {name: value for name, value in vars(args).items() if value is not None}
+    return ServerSettings.from_env().model_copy(update=overrides)
+
+
+def require_wal(pool: ConnectionPool):
+    """Refuse to run several workers on a database not in WAL mode.
+
+    Workers each open their own connections to the same file; with a
+    rollback journal every write would lock the readers of all of them out.
+    """
+    with pool.reader() as conn:
+        mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if mode.lower() != "wal":
+        raise SystemExit(
+            "Several workers need the database in WAL mode, it is in {} mode;"
+            " unset MAS_DB_JOURNAL_MODE or run one worker".format(mode)
+        )
+
+
+def serve(app: str, settings: ServerSettings):
+    """Run ``app``, an import string, with uvicorn."""
+    if not settings.production:
+        uvicorn.run(app, host=settings.host, port=settings.port, reload=True)
+        return
+    # uvloop and httptools come with uvicorn[standard] where they build;
+    # fall back to the pure Python ones elsewhere
+    loop = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    workers = settings.worker_count()
+    # uvicorn.run applies the same configuration, only after this line
+    logging.config.dictConfig(LOGGING_CONFIG)
+    logger.info(
+        "Serving %s:%s with %d workers (%s, %s)",
+        settings.host,
+        settings.port,
+        workers,
+        loop,
+        http,
+    )
+    # each worker is a spawned process that imports ``app`` again, so it
+    # runs its own connection pool, executor, ingest queue, scheduler,
+    # object cache and roster snapshot
+    uvicorn.run(
+        app,
+        host=settings.host,
+        port=settings.port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=settings.keep_alive,
+        backlog=settings.backlog,
+        timeout_graceful_shutdown=settings.graceful_timeout,
+    )
@@ -0,0 +1,163 @@
+import time
+from typing import TYPE_CHECKING
+
+from pydantic import BaseModel
+
+from src.db import ConnectionPool
+from src.model.attendance import Punctuality
+from src.model.model_exception import NotFoundError
+
+if TYPE_CHECKING:
+    from src.archive import ColumnarArchive
+    from src.partitions import AttendancePartitions
+
+# attendance(enrollment_id, entry_time, punctuality) covers the per-class
+# aggregates: the enrollments of a class are found on enrollment(class_id,
+# id), and each one's rows in the time range are counted from the index
+# without reading the attendance table itself
+ATTENDANCE_CLASS_STATS_INDEX_SQL = """
+CREATE INDEX IF NOT EXISTS idx_attendance_enrollment_entry_punctuality
+ON attendance(enrollment_id, entry_time, punctuality)
+"""
+
+
+class PunctualityCounts(BaseModel):
+    records: int = 0
+    ontime: int = 0
+    late: int = 0
+    absent: int = 0
+    auto: int = 0
+    # share of the records where the student showed up, on time or late
+    attendance_rate: float = 0.0
+    # share of the records where the student came late
+    late_rate: float = 0.0
+
+    def add(self, punctuality: str, count: int):
+        setattr(self, punctuality, getattr(self, punctuality) + count)
+        self.records += count
+        if self.records:
+            self.attendance_rate = (self.ontime + self.late) / self.records
+            self.late_rate = self.late / self.records
+
+
+class ClassSummary(PunctualityCounts):
+    class_id: str
+    start: float | None = None
+    end: float | None = None
+    enrolled: int = 0
+    # sessions that started within the range, up to now
+    sessions: int = 0
+
+
+class DailyStats(PunctualityCounts):
+    # local calendar day of entry_time, YYYY-MM-DD
+    day: str
+
+
+class ClassStatsDBHandler:
+    """Per-class attendance aggregates computed in the database.
+
+    Each figure is one ``GROUP BY`` query per attendance table overlapping
+    the requested range (hot table and attached partitions), answered from
+    indexes; only the grouped counts come back to Python. Terms converted
+    to the columnar archive are counted there and added in.
+    """
+
+    def __init__(
+        self,
+        pool: ConnectionPool,
+        partitions: "AttendancePartitions | None" = None,
+        archive: "ColumnarArchive | None" = None,
+    ):
+        self.pool = pool
+        self.partitions = partitions
+        self.archive = archive
+
+    def _tables(self, conn, start=None, end=None):
+        if self.partitions is None:
+            return iter(("main.attendance",))
+        return self.partitions.tables(conn, start, end)
+
+    def summary(
+        self, class_id: str, start: float | None = None, end: float | None = None
+    ) -> ClassSummary:
+        lo = float("-inf") if start is None else start
+        hi = float("inf") if end is None else end
+        result = ClassSummary(class_id=class_id, start=start, end=end)
+        with self.pool.reader() as conn:
+            _ensure_classroom(conn, class_id)
+            result.enrolled = conn.execute(
+                "SELECT COUNT(*) FROM enrollment WHERE class_id = ?", (class_id,)
+            ).fetchone()[0]
+            result.sessions = conn.execute(
+                """
+                SELECT COUNT(*) FROM lecture_session
+                WHERE class_id = ? AND start_time >= ? AND start_time < ?
+                """,
+                (class_id, lo, min(hi, time.time())),
+            ).fetchone()[0]
+            for table in self._tables(conn, start, end):
+                rows = conn.execute(
+                    """
+                    SELECT a.punctuality, COUNT(*) FROM enrollment e
+                    JOIN {} a ON a.enrollment_id = e.id
+                    WHERE e.class_id = ? AND a.entry_time >= ? AND a.entry_time < ?
+                    GROUP BY a.punctuality
+                    """.format(
+                        table
+                    ),
+                    (class_id, lo, hi),
+                )
+                for punctuality, count in rows:
+                    result.add(punctuality, count)
+        if self.archive is not None:
+            archived = self.archive.summary(class_id=class_id, start=start, end=end)
+            for punctuality in Punctuality:
+                result.add(punctuality.value, getattr(archived, punctuality.value))
+        return result
+
+    def daily(
+        self, class_id: str, start: float | None = None, end: float | None = None
+    ) -> list[DailyStats]:
+        """Counts per local calendar day, oldest first; days without any
+        attendance are left out."""
+        lo = float("-inf") if start is None else start
+        hi = float("inf") if end is None else end
+        days: dict[str, DailyStats] = {}
+
+        def day_stats(day: str) -> DailyStats:
+            if day not in days:
+                days[day] = DailyStats(day=day)
+            return days[day]
+
+        with self.pool.reader() as conn:
+            _ensure_classroom(conn, class_id)
+            for table in self._tables(conn, start, end):
+                rows = conn.execute(
+                    """
+                    SELECT date(a.entry_time, 'unixepoch', 'localtime') AS day,
+                           a.punctuality, COUNT(*)
+                    FROM enrollment e
+                    JOIN {} a ON a.enrollment_id = e.id
+                    WHERE e.class_id = ? AND a.entry_time >= ? AND a.entry_time < ?
+                    GROUP BY day, a.punctuality
+                    """.format(
+                        table
+                    ),
+                    (class_id, lo, hi),
+                )
+                for day, punctuality, count in rows:
+                    day_stats(day).add(punctuality, count)
+        if self.archive is not None:
+            archived = self.archive.daily(class_id=class_id, start=start, end=end)
+            for day, counts in archived.items():
+                for punctuality, count in zip(Punctuality, counts.tolist()):
+                    if count:
+                        day_stats(day).add(punctuality.value, count)
+        return [days[day] for day in sorted(days)]
+
+
+def _ensure_classroom(conn, class_id: str):
+    found = conn.execute("SELECT 1 FROM classroom WHERE id = ?", (class_id,))
+    if found.fetchone() is None:
+        raise NotFoundError("Classroom not found")
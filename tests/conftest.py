@@ -0,0 +1,12 @@
+import pytest
+
+from src.db import ConnectionPool
+from src.migrations import migrate
+
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "attendance.db"))
+    migrate(pool)
+    yield pool
+    pool.close()
@@ -0,0 +1,139 @@
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.model.attendance import (
+    Attendance,
+    AttendanceDBHandler,
+    Punctuality,
+    insert_attendances_internal,
+)
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.lecture_session import LectureSessionDBHandler, session_id
+from src.model.student import StudentDBHandler, create_stud
+
+
+@pytest.fixture
+def lecture(pool):
+    # an hour long lecture with a 15 minute late window, starting in an hour
+    classroom = create_classroom(
+        "lecturer", "math", 3600, 900.0, lecture_time=time.time() + 3600
+    )
+    ClassroomDBHandler(pool).create_many([classroom])
+    students = [create_stud("John", "Doe", 1, "m"), create_stud("Jane", "Roe", 1, "f")]
+    enrollments = [create_enrollment(classroom.id, s.id) for s in students]
+    StudentDBHandler(pool).register_many(students, enrollments)
+    sessions = LectureSessionDBHandler(pool)
+    sessions.materialize([classroom.id])
+    return classroom, enrollments, sessions
+
+
+def counts(pool, enrollment):
+    with pool.reader() as conn:
+        return conn.execute(
+            """
+            SELECT present_count, absent_count FROM attendance_detail
+            WHERE student_id = ?
+            """,
+            (enrollment.student_id,),
+        ).fetchone()
+
+
+def test_sweep_records_no_shows_once(pool, lecture):
+    classroom, (attended, skipped), sessions = lecture
+    start = classroom.lecture_time
+    with pool.writer() as conn:
+        insert_attendances_internal(
+            conn,
+            [
+                Attendance(
+                    id="checked-in",
+                    enrollment_id=attended.id,
+                    last_record=start + 60,
+                    entry_time=start + 60,
+                    punctuality=Punctuality.ONTIME,
+                )
+            ],
+        )
+    end = start + 3600
+    assert sessions.next_sweep_due() == end
+
+    # the late window has not closed yet
+    assert sessions.sweep_absent(end - 1).absences == 0
+
+    sweep = sessions.sweep_absent(end)
+    assert (sweep.sessions, sweep.absences) == (1, 1)
+    assert counts(pool, attended) == (1, 0)
+    assert counts(pool, skipped) == (0, 1)
+    (absence,) = [
+        row
+        for row in AttendanceDBHandler(pool).list_attendance().items
+        if row.enrollment_id == skipped.id
+    ]
+    assert absence.punctuality == Punctuality.ABSENT
+    assert absence.session_id == session_id(classroom.id, start)
+
+    again = sessions.sweep_absent(end + 60)
+    assert (again.sessions, again.absences) == (0, 0)
+    assert counts(pool, skipped) == (0, 1)
+    assert sessions.next_sweep_due() == end + 7 * 86400
+
+
+def test_early_check_in_counts_for_the_session(pool, lecture):
+    classroom, enrollments, sessions = lecture
+    start = classroom.lecture_time
+    # within early_minutes of the start
+    with pool.writer() as conn:
+        insert_attendances_internal(
+            conn,
+            [
+                Attendance(
+                    id=enrollment.id,
+                    enrollment_id=enrollment.id,
+                    last_record=start - 600,
+                    entry_time=start - 600,
+                    punctuality=Punctuality.ONTIME,
+                )
+                for enrollment in enrollments
+            ],
+        )
+
+    assert sessions.sweep_absent(start + 3600).absences == 0
+
+
+def test_late_check_in_after_a_short_lecture_counts(pool):
+    # a ten minute lecture at five past the hour; check-ins are scored late
+    # until the hour is over
+    start = datetime.now().replace(minute=5, second=0, microsecond=0)
+    start += timedelta(hours=2)
+    classroom = create_classroom(
+        "lecturer", "math", 600, 300.0, lecture_time=start.timestamp()
+    )
+    ClassroomDBHandler(pool).create_many([classroom])
+    students = [create_stud("John", "Doe", 1, "m"), create_stud("Jane", "Roe", 1, "f")]
+    late, skipped = [create_enrollment(classroom.id, s.id) for s in students]
+    StudentDBHandler(pool).register_many(students, [late, skipped])
+    sessions = LectureSessionDBHandler(pool)
+    sessions.materialize([classroom.id])
+    entry_time = classroom.lecture_time + 1800
+    (check_in,) = AttendanceDBHandler(pool).create_many(
+        [
+            Attendance(
+                id="late",
+                enrollment_id=late.id,
+                last_record=entry_time,
+                entry_time=entry_time,
+                punctuality=Punctuality.AUTO,
+            )
+        ]
+    )
+    assert check_in.punctuality == Punctuality.LATE
+    assert check_in.session_id == session_id(classroom.id, classroom.lecture_time)
+
+    sweep = sessions.sweep_absent(sessions.next_sweep_due())
+
+    assert (sweep.sessions, sweep.absences) == (1, 1)
+    assert counts(pool, late) == (0, 0)
+    assert counts(pool, skipped) == (0, 1)
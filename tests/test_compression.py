@@ -0,0 +1,128 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
+from fastapi.testclient import TestClient
+
+import src.compression
+from src.compression import (
+    CompressionMiddleware,
+    CompressionSettings,
+    ResponseCompression,
+)
+
+BODY = {"items": ["attendance"] * 200}
+
+
+@pytest.fixture
+def without_brotli(monkeypatch):
+    monkeypatch.setattr(src.compression, "brotli", None)
+
+
+@pytest.fixture
+def with_brotli(monkeypatch):
+    # negotiation only checks that the module is there
+    if src.compression.brotli is None:
+        monkeypatch.setattr(src.compression, "brotli", object())
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("gzip, br", "br"),
+        ("br;q=0.5, gzip", "gzip"),
+        ("br;q=0, *", "gzip"),
+        ("identity", None),
+        ("gzip;q=0", None),
+        ("", None),
+    ],
+)
+def test_negotiate_prefers_brotli(with_brotli, accept_encoding, expected):
+    assert ResponseCompression().negotiate(accept_encoding) == expected
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected", [("br", None), ("br, gzip", "gzip"), ("*", "gzip")]
+)
+def test_negotiate_without_brotli(without_brotli, accept_encoding, expected):
+    assert ResponseCompression().negotiate(accept_encoding) == expected
+
+
+@pytest.fixture
+def compression(without_brotli):
+    return ResponseCompression(CompressionSettings(minimum_size=100))
+
+
+@pytest.fixture
+def client(compression):
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, compression=compression)
+
+    @app.get("/large")
+    def large():
+        return JSONResponse(BODY)
+
+    @app.get("/small")
+    def small():
+        return JSONResponse({"ok": True})
+
+    @app.get("/encoded")
+    def encoded():
+        return Response(
+            gzip.compress(b"already" * 100),
+            media_type="application/json",
+            headers={"Content-Encoding": "gzip"},
+        )
+
+    return TestClient(app)
+
+
+def get(client, path, accept_encoding):
+    # stream() leaves the body as it came over the wire
+    with client.stream(
+        "GET", path, headers={"Accept-Encoding": accept_encoding}
+    ) as response:
+        return response, b"".join(response.iter_raw())
+
+
+def test_large_body_is_gzipped(client, compression):
+    response, raw = get(client, "/large", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(raw)
+    assert gzip.decompress(raw) == JSONResponse(BODY).body
+    stats = compression.stats()
+    assert (stats.gzip, stats.bytes_in, stats.bytes_out) == (
+        1,
+        len(JSONResponse(BODY).body),
+        len(raw),
+    )
+
+
+def test_identity_is_sent_as_is(client, compression):
+    response, raw = get(client, "/large", "identity")
+
+    assert "content-encoding" not in response.headers
+    assert raw == JSONResponse(BODY).body
+    assert compression.stats().gzip == 0
+
+
+def test_small_body_is_sent_as_is(client, compression):
+    response, raw = get(client, "/small", "gzip")
+
+    assert "content-encoding" not in response.headers
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert raw == b'{"ok":true}'
+    assert compression.stats().too_small == 1
+
+
+def test_encoded_response_is_passed_through(client, compression):
+    response, raw = get(client, "/encoded", "gzip")
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(raw) == b"already" * 100
+    stats = compression.stats()
+    assert (stats.gzip, stats.too_small) == (0, 0)
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(tmp_path_factory):
+    # the app opens db/attendance.db under the working directory on import
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("app"))
+    try:
+        from src.app import app
+
+        with TestClient(app) as client:
+            yield client
+    finally:
+        os.chdir(cwd)
+
+
+def register_classroom(client, subject_name):
+    response = client.post(
+        "/classrooms/",
+        json=[
+            {
+                "lecturer_name": "lecturer",
+                "subject_name": subject_name,
+                "duration": 3600,
+                "lecture_time": 1.7e9,
+                "late_penalty_duration": 900.0,
+            }
+        ],
+    )
+    assert response.status_code == 200
+
+
+def test_unchanged_list_is_not_modified(client):
+    register_classroom(client, "math")
+    first = client.get("/classrooms/")
+    etag = first.headers["ETag"]
+    assert first.status_code == 200 and etag.startswith('W/"')
+
+    again = client.get("/classrooms/", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+
+@pytest.mark.parametrize("if_none_match", ["{etag}", '"x", {etag}', "{strong}", "*"])
+def test_if_none_match_uses_weak_comparison(client, if_none_match):
+    etag = client.get("/classrooms/").headers["ETag"]
+    header = if_none_match.format(etag=etag, strong=etag.removeprefix("W/"))
+
+    assert (
+        client.get("/classrooms/", headers={"If-None-Match": header}).status_code == 304
+    )
+
+
+def test_write_changes_the_etag(client):
+    etag = client.get("/classrooms/").headers["ETag"]
+
+    register_classroom(client, "physics")
+    response = client.get("/classrooms/", headers={"If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    subjects = [item["subject_name"] for item in response.json()["data"]]
+    assert "physics" in subjects
+
+
+def test_unrelated_write_keeps_the_etag(client):
+    etag = client.get("/classrooms/").headers["ETag"]
+
+    response = client.post(
+        "/students/",
+        json=[{"firstname": "John", "lastname": "Doe", "generation": 1, "gender": "m"}],
+    )
+    assert response.status_code == 200
+
+    assert (
+        client.get("/classrooms/", headers={"If-None-Match": etag}).status_code == 304
+    )
@@ -0,0 +1,14 @@
+import pytest
+
+
+def test_nested_writer_is_refused(pool):
+    with pool.writer() as conn:
+        conn.execute("CREATE TABLE note (id TEXT)")
+    with pytest.raises(RuntimeError):
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO note VALUES ('outer')")
+            with pool.writer():
+                pass
+    # the outer block rolled back as a whole, and the writer is free again
+    with pool.writer() as conn:
+        assert conn.execute("SELECT * FROM note").fetchall() == []
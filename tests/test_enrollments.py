@@ -0,0 +1,17 @@
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import EnrollmentDBHandler, create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+def test_lookups_return_enrollments_quietly(pool, capsys):
+    classroom = create_classroom("lecturer", "math", 2, 15.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    capsys.readouterr()
+    enrollments = EnrollmentDBHandler(pool)
+
+    assert enrollments.get_by_student(student.id) == [enrollment]
+    assert enrollments.list_enrollment_by_class(classroom.id) == [enrollment]
+    assert capsys.readouterr().out == ""
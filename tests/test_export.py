@@ -0,0 +1,60 @@
+"""Exports read in keyset batches and never keep a reader between them."""
+
+import pytest
+
+from src.model.attendance import (
+    Attendance,
+    AttendanceDBHandler,
+    Punctuality,
+    insert_attendances_internal,
+)
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+@pytest.fixture
+def attendance(pool):
+    classroom = create_classroom("lecturer", "math", 2, 15.0, lecture_time=1000.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    # pairs of rows share an entry_time, so batches also split on id
+    rows = [
+        Attendance(
+            id="{:02d}".format(i),
+            enrollment_id=enrollment.id,
+            last_record=1000.0 + i // 2,
+            entry_time=1000.0 + i // 2,
+            punctuality=Punctuality.ONTIME,
+        )
+        for i in reversed(range(11))
+    ]
+    with pool.writer() as conn:
+        insert_attendances_internal(conn, rows)
+        conn.commit()
+    return classroom, rows
+
+
+@pytest.mark.parametrize("batch_size", [1, 2, 3, 1000])
+def test_export_is_ordered_and_complete(pool, attendance, batch_size):
+    classroom, rows = attendance
+    exported = list(
+        AttendanceDBHandler(pool).export(class_id=classroom.id, batch_size=batch_size)
+    )
+    assert [row[0] for row in exported] == sorted(row.id for row in rows)
+    assert [row[5] for row in exported] == sorted(row.entry_time for row in rows)
+
+
+def test_export_filters_on_time(pool, attendance):
+    exported = AttendanceDBHandler(pool).export(start=1001.0, end=1003.0, batch_size=2)
+    assert [row[0] for row in exported] == ["02", "03", "04", "05"]
+
+
+def test_export_returns_reader_between_batches(pool, attendance):
+    exported = AttendanceDBHandler(pool).export(batch_size=3)
+    next(exported)
+    stats = pool.stats()
+    assert stats.idle == stats.opened
+    assert len(list(exported)) == 10
@@ -0,0 +1,137 @@
+import asyncio
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.ingest import AttendanceIngestQueue, IngestSettings
+from src.model.attendance import Attendance, Punctuality
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+@pytest.fixture
+def enrollment(pool):
+    classroom = create_classroom("lecturer", "math", 3600, 900.0, lecture_time=1.7e9)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    return enrollment
+
+
+def check_in(enrollment, id):
+    return Attendance(
+        id=id,
+        enrollment_id=enrollment.id,
+        last_record=1.7e9,
+        entry_time=1.7e9,
+        punctuality=Punctuality.ONTIME,
+    )
+
+
+def stored(pool):
+    with pool.reader() as conn:
+        return [row[0] for row in conn.execute("SELECT id FROM attendance ORDER BY id")]
+
+
+def run(pool, executor, settings, body):
+    """Run ``body(queue)`` between the queue's start and stop."""
+
+    async def main():
+        queue = AttendanceIngestQueue(pool, executor, settings)
+        await queue.start()
+        try:
+            return queue, await body(queue)
+        finally:
+            await queue.stop()
+
+    return asyncio.run(main())
+
+
+def test_concurrent_submissions_share_one_commit(pool, executor, enrollment):
+    settings = IngestSettings(enabled=True, flush_interval_ms=100)
+
+    async def body(queue):
+        return await asyncio.gather(
+            *(queue.submit([check_in(enrollment, str(i))]) for i in range(3))
+        )
+
+    queue, results = run(pool, executor, settings, body)
+
+    assert [[row.id for row in rows] for rows in results] == [["0"], ["1"], ["2"]]
+    assert stored(pool) == ["0", "1", "2"]
+    stats = queue.stats()
+    assert (stats.flushes, stats.rows, stats.max_batch_size, stats.pending) == (
+        1,
+        3,
+        3,
+        0,
+    )
+
+
+def test_full_batch_is_flushed_without_waiting(pool, executor, enrollment):
+    settings = IngestSettings(enabled=True, max_batch=2, flush_interval_ms=60000)
+
+    async def body(queue):
+        rows = [check_in(enrollment, "a"), check_in(enrollment, "b")]
+        return await asyncio.wait_for(queue.submit(rows), 5)
+
+    queue, _ = run(pool, executor, settings, body)
+
+    assert stored(pool) == ["a", "b"]
+    assert queue.stats().flushes == 1
+
+
+def test_stop_flushes_waiting_rows(pool, executor, enrollment):
+    settings = IngestSettings(enabled=True, flush_interval_ms=60000)
+
+    async def main():
+        queue = AttendanceIngestQueue(pool, executor, settings)
+        await queue.start()
+        submitted = asyncio.create_task(queue.submit([check_in(enrollment, "a")]))
+        await asyncio.sleep(0.05)
+        assert not submitted.done()
+        await queue.stop()
+        return await submitted
+
+    (row,) = asyncio.run(main())
+
+    assert row.id == "a"
+    assert stored(pool) == ["a"]
+
+
+def test_failed_group_only_fails_the_bad_caller(pool, executor, enrollment):
+    settings = IngestSettings(enabled=True, flush_interval_ms=100)
+
+    async def body(queue):
+        await queue.submit([check_in(enrollment, "taken")])
+        return await asyncio.gather(
+            queue.submit([check_in(enrollment, "a")]),
+            queue.submit([check_in(enrollment, "b"), check_in(enrollment, "taken")]),
+            queue.submit([check_in(enrollment, "c")]),
+            return_exceptions=True,
+        )
+
+    queue, (first, failed, last) = run(pool, executor, settings, body)
+
+    assert isinstance(failed, sqlite3.IntegrityError)
+    assert [row.id for row in first + last] == ["a", "c"]
+    # the bad caller's rows were rolled back together
+    assert stored(pool) == ["a", "c", "taken"]
+    assert queue.stats().pending == 0
+
+
+def test_submit_needs_a_running_queue(pool, executor, enrollment):
+    queue = AttendanceIngestQueue(pool, executor, IngestSettings(enabled=True))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(queue.submit([check_in(enrollment, "a")]))
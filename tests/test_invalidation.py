@@ -0,0 +1,179 @@
+"""Writes made by another worker, simulated by a second pool on the same
+database file, reach this process's in-memory state."""
+
+import pytest
+
+from src.cache import ObjectCache
+from src.db import ConnectionPool
+from src.model.attendance import Attendance, AttendanceDBHandler, Punctuality
+from src.model.classroom import (
+    ClassroomDBHandler,
+    ClassroomModifiable,
+    create_classroom,
+)
+from src.model.enrollments import EnrollmentDBHandler, create_enrollment
+from src.model.roster import RosterSettings, RosterSnapshot
+from src.model.student import StudentDBHandler, create_stud
+
+
+@pytest.fixture
+def other_worker(pool):
+    other = ConnectionPool(pool.path)
+    yield other
+    other.close()
+
+
+@pytest.fixture
+def enrolled(pool):
+    classroom = create_classroom("lecturer", "math", 2, 15.0, lecture_time=1000.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    return classroom, student, enrollment
+
+
+def unthrottled(pool):
+    return RosterSnapshot(pool, RosterSettings(check_interval_seconds=0))
+
+
+def reschedule(handler, class_id, lecture_time):
+    handler.update(
+        class_id,
+        ClassroomModifiable(
+            subject_name=None,
+            duration=None,
+            lecture_time=lecture_time,
+            late_penalty_duration=None,
+            record_interval=None,
+        ),
+    )
+
+
+def test_roster_sees_schedule_changed_elsewhere(pool, other_worker, enrolled):
+    classroom, _, enrollment = enrolled
+    roster = unthrottled(pool)
+    roster.load()
+    assert roster.resolve([enrollment.id])[enrollment.id].lecture_time == 1000.0
+
+    reschedule(ClassroomDBHandler(other_worker), classroom.id, 2000.0)
+
+    assert roster.resolve([enrollment.id])[enrollment.id].lecture_time == 2000.0
+    roster.close()
+
+
+def test_roster_forgets_enrollment_deleted_elsewhere(pool, other_worker, enrolled):
+    classroom, student, enrollment = enrolled
+    roster = unthrottled(pool)
+    roster.load()
+    assert roster.get_student_id(enrollment.id) == student.id
+
+    EnrollmentDBHandler(other_worker).delete(classroom.id, student.id)
+
+    assert roster.get_student_id(enrollment.id) is None
+    assert roster.resolve([enrollment.id]) == {}
+    roster.close()
+
+
+def test_roster_keeps_snapshot_while_nothing_changes(pool, enrolled):
+    _, _, enrollment = enrolled
+    roster = unthrottled(pool)
+    roster.load()
+    roster.pool = None  # a lookup that reaches the database fails
+
+    assert enrollment.id in roster.resolve([enrollment.id])
+    roster.close()
+
+
+def test_roster_keeps_snapshot_across_own_writes(pool, enrolled):
+    classroom, _, enrollment = enrolled
+    roster = unthrottled(pool)
+    roster.load()
+    students = StudentDBHandler(pool, roster=roster)
+    classrooms = ClassroomDBHandler(pool, roster=roster)
+    enrollments = EnrollmentDBHandler(pool, roster=roster)
+    student = create_stud("Jane", "Roe", 1, "f")
+    students.register_many([student], [])
+    other = create_enrollment(classroom.id, student.id)
+    enrollments.create_many([other])
+    reschedule(classrooms, classroom.id, 2000.0)
+    roster.pool = None  # a lookup that reaches the database fails
+
+    resolved = roster.resolve([enrollment.id, other.id])
+
+    assert resolved[enrollment.id].lecture_time == 2000.0
+    assert resolved[other.id].lecture_time == 2000.0
+    roster.close()
+
+
+def test_roster_checks_other_workers_once_per_interval(pool, other_worker, enrolled):
+    classroom, _, enrollment = enrolled
+    roster = RosterSnapshot(pool, RosterSettings(check_interval_seconds=3600))
+    roster.load()
+
+    reschedule(ClassroomDBHandler(other_worker), classroom.id, 2000.0)
+
+    assert roster.resolve([enrollment.id])[enrollment.id].lecture_time == 1000.0
+    roster._checked_at = float("-inf")  # the interval has passed
+    assert roster.resolve([enrollment.id])[enrollment.id].lecture_time == 2000.0
+    roster.close()
+
+
+def test_object_cache_sees_write_made_elsewhere(pool, other_worker, enrolled):
+    classroom, _, _ = enrolled
+    cache = ObjectCache(pool)
+    classrooms = ClassroomDBHandler(pool, cache=cache)
+    assert classrooms.get(classroom.id).lecture_time == 1000.0
+    assert classrooms.get(classroom.id).lecture_time == 1000.0
+    assert cache.stats().hits == 1
+
+    reschedule(ClassroomDBHandler(other_worker), classroom.id, 2000.0)
+
+    assert classrooms.get(classroom.id).lecture_time == 2000.0
+    assert cache.stats().flushed == 1
+    cache.close()
+
+
+def test_object_cache_own_write_drops_only_its_entry(pool, enrolled):
+    classroom, _, _ = enrolled
+    other = create_classroom("lecturer", "physics", 2, 15.0)
+    cache = ObjectCache(pool)
+    classrooms = ClassroomDBHandler(pool, cache=cache)
+    classrooms.create_many([other])
+    classrooms.get(classroom.id)
+    classrooms.get(other.id)
+
+    reschedule(classrooms, other.id, 3000.0)
+
+    assert classrooms.get(other.id).lecture_time == 3000.0
+    assert classrooms.get(classroom.id).lecture_time == 1000.0
+    # update() read the old row from the cache too
+    stats = cache.stats()
+    assert (stats.hits, stats.flushed, stats.invalidations) == (2, 0, 1)
+    cache.close()
+
+
+def test_check_in_drops_only_the_counted_student(pool, enrolled):
+    classroom, student, enrollment = enrolled
+    other = create_stud("Jane", "Roe", 1, "f")
+    cache = ObjectCache(pool)
+    students = StudentDBHandler(pool, cache=cache)
+    students.register_many([other], [create_enrollment(classroom.id, other.id)])
+    assert students.get(student.id).attendance.present_count == 0
+    students.get(other.id)
+
+    AttendanceDBHandler(pool, cache=cache).create(
+        Attendance(
+            id="check-in",
+            enrollment_id=enrollment.id,
+            last_record=1000.0,
+            entry_time=1000.0,
+            punctuality=Punctuality.ONTIME,
+        )
+    )
+
+    assert students.get(student.id).attendance.present_count == 1
+    students.get(other.id)
+    stats = cache.stats()
+    assert (stats.hits, stats.flushed, stats.invalidations) == (1, 0, 1)
+    cache.close()
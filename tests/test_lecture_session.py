@@ -0,0 +1,90 @@
+import time
+
+import pytest
+from pydantic import ValidationError
+
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.lecture_session import (
+    LectureSessionDBHandler,
+    SessionSettings,
+    session_for,
+)
+from src.model.roster import RosterSnapshot
+from src.model.student import StudentDBHandler, create_stud
+from src.schema.classroom import CreateClassroom
+
+
+def test_boot_on_hour_of_day_lecture_time_creates_nothing(pool):
+    # a row as older databases stored it: the lecture at 23:05, lasting 22h
+    with pool.writer() as conn:
+        conn.execute(
+            "INSERT INTO classroom VALUES (?, ?, ?, ?, ?, ?, ?)",
+            ("baseline", "abci", "Apple", 79200, 23.05, 7200.0, 300.0),
+        )
+    sessions = LectureSessionDBHandler(pool)
+
+    assert sessions.materialize() == 0
+    assert sessions.next_sweep_due() is None
+    classroom = ClassroomDBHandler(pool).get("baseline")
+    assert session_for(classroom, time.time(), SessionSettings()) is None
+
+
+def test_materialize_starts_a_lookback_before_now(pool):
+    now = time.time()
+    # first lecture a year ago
+    classroom = create_classroom(
+        "lecturer", "math", 3600, 900.0, lecture_time=now - 365 * 86400
+    )
+    ClassroomDBHandler(pool).create_many([classroom])
+    settings = SessionSettings(lookback_days=7, horizon_days=14)
+    sessions = LectureSessionDBHandler(pool, settings)
+
+    sessions.materialize()
+
+    starts = [session.start_time for session in sessions.list_by_class(classroom.id)]
+    assert len(starts) == 3
+    assert min(starts) >= now - 7 * 86400
+    assert max(starts) <= now + 14 * 86400
+
+
+@pytest.mark.parametrize("duration", [0, 2, 59])
+def test_duration_in_hours_is_rejected(duration):
+    with pytest.raises(ValidationError):
+        CreateClassroom(
+            lecturer_name="lecturer",
+            duration=duration,
+            lecture_time=1.7e9,
+            late_penalty_duration=900.0,
+            subject_name="math",
+        )
+
+
+def test_warmup_loads_the_roster_of_lectures_about_to_start(pool, monkeypatch):
+    now = time.time()
+    soon, later = [
+        create_classroom("lecturer", subject, 3600, 900.0, lecture_time=start)
+        for subject, start in (("math", now + 300), ("physics", now + 7200))
+    ]
+    ClassroomDBHandler(pool).create_many([soon, later])
+    students = [create_stud("John", "Doe", 1, "m"), create_stud("Jane", "Roe", 1, "f")]
+    enrollments = [
+        create_enrollment(classroom.id, student.id)
+        for classroom, student in zip((soon, later), students)
+    ]
+    StudentDBHandler(pool).register_many(students, enrollments)
+    sessions = LectureSessionDBHandler(pool)
+    sessions.materialize()
+
+    assert sessions.starting(now, now + 600) == [soon.id]
+    assert sessions.next_start_after(now + 600) == later.lecture_time
+
+    roster = RosterSnapshot(pool)
+    assert roster.warm([soon.id]) == [students[0].id]
+
+    def fetch(*args):
+        raise AssertionError("the warmed roster read the database")
+
+    monkeypatch.setattr(roster, "_fetch", fetch)
+    assert roster.resolve([enrollments[0].id])[enrollments[0].id].id == soon.id
+    roster.close()
@@ -0,0 +1,61 @@
+import logging
+import sqlite3
+
+import pytest
+
+from src.db import ConnectionPool
+from src.migrations import MIGRATIONS, Migration, get_schema_version, migrate
+
+
+def schema(pool):
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT type, name, sql FROM sqlite_master ORDER BY type, name"
+        ).fetchall()
+
+
+def test_migrate_twice_changes_nothing(pool):
+    before = schema(pool)
+    assert migrate(pool) == MIGRATIONS[-1].version
+    assert schema(pool) == before
+
+
+def test_second_worker_migrates_nothing(pool):
+    other = ConnectionPool(pool.path)
+    try:
+        before = schema(pool)
+        assert migrate(other) == MIGRATIONS[-1].version
+        assert schema(pool) == before
+    finally:
+        other.close()
+
+
+def test_failed_migration_is_rolled_back(pool):
+    latest = MIGRATIONS[-1].version
+    broken = Migration(
+        version=latest + 1,
+        name="broken",
+        statements=["CREATE TABLE half_done (id TEXT)", "NOT SQL"],
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        migrate(pool, MIGRATIONS + [broken])
+    with pool.reader() as conn:
+        assert get_schema_version(conn) == latest
+        assert (
+            conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE name = 'half_done'"
+            ).fetchone()
+            is None
+        )
+
+
+def test_applied_migrations_are_logged(tmp_path, caplog):
+    pool = ConnectionPool(str(tmp_path / "fresh.db"))
+    try:
+        with caplog.at_level(logging.INFO, logger="src.migrations"):
+            migrate(pool)
+    finally:
+        pool.close()
+    assert len(caplog.records) == len(MIGRATIONS)
+    latest = "Applied migration {}".format(MIGRATIONS[-1].version)
+    assert caplog.records[-1].getMessage().startswith(latest)
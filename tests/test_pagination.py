@@ -0,0 +1,109 @@
+import pytest
+
+from src.model.attendance import (
+    Attendance,
+    AttendanceDBHandler,
+    Punctuality,
+    insert_attendances_internal,
+)
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.model_exception import InvalidQueryError
+from src.model.pagination import (
+    MAX_PAGE_SIZE,
+    decode_cursor,
+    encode_cursor,
+    page_size,
+)
+from src.model.student import StudentDBHandler, create_stud
+from src.partitions import AttendancePartitions, PartitionSettings
+
+
+def walk(list_page, limit):
+    """Follow next_cursor to the end, returning every page's items."""
+    pages, cursor = [], None
+    while True:
+        page = list_page(cursor=cursor, limit=limit)
+        pages.append(page.items)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pages
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor("a/b+c")) == "a/b+c"
+    assert decode_cursor(None) == decode_cursor("") == ""
+
+
+@pytest.mark.parametrize("cursor", ["!!", "bm90IGpzb24", encode_cursor("x")[:-2]])
+def test_invalid_cursor_is_rejected(cursor):
+    with pytest.raises(InvalidQueryError):
+        decode_cursor(cursor)
+
+
+def test_page_size_is_clamped():
+    assert page_size(0) == 1
+    assert page_size(MAX_PAGE_SIZE + 1) == MAX_PAGE_SIZE
+
+
+@pytest.mark.parametrize("limit", [1, 2, 5, 6])
+def test_classroom_pages_cover_every_row_once(pool, limit):
+    classrooms = [
+        create_classroom("lecturer", "subject {}".format(i), 2, 15.0, lecture_time=0.0)
+        for i in range(5)
+    ]
+    ClassroomDBHandler(pool).create_many(classrooms)
+
+    pages = walk(ClassroomDBHandler(pool).list, limit)
+
+    assert all(len(page) <= limit for page in pages)
+    assert [classroom.id for page in pages for classroom in page] == sorted(
+        classroom.id for classroom in classrooms
+    )
+    # a last page that is exactly full is followed by no empty page
+    assert pages[-1]
+
+
+def test_student_pages_cover_every_row_once(pool):
+    students = [create_stud("John", str(i), 1, "m") for i in range(5)]
+    StudentDBHandler(pool).register_many(students, [])
+
+    pages = walk(StudentDBHandler(pool).list_student_attendance_enrollment, 2)
+
+    assert [len(page) for page in pages] == [2, 2, 1]
+    assert [item.student.id for page in pages for item in page] == sorted(
+        student.id for student in students
+    )
+
+
+def test_attendance_pages_merge_partitions(pool, tmp_path):
+    classroom = create_classroom("lecturer", "math", 2, 15.0, lecture_time=0.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    # ids interleave between two archived terms and the hot table
+    times = [1.6e9, 1.7e9, 1.6e9, 1.65e9, 1.7e9, 1.65e9, 1.6e9]
+    rows = [
+        Attendance(
+            id=str(i),
+            enrollment_id=enrollment.id,
+            last_record=entry_time,
+            entry_time=entry_time,
+            punctuality=Punctuality.ONTIME,
+        )
+        for i, entry_time in enumerate(times)
+    ]
+    with pool.writer() as conn:
+        insert_attendances_internal(conn, rows)
+    partitions = AttendancePartitions(pool, PartitionSettings(directory=str(tmp_path)))
+    assert len(partitions.rollover(1.7e9)) == 2
+    handler = AttendanceDBHandler(pool, partitions=partitions)
+
+    pages = walk(handler.list_attendance, 3)
+
+    assert [[row.id for row in page] for page in pages] == [
+        ["0", "1", "2"],
+        ["3", "4", "5"],
+        ["6"],
+    ]
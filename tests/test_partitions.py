@@ -0,0 +1,185 @@
+"""Rolling attendance into partitions and converting them to the archive."""
+
+import os
+import sqlite3
+import threading
+from contextlib import ExitStack
+
+import pytest
+
+from src.archive import ColumnarArchive
+from src.model.attendance import (
+    Attendance,
+    AttendanceDBHandler,
+    Punctuality,
+    insert_attendances_internal,
+)
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+from src.partitions import AttendancePartitions, PartitionSettings
+
+# 2020-09-13, in the partition starting 2020-09-01 for four month terms
+TERM = 1.6e9
+NOW = 1.7e9
+
+
+@pytest.fixture
+def partitions(pool, tmp_path):
+    return AttendancePartitions(pool, PartitionSettings(directory=str(tmp_path)))
+
+
+@pytest.fixture
+def enrollment(pool):
+    classroom = create_classroom("lecturer", "math", 2, 15.0, lecture_time=1000.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    StudentDBHandler(pool).register_many([student], [enrollment])
+    return enrollment
+
+
+def insert(pool, enrollment, *entry_times):
+    rows = [
+        Attendance(
+            id="{:.0f}".format(entry_time),
+            enrollment_id=enrollment.id,
+            last_record=entry_time,
+            entry_time=entry_time,
+            punctuality=Punctuality.ONTIME,
+        )
+        for entry_time in entry_times
+    ]
+    with pool.writer() as conn:
+        insert_attendances_internal(conn, rows)
+    return rows
+
+
+def present_count(pool, enrollment):
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT present_count FROM attendance_detail WHERE student_id = ?",
+            (enrollment.student_id,),
+        ).fetchone()[0]
+
+
+def attached(conn):
+    return [row[1] for row in conn.execute("PRAGMA database_list")]
+
+
+def test_archive_detaches_partition_everywhere(pool, partitions, enrollment):
+    insert(pool, enrollment, TERM, TERM + 60)
+    (partition,) = partitions.rollover(NOW)
+    handler = AttendanceDBHandler(pool, partitions=partitions)
+    with pool.reader() as busy:
+        partitions.attach(busy, partition)
+        assert len(handler.list_attendance().items) == 2
+        with pool.writer() as conn:
+            partitions.attach(conn, partition)
+
+        ColumnarArchive(partitions).archive(partition)
+
+        assert not os.path.exists(
+            os.path.join(partitions.directory, partition.filename)
+        )
+        with pool.writer() as conn:
+            assert partition.alias not in attached(conn)
+        assert partition.alias in attached(busy)
+    # the reader that was checked out detached it when returned
+    with ExitStack() as stack:
+        readers = [
+            stack.enter_context(pool.reader()) for _ in range(pool.stats().opened)
+        ]
+        assert pool.stats().opened == len(readers) > 1
+        for conn in readers:
+            assert partition.alias not in attached(conn)
+
+
+def test_delete_waits_for_archive(pool, partitions, enrollment, monkeypatch):
+    deleted, _ = insert(pool, enrollment, TERM, TERM + 60)
+    (partition,) = partitions.rollover(NOW)
+    handler = AttendanceDBHandler(pool, partitions=partitions)
+    archive = ColumnarArchive(partitions)
+    write_term = archive._write_term
+    results, threads = [], []
+
+    def converting(*args):
+        thread = threading.Thread(
+            target=lambda: results.append(handler.delete(deleted.id))
+        )
+        thread.start()
+        thread.join(0.2)
+        threads.append(thread)
+        return write_term(*args)
+
+    monkeypatch.setattr(archive, "_write_term", converting)
+    meta = archive.archive(partition)
+    threads[0].join()
+
+    # the delete ran once the row was archived, and did not find it
+    assert (meta.rows, results) == (2, [0])
+
+
+def test_counters_follow_attendance(pool, enrollment):
+    handler = AttendanceDBHandler(pool)
+    first, _ = insert(pool, enrollment, NOW, NOW + 60)
+    assert present_count(pool, enrollment) == 2
+
+    handler.delete(first.id)
+    assert present_count(pool, enrollment) == 1
+
+
+def test_rollover_keeps_counts(pool, partitions, enrollment):
+    insert(pool, enrollment, TERM, TERM + 60, NOW)
+    partitions.rollover(NOW)
+    assert present_count(pool, enrollment) == 3
+
+
+def test_deletes_after_rollover_are_uncounted(pool, partitions, enrollment):
+    archived, _, hot = insert(pool, enrollment, TERM, TERM + 60, NOW)
+    partitions.rollover(NOW)
+    handler = AttendanceDBHandler(pool, partitions=partitions)
+
+    handler.delete(archived.id)
+    assert present_count(pool, enrollment) == 2
+    handler.delete(hot.id)
+    assert present_count(pool, enrollment) == 1
+
+
+def test_backdated_hot_row_is_uncounted(pool, partitions, enrollment):
+    insert(pool, enrollment, TERM)
+    partitions.rollover(NOW)
+    # entered after the rollover with a time inside the archived range
+    (backdated,) = insert(pool, enrollment, TERM + 60)
+    assert present_count(pool, enrollment) == 2
+
+    AttendanceDBHandler(pool, partitions=partitions).delete(backdated.id)
+    assert present_count(pool, enrollment) == 1
+
+
+def test_recover_removes_rows_left_in_both_places(pool, partitions, enrollment):
+    insert(pool, enrollment, TERM)
+    (partition,) = partitions.rollover(NOW)
+    insert(pool, enrollment, TERM + 60, NOW)
+    # a rollover that committed the partition file but not the main database
+    archive = sqlite3.connect(os.path.join(partitions.directory, partition.filename))
+    with pool.reader() as conn:
+        rows = conn.execute(
+            "SELECT * FROM main.attendance WHERE entry_time < ?", (NOW,)
+        ).fetchall()
+    archive.executemany(
+        "INSERT INTO attendance VALUES ({})".format(", ".join("?" * len(rows[0]))),
+        rows,
+    )
+    archive.commit()
+    archive.close()
+    handler = AttendanceDBHandler(pool, partitions=partitions)
+    assert len(handler.list_attendance().items) == 4
+
+    assert partitions.recover() == 1
+
+    assert [row.id for row in handler.list_attendance().items] == sorted(
+        "{:.0f}".format(entry_time) for entry_time in (TERM, TERM + 60, NOW)
+    )
+    assert present_count(pool, enrollment) == 3
+    assert partitions.recover() == 0
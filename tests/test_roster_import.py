@@ -0,0 +1,65 @@
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.student import StudentDBHandler, create_stud
+from src.roster_import import RosterImporter
+
+
+def roster_row(firstname, lastname, subject="math", **extra):
+    row = {
+        "firstname": firstname,
+        "lastname": lastname,
+        "generation": 1,
+        "gender": "m",
+        "subject_name": subject,
+        "lecturer_name": "lecturer",
+    }
+    row.update(extra)
+    return row
+
+
+def students(pool):
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT id, firstname, lastname FROM student ORDER BY firstname"
+        ).fetchall()
+
+
+def test_import_matches_students_created_through_the_api(pool):
+    classroom = create_classroom("lecturer", "math", 2, 15.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    registered = create_stud("John", "Doe", 1, "m")
+    StudentDBHandler(pool).register_many([registered])
+
+    report = RosterImporter(pool).import_rows(
+        [
+            (2, roster_row("JOHN", "doe")),
+            (3, roster_row(" john ", "DOE")),
+        ]
+    )
+
+    assert report.errors == []
+    assert report.students_created == 0
+    assert report.enrollments_created == 1
+    assert students(pool) == [(registered.id, "John", "doe")]
+    with pool.reader() as conn:
+        enrolled = conn.execute("SELECT student_id, class_id FROM enrollment")
+        assert enrolled.fetchall() == [(registered.id, classroom.id)]
+
+
+def test_reimport_creates_nothing(pool):
+    rows = [
+        (2, roster_row("Alice", "Smith", duration=7200, late_penalty_duration=900.0)),
+        (3, roster_row("Bob", "Jones")),
+    ]
+    importer = RosterImporter(pool)
+
+    first = importer.import_rows(rows)
+    second = importer.import_rows(rows)
+
+    assert (first.students_created, first.enrollments_created) == (2, 2)
+    assert (second.students_created, second.enrollments_created) == (0, 0)
+    assert second.enrollments_existing == 2
+    # created like POST /students/ does, first name as given
+    assert [row[1:] for row in students(pool)] == [
+        ("Alice", "smith"),
+        ("Bob", "jones"),
+    ]
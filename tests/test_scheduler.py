@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src.scheduler import Scheduler, SchedulerSettings
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=2)
+    yield executor
+    executor.shutdown()
+
+
+def make_scheduler(pool, executor, owner, **settings):
+    scheduler = Scheduler(pool, executor, SchedulerSettings(**settings))
+    scheduler.owner = owner
+    return scheduler
+
+
+def job_row(pool, name):
+    with pool.reader() as conn:
+        return conn.execute(
+            "SELECT next_run, claimed_by, runs, last_status FROM scheduled_job"
+            " WHERE name = ?",
+            (name,),
+        ).fetchone()
+
+
+def test_claimed_job_runs_once(pool, executor):
+    first = make_scheduler(pool, executor, "first:1")
+    second = make_scheduler(pool, executor, "second:2")
+    ran = []
+    seen_by_second = []
+
+    def job(arg):
+        ran.append("first")
+        # the lease is held while the job runs
+        seen_by_second.append(second._execute("report"))
+
+    first.register("report", job)
+    second.register("report", lambda arg: ran.append("second"))
+    due = time.time() - 1
+    first._upsert("report", "report", due, 60.0, None)
+
+    first._execute("report")
+
+    assert ran == ["first"]
+    assert seen_by_second[0] > time.time() + 500
+    next_run, claimed_by, runs, status = job_row(pool, "report")
+    assert (claimed_by, runs, status) == (None, 1, "ok")
+    assert next_run == pytest.approx(due + 60.0)
+
+
+def test_expired_lease_is_taken_over(pool, executor):
+    survivor = make_scheduler(pool, executor, "survivor:2")
+    ran = []
+    survivor.register("report", lambda arg: ran.append(arg))
+    now = time.time()
+    survivor._upsert("report", "report", now - 10, None, "x")
+    with pool.writer() as conn:
+        conn.execute(
+            "UPDATE scheduled_job SET claimed_by = 'dead:1', claimed_until = ?",
+            (now - 1,),
+        )
+
+    assert survivor._execute("report") is None
+    assert ran == ["x"]
+    # a one-off job is dropped once it has run
+    assert job_row(pool, "report") is None
+
+
+def test_failed_job_retries_after_retry_seconds(pool, executor, caplog):
+    scheduler = make_scheduler(
+        pool, executor, "only:1", retry_seconds=30.0, lease_seconds=600.0
+    )
+
+    def fail(arg):
+        raise RuntimeError("boom")
+
+    scheduler.register("report", fail)
+    scheduler._upsert("report", "report", time.time() - 1, 3600.0, None)
+
+    with caplog.at_level(logging.ERROR, logger="src.scheduler"):
+        retry_at = scheduler._execute("report")
+
+    assert retry_at == pytest.approx(time.time() + 30.0, abs=5)
+    assert job_row(pool, "report")[3] == "error"
+    (record,) = caplog.records
+    assert record.getMessage() == "Job report failed" and record.exc_info
+
+
+def test_dispatch_error_retries_after_retry_seconds(pool, executor):
+    scheduler = make_scheduler(
+        pool, executor, "only:1", retry_seconds=30.0, lease_seconds=600.0
+    )
+
+    def broken(name):
+        raise RuntimeError("database is locked")
+
+    scheduler._execute = broken
+
+    async def fire():
+        scheduler._slots = asyncio.Semaphore(1)
+        await scheduler._slots.acquire()
+        await scheduler._fire("report")
+
+    asyncio.run(fire())
+
+    assert scheduler._due["report"] == pytest.approx(time.time() + 30.0, abs=5)
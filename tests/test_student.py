@@ -0,0 +1,20 @@
+from src.model.classroom import ClassroomDBHandler, create_classroom
+from src.model.enrollments import create_enrollment
+from src.model.student import StudentDBHandler, create_stud
+
+
+def test_get_returns_enrollments(pool):
+    classroom = create_classroom("lecturer", "math", 2, 15.0)
+    ClassroomDBHandler(pool).create_many([classroom])
+    student = create_stud("John", "Doe", 1, "m")
+    enrollment = create_enrollment(classroom.id, student.id)
+    students = StudentDBHandler(pool)
+    students.register_many([student], [enrollment])
+
+    full = students.get(student.id, full_enrollment=True)
+    names = students.get(student.id, full_enrollment=False)
+
+    assert full.student.id == student.id
+    assert full.attendance.student_id == student.id
+    assert full.enrollments == [enrollment]
+    assert names.enrollments == ["math"]
@@ -0,0 +1,95 @@
+import pytest
+
+from src.db import ConnectionPool
+from src.migrations import MIGRATIONS, migrate
+from src.model.student import StudentDBHandler, create_stud
+from src.model.student_name import similarity
+
+
+@pytest.fixture
+def students(pool):
+    handler = StudentDBHandler(pool)
+    handler.register_many(
+        [
+            create_stud(firstname, lastname, 1, "m")
+            for firstname, lastname in (
+                ("Jo", "Smith"),
+                ("Johnny", "Appleseed"),
+                ("John", "Smith"),
+                ("Zoë", "Ångström"),
+                ("Mary", "Jones"),
+            )
+        ],
+        [],
+    )
+    return handler
+
+
+def found(handler, query, limit=10):
+    return [
+        (match.student.firstname, match.match) for match in handler.search(query, limit)
+    ]
+
+
+def test_whole_words_rank_before_prefixes(students):
+    assert found(students, "jo") == [
+        ("Jo", "word"),
+        ("John", "prefix"),
+        # "jo" starts "jones" too, which is closer in length than "johnny"
+        ("Mary", "prefix"),
+        ("Johnny", "prefix"),
+    ]
+    assert found(students, "jo", limit=2) == [("Jo", "word"), ("John", "prefix")]
+
+
+def test_every_term_must_match(students):
+    assert found(students, "john smi") == [("John", "prefix")]
+    assert found(students, "smith jo") == [("Jo", "word"), ("John", "prefix")]
+
+
+def test_case_and_diacritics_are_folded(students):
+    assert found(students, "ZOE angstrom") == [("Zoë", "word")]
+
+
+def test_misspellings_are_found_only_without_other_hits(students):
+    matches = students.search("jhon")
+    assert matches[0].student.firstname == "John"
+    assert {match.match for match in matches} == {"fuzzy"}
+    assert all(0.6 <= match.score < 1.0 for match in matches)
+    assert found(students, "smiht") == [("Jo", "fuzzy"), ("John", "fuzzy")]
+    assert found(students, "xyzzy") == []
+
+
+def test_index_follows_renames_and_deletes(pool, students):
+    (john,) = [match.student for match in students.search("john smith")]
+    with pool.writer() as conn:
+        conn.execute("UPDATE student SET firstname = 'Jack' WHERE id = ?", (john.id,))
+        conn.execute("DELETE FROM student WHERE firstname = 'Mary'")
+
+    assert found(students, "jack") == [("Jack", "word")]
+    assert found(students, "john") == [("Johnny", "prefix")]
+    assert found(students, "jones") == []
+
+
+def test_similarity_prefers_the_closest_word():
+    assert similarity(["jo"], "john", "smith") == pytest.approx(2 * 2 / (2 + 4))
+    assert similarity(["smith"], "john", "smith") == 1.0
+    assert similarity(["jo"], "", "") == 0.0
+
+
+def test_migration_backfills_existing_students(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "old.db"))
+    try:
+        migrate(pool, [m for m in MIGRATIONS if m.version < 12])
+        with pool.writer() as conn:
+            conn.execute(
+                "INSERT INTO student (id, firstname, lastname, generation, gender)"
+                " VALUES ('old', ' Ana ', 'Lima', 1, 'f')"
+            )
+
+        migrate(pool)
+
+        (match,) = StudentDBHandler(pool).search("ana lima")
+        assert (match.student.id, match.match) == ("old", "word")
+    finally:
+        pool.close()